@@ -0,0 +1,435 @@
+"""
+Reproduceerbare performance benchmarks voor de backend.
+
+Start de FastAPI app in-process (httpx ASGITransport, geen netwerk) tegen een
+lokale MongoDB (--mongo-url) of, zonder die optie, mongomock-motor. Een lokale
+HTTP stub serveert synthetische JPEG's. Per bibliotheekgrootte (--sizes) wordt
+een verse synthetische bibliotheek gezaaid en gemeten:
+
+  - import throughput (enkele imports na elkaar, en /import/batch)
+  - latency percentielen voor list (keyset pagina's), detail, stats en search
+  - download throughput (items/s en MB/s, incl. thumbnails en hashing)
+
+De resultaten gaan als JSON naar --out, zodat runs met elkaar te vergelijken
+zijn: --compare <vorige.json> toont per meting de verandering en geeft met
+--fail-on-regression exit code 1 als iets meer dan --threshold verslechtert.
+
+Gebruik (vanuit backend/):
+    python -m benchmarks.bench --sizes 1000,10000
+    python -m benchmarks.bench --sizes 1000,10000,100000 --mongo-url mongodb://localhost:27017
+    python -m benchmarks.bench --sizes 1000 --compare benchmarks/results/vorige.json
+
+mongomock-motor draait alles in Python (geen indexen, geen $text): goed voor
+relatieve vergelijkingen tussen commits, niet voor absolute cijfers. Search
+wordt dan als `skipped` gerapporteerd. Gebruik voor 100k items een echte MongoDB.
+"""
+import argparse
+import asyncio
+import hashlib
+import importlib.util
+import io
+import json
+import os
+import platform
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Dict, List, Optional
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BACKEND_DIR))
+
+# server.py leest deze bij import; de echte client wordt per run vervangen
+os.environ.setdefault("MONGO_URL", "mongodb://localhost:27017")
+os.environ.setdefault("DB_NAME", "nc_bench")
+os.environ.setdefault("EVENTS_BACKEND", "memory")
+os.environ.setdefault("INGEST_JOURNAL_PATH", str(Path(tempfile.gettempdir()) / "nc-bench-ingest.journal"))
+
+import httpx  # noqa: E402
+from PIL import Image  # noqa: E402
+
+import server  # noqa: E402
+
+RESULTS_DIR = Path(__file__).resolve().parent / "results"
+SEED_BATCH = 1000
+WORDS = (
+    "neon city forest dragon portrait castle ocean sunset cyberpunk watercolor astronaut "
+    "mountain robot garden galaxy samurai lighthouse desert crystal owl fox library storm "
+    "cathedral jellyfish steampunk lantern meadow glacier temple"
+).split()
+MODELS = ["SDXL", "Flux", "DALL-E 3", "Stable Diffusion 1.5", "Ideogram"]
+ASPECT_RATIOS = ["1:1", "4:3", "3:4", "16:9", "9:16"]
+
+# (naam, hoger is beter) voor --compare
+COMPARED_METRICS = [
+    ("import.single.items_per_s", True),
+    ("import.batch.items_per_s", True),
+    ("latency.list.p50_ms", False),
+    ("latency.list.p90_ms", False),
+    ("latency.detail.p50_ms", False),
+    ("latency.detail.p90_ms", False),
+    ("latency.stats.p50_ms", False),
+    ("latency.stats_cold.p50_ms", False),
+    ("latency.search.p50_ms", False),
+    ("download.items_per_s", True),
+    ("download.mb_per_s", True),
+]
+
+
+# ─── Synthetische afbeeldingen ───────────────────────────────────────────────
+
+class ImageStub:
+    """
+    Lokale HTTP server met synthetische JPEG's. Elke URL krijgt een paar unieke
+    bytes achter de EOI-marker (Pillow negeert die), zodat elk bestand een eigen
+    digest heeft en de blob store niet alles als duplicaat herkent.
+    """
+
+    def __init__(self, size: int = 768, seed: int = 0):
+        rnd = random.Random(seed)
+        img = Image.frombytes("RGB", (size, size), bytes(rnd.getrandbits(8) for _ in range(size * size * 3)))
+        buf = io.BytesIO()
+        img.save(buf, "JPEG", quality=85)
+        self.base = buf.getvalue()
+        self.bytes_served = 0
+        self._lock = threading.Lock()
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                body = stub.base + hashlib.sha256(self.path.encode()).digest()
+                self.send_response(200)
+                self.send_header("Content-Type", "image/jpeg")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+                with stub._lock:
+                    stub.bytes_served += len(body)
+
+        self._httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self._httpd.server_port}"
+        threading.Thread(target=self._httpd.serve_forever, daemon=True).start()
+
+    def close(self):
+        self._httpd.shutdown()
+
+
+# ─── Database en app ─────────────────────────────────────────────────────────
+
+def _make_client(mongo_url: Optional[str]):
+    if mongo_url:
+        from motor.motor_asyncio import AsyncIOMotorClient
+        return AsyncIOMotorClient(mongo_url, event_listeners=[server.mongo_metrics]), "mongodb"
+    if importlib.util.find_spec("mongomock_motor") is None:
+        sys.exit("mongomock-motor is niet geïnstalleerd: pip install mongomock-motor, of gebruik --mongo-url")
+    from mongomock_motor import AsyncMongoMockClient
+    return AsyncMongoMockClient(), "mongomock"
+
+
+async def _start_app(args, download_dir: Path) -> str:
+    """Verse database + download map, daarna de gewone startup handlers van de app."""
+    client, backend = _make_client(args.mongo_url)
+    if backend == "mongodb":
+        await client.drop_database(args.db_name)
+    server.client = client
+    server.db = client[args.db_name]
+    server.DOWNLOAD_DIR = download_dir
+    server.BLOB_DIR = download_dir / "_blobs"
+    server.stats_cache.invalidate()
+    server.hash_index = server.HashIndex(server.HASH_INDEX_TTL)
+    await server.app.router.startup()
+    return backend
+
+
+def _creation(rnd: random.Random, i: int, size: int, stub_url: str, prefix: str = "seed") -> dict:
+    words = rnd.sample(WORDS, 6)
+    images = [f"{stub_url}/img/{prefix}-{size}-{i}-{n}.jpg" for n in range(rnd.randint(1, 4))]
+    return {
+        "url": f"https://creator.nightcafe.studio/creation/{prefix}{size}x{i}",
+        "creationId": f"{prefix}{size}x{i}",
+        "title": " ".join(words[:3]).title(),
+        "creationType": "image",
+        "prompt": " ".join(words) + ", highly detailed, 8k",
+        "imageUrl": images[0],
+        "allImages": images,
+        "model": rnd.choice(MODELS),
+        "aspectRatio": rnd.choice(ASPECT_RATIOS),
+        "seed": str(rnd.getrandbits(32)),
+        "isPublished": rnd.random() < 0.3,
+    }
+
+
+async def seed(size: int, rnd: random.Random, stub_url: str) -> List[str]:
+    """Zaai `size` items + prompts rechtstreeks in Mongo (zelfde mapping als /import)."""
+    start = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    ids = []
+    for offset in range(0, size, SEED_BATCH):
+        gallery_docs, prompt_docs = [], []
+        for i in range(offset, min(offset + SEED_BATCH, size)):
+            item_id = f"bench-{size}-{i:07d}"
+            prompt_doc, gallery_doc = server.map_to_db(
+                server.CreationImport(**_creation(rnd, i, size, stub_url)), item_id
+            )
+            at = (start + timedelta(minutes=i)).isoformat()
+            gallery_doc["created_at"] = gallery_doc["updated_at"] = at
+            prompt_doc["created_at"] = prompt_doc["updated_at"] = at
+            gallery_docs.append(gallery_doc)
+            prompt_docs.append(prompt_doc)
+            ids.append(item_id)
+        await server.db.gallery_items.insert_many(gallery_docs)
+        await server.db.prompts.insert_many(prompt_docs)
+    # Direct ingevoegd, buiten de tellers om
+    await server.stats_cache.reconcile()
+    return ids
+
+
+# ─── Metingen ────────────────────────────────────────────────────────────────
+
+def _percentile(sorted_values: List[float], p: float) -> float:
+    if len(sorted_values) == 1:
+        return sorted_values[0]
+    k = (len(sorted_values) - 1) * p / 100
+    lo = int(k)
+    hi = min(lo + 1, len(sorted_values) - 1)
+    return sorted_values[lo] + (sorted_values[hi] - sorted_values[lo]) * (k - lo)
+
+
+def summarize(samples: List[float], errors: int = 0, status: Optional[int] = None) -> dict:
+    if not samples:
+        return {"skipped": f"alle requests mislukt (HTTP {status})", "errors": errors}
+    values = sorted(s * 1000 for s in samples)
+    return {
+        "n": len(values),
+        "errors": errors,
+        "mean_ms": round(sum(values) / len(values), 3),
+        "p50_ms": round(_percentile(values, 50), 3),
+        "p90_ms": round(_percentile(values, 90), 3),
+        "p99_ms": round(_percentile(values, 99), 3),
+        "max_ms": round(values[-1], 3),
+    }
+
+
+async def timed_requests(http: httpx.AsyncClient, urls, n: int, before=None) -> dict:
+    """`n` GET requests na elkaar; `urls(i, vorige_response)` geeft de volgende URL."""
+    samples, errors, status, previous = [], 0, None, None
+    for i in range(n):
+        url = urls(i, previous)
+        if before:
+            before()
+        t0 = time.perf_counter()
+        previous = await http.get(url)
+        elapsed = time.perf_counter() - t0
+        status = previous.status_code
+        if status >= 400:
+            errors += 1
+            previous = None
+        else:
+            samples.append(elapsed)
+    return summarize(samples, errors, status)
+
+
+async def bench_latency(http: httpx.AsyncClient, ids: List[str], rnd: random.Random, n: int) -> dict:
+    def list_url(i, previous):
+        cursor = previous.json().get("next_cursor") if previous is not None else None
+        return "/api/gallery-items/page?limit=100" + (f"&after={cursor}" if cursor else "")
+
+    return {
+        "list": await timed_requests(http, list_url, n),
+        "detail": await timed_requests(http, lambda i, _: f"/api/gallery-items/{rnd.choice(ids)}", n),
+        "stats": await timed_requests(http, lambda i, _: "/api/gallery-items/stats/summary", n),
+        # Zonder lokale cache: één lookup van het tellerdocument
+        "stats_cold": await timed_requests(
+            http, lambda i, _: "/api/gallery-items/stats/summary", max(n // 10, 5),
+            before=server.stats_cache.invalidate,
+        ),
+        "search": await timed_requests(
+            http, lambda i, _: f"/api/gallery-items/search?q={rnd.choice(WORDS)}&limit=50", n
+        ),
+    }
+
+
+async def bench_import(http: httpx.AsyncClient, size: int, rnd: random.Random, stub_url: str, n: int) -> dict:
+    t0 = time.perf_counter()
+    for i in range(n):
+        r = await http.post("/api/import", json=_creation(rnd, i, size, stub_url, prefix="single"))
+        r.raise_for_status()
+    single = time.perf_counter() - t0
+
+    batch_size = 100
+    t0 = time.perf_counter()
+    for offset in range(0, n, batch_size):
+        payload = [_creation(rnd, i, size, stub_url, prefix="batch") for i in range(offset, min(offset + batch_size, n))]
+        r = await http.post("/api/import/batch", json=payload)
+        r.raise_for_status()
+    batch = time.perf_counter() - t0
+    return {
+        "single": {"items": n, "seconds": round(single, 3), "items_per_s": round(n / single, 1)},
+        "batch": {"items": n, "batch_size": batch_size, "seconds": round(batch, 3), "items_per_s": round(n / batch, 1)},
+    }
+
+
+async def bench_download(http: httpx.AsyncClient, ids: List[str], stub: ImageStub, n: int, concurrency: int) -> dict:
+    chosen = ids[:n]
+    semaphore = asyncio.Semaphore(concurrency)
+    failures = 0
+
+    async def one(item_id: str):
+        nonlocal failures
+        async with semaphore:
+            r = await http.post(f"/api/gallery-items/{item_id}/download")
+            if r.status_code != 200:
+                failures += 1
+
+    served_before = stub.bytes_served
+    t0 = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in chosen))
+    elapsed = time.perf_counter() - t0
+    mb = (stub.bytes_served - served_before) / 1e6
+    return {
+        "items": len(chosen),
+        "failures": failures,
+        "concurrency": concurrency,
+        "seconds": round(elapsed, 3),
+        "items_per_s": round(len(chosen) / elapsed, 2),
+        "mb_per_s": round(mb / elapsed, 2),
+    }
+
+
+async def run_size(args, size: int, stub: ImageStub) -> dict:
+    rnd = random.Random(f"{args.seed}-{size}")
+    download_dir = Path(tempfile.mkdtemp(prefix="nc-bench-"))
+    backend = await _start_app(args, download_dir)
+    transport = httpx.ASGITransport(app=server.app, raise_app_exceptions=False)
+    try:
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as http:
+            t0 = time.perf_counter()
+            ids = await seed(size, rnd, stub.url)
+            seeded = time.perf_counter() - t0
+            print(f"[{size}] gezaaid in {seeded:.1f}s ({backend})", flush=True)
+
+            latency = await bench_latency(http, ids, rnd, args.requests)
+            print(f"[{size}] latency klaar", flush=True)
+            imports = await bench_import(http, size, rnd, stub.url, args.imports)
+            print(f"[{size}] import klaar", flush=True)
+            download = await bench_download(http, rnd.sample(ids, min(args.downloads, size)), stub,
+                                            args.downloads, args.concurrency)
+            print(f"[{size}] download klaar", flush=True)
+    finally:
+        await server.app.router.shutdown()
+        shutil.rmtree(download_dir, ignore_errors=True)
+    return {"backend": backend, "seed_seconds": round(seeded, 2), "import": imports, "latency": latency, "download": download}
+
+
+async def run_all(args, sizes: List[int], stub: ImageStub) -> Dict[str, dict]:
+    return {str(size): await run_size(args, size, stub) for size in sizes}
+
+
+# ─── Resultaten ──────────────────────────────────────────────────────────────
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=BACKEND_DIR, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _lookup(result: dict, path: str):
+    for key in path.split("."):
+        if not isinstance(result, dict) or key not in result:
+            return None
+        result = result[key]
+    return result if isinstance(result, (int, float)) else None
+
+
+def compare(current: dict, previous: dict, threshold: float) -> List[str]:
+    """Print per grootte en meting de verandering; geeft de regressies terug."""
+    regressions = []
+    print(f"\nVergelijking met {previous['meta'].get('commit')} ({previous['meta'].get('timestamp')})")
+    for size, result in current["results"].items():
+        old = previous["results"].get(size)
+        if not old:
+            continue
+        print(f"\n  {size} items")
+        for path, higher_is_better in COMPARED_METRICS:
+            new_value, old_value = _lookup(result, path), _lookup(old, path)
+            if new_value is None or not old_value:
+                continue
+            change = (new_value - old_value) / old_value
+            worse = -change if higher_is_better else change
+            flag = "  REGRESSIE" if worse > threshold else ""
+            print(f"    {path:<30} {old_value:>10} → {new_value:<10} {change:+.1%}{flag}")
+            if flag:
+                regressions.append(f"{size}:{path}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--sizes", default="1000,10000", help="Komma-gescheiden bibliotheekgroottes")
+    parser.add_argument("--mongo-url", default=None, help="Lokale MongoDB i.p.v. mongomock-motor")
+    parser.add_argument("--db-name", default="nc_bench", help="Database (wordt per grootte leeggemaakt)")
+    parser.add_argument("--requests", type=int, default=200, help="Requests per latency-meting")
+    parser.add_argument("--imports", type=int, default=500, help="Items per import-meting")
+    parser.add_argument("--downloads", type=int, default=50, help="Items voor de download-meting")
+    parser.add_argument("--concurrency", type=int, default=8, help="Gelijktijdige downloads")
+    parser.add_argument("--seed", type=int, default=42, help="Seed voor de synthetische data")
+    parser.add_argument("--out", default=None, help="JSON resultaat (standaard benchmarks/results/<tijd>.json)")
+    parser.add_argument("--compare", default=None, help="Eerder JSON resultaat om mee te vergelijken")
+    parser.add_argument("--threshold", type=float, default=0.2, help="Verslechtering die als regressie telt")
+    parser.add_argument("--fail-on-regression", action="store_true", help="Exit code 1 bij een regressie")
+    args = parser.parse_args()
+
+    sizes = [int(s) for s in args.sizes.split(",") if s.strip()]
+    stub = ImageStub(seed=args.seed)
+    try:
+        # Eén event loop voor alle groottes: server.py heeft module-level asyncio primitives
+        results = asyncio.run(run_all(args, sizes, stub))
+    finally:
+        stub.close()
+
+    timestamp = datetime.now(timezone.utc)
+    report = {
+        "meta": {
+            "timestamp": timestamp.isoformat(),
+            "commit": _git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "args": vars(args),
+        },
+        "results": results,
+    }
+    out = Path(args.out) if args.out else RESULTS_DIR / f"{timestamp:%Y%m%dT%H%M%SZ}.json"
+    out.parent.mkdir(parents=True, exist_ok=True)
+    out.write_text(json.dumps(report, indent=2))
+    print(f"\nResultaten: {out}")
+
+    for size, result in results.items():
+        lat = result["latency"]
+        print(
+            f"  {size:>7} items: list p50 {lat['list'].get('p50_ms')} ms, detail p50 {lat['detail'].get('p50_ms')} ms, "
+            f"import {result['import']['batch']['items_per_s']}/s (batch), "
+            f"download {result['download']['mb_per_s']} MB/s"
+        )
+
+    if args.compare:
+        previous = json.loads(Path(args.compare).read_text())
+        regressions = compare(report, previous, args.threshold)
+        if regressions and args.fail_on_regression:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
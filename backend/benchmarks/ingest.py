@@ -0,0 +1,163 @@
+"""
+Micro-benchmark: CPU per import voor map_to_db.
+
+Vergelijkt de huidige map_to_db (documenten direct op sjablonen) met de
+vorige, model-gebaseerde versie (Prompt + GalleryItem bouwen, twee keer
+model_dump, metadata via twee comprehensions, vier keer datetime.now()).
+Controleert eerst dat beide dezelfde documenten opleveren (op id's en
+timestamps na) en meet daarna process-CPU per import.
+
+Gebruik (vanuit backend/):
+    python -m benchmarks.ingest
+    python -m benchmarks.ingest --iterations 50000 --out /tmp/ingest.json
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault("MONGO_URL", "mongodb://localhost:27017")
+os.environ.setdefault("DB_NAME", "nc_bench")
+
+import server  # noqa: E402
+from server import CreationImport, GalleryItem, Prompt, _parse_seed  # noqa: E402
+
+VOLATILE = {"id", "prompt_id", "created_at", "updated_at"}
+
+
+def map_to_db_models(creation: CreationImport, gallery_id: str) -> tuple:
+    """De vorige implementatie, als referentie."""
+    ext_meta = creation.metadata or {}
+    prompt_text = creation.prompt or creation.videoPrompt
+
+    prompt = Prompt(
+        title=creation.title,
+        content=prompt_text,
+        revised_prompt=creation.revisedPrompt,
+        model=creation.model,
+        seed=_parse_seed(creation.seed),
+        aspect_ratio=creation.aspectRatio,
+        gallery_item_id=gallery_id,
+    )
+    nc_metadata = {
+        "source": creation.source or "NightCafe Studio",
+        "source_url": creation.url,
+        "nightcafe_creation_id": creation.creationId,
+        "all_images": creation.allImages,
+        "is_published": creation.isPublished,
+        "video_prompt": creation.videoPrompt,
+        "revised_prompt": creation.revisedPrompt,
+        "initial_resolution": creation.initialResolution,
+        "sampling_method": ext_meta.get("samplingMethod"),
+        "runtime": ext_meta.get("runtime"),
+        "extracted_at": creation.extractedAt,
+    }
+    for k, v in ext_meta.items():
+        if k not in ("samplingMethod", "runtime") and k not in nc_metadata:
+            nc_metadata[k] = v
+    nc_metadata = {k: v for k, v in nc_metadata.items() if v is not None}
+
+    gallery_item = GalleryItem(
+        id=gallery_id,
+        title=creation.title,
+        image_url=creation.imageUrl,
+        prompt_used=prompt_text,
+        model_used=creation.model,
+        model=creation.model,
+        aspect_ratio=creation.aspectRatio,
+        start_image=creation.startImageUrl,
+        prompt_id=prompt.id,
+        metadata=nc_metadata,
+        media_type=creation.creationType or "image",
+    )
+    return prompt.model_dump(), gallery_item.model_dump()
+
+
+SAMPLES = [
+    CreationImport(
+        url="https://creator.nightcafe.studio/creation/abc123",
+        creationId="abc123",
+        title="Neon Dragon Over The City",
+        creationType="image",
+        prompt="a neon dragon flying over a cyberpunk city at night, highly detailed, 8k",
+        revisedPrompt="A luminous neon dragon soaring above a rain-soaked cyberpunk skyline",
+        imageUrl="https://images.nightcafe.studio/jobs/abc123/main.jpg",
+        allImages=[f"https://images.nightcafe.studio/jobs/abc123/{n}.jpg" for n in range(4)],
+        model="SDXL",
+        initialResolution="1024x1024",
+        aspectRatio="1:1",
+        seed="123456789",
+        isPublished=True,
+        metadata={"samplingMethod": "euler_a", "runtime": "12s", "steps": 30, "cfg": 7.5, "source": "x", "empty": None},
+        extractedAt="2024-05-01T12:00:00Z",
+    ),
+    CreationImport(
+        url="https://creator.nightcafe.studio/creation/vid42",
+        creationId="vid42",
+        creationType="video",
+        videoPrompt="slow pan across a misty forest",
+        startImageUrl="https://images.nightcafe.studio/jobs/vid42/start.jpg",
+        seed="not-a-number",
+    ),
+]
+
+
+def _stable(doc: dict) -> dict:
+    return {k: v for k, v in doc.items() if k not in VOLATILE}
+
+
+def check_equivalent():
+    for creation in SAMPLES:
+        old_prompt, old_gallery = map_to_db_models(creation, "g1")
+        new_prompt, new_gallery = server.map_to_db(creation, "g1")
+        assert list(old_prompt) == list(new_prompt), "veldvolgorde prompt wijkt af"
+        assert list(old_gallery) == list(new_gallery), "veldvolgorde gallery item wijkt af"
+        assert _stable(old_prompt) == _stable(new_prompt), (old_prompt, new_prompt)
+        assert _stable(old_gallery) == _stable(new_gallery), (old_gallery, new_gallery)
+        assert list(old_gallery["metadata"]) == list(new_gallery["metadata"])
+        assert new_gallery["prompt_id"] == new_prompt["id"]
+
+
+def cpu_per_call(fn, iterations: int) -> float:
+    """Process-CPU in microseconden per aanroep (beste van drie rondes)."""
+    best = float("inf")
+    for _ in range(3):
+        start = time.process_time()
+        for i in range(iterations):
+            fn(SAMPLES[i & 1], "g1")
+        best = min(best, time.process_time() - start)
+    return best / iterations * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description="CPU per import: map_to_db voor en na")
+    parser.add_argument("--iterations", type=int, default=20000)
+    parser.add_argument("--out", default=None, help="Schrijf het resultaat ook als JSON")
+    args = parser.parse_args()
+
+    check_equivalent()
+    before = cpu_per_call(map_to_db_models, args.iterations)
+    after = cpu_per_call(server.map_to_db, args.iterations)
+    now = datetime.now(timezone.utc).isoformat()
+    batch = cpu_per_call(lambda creation, gallery_id: server.map_to_db(creation, gallery_id, now), args.iterations)
+
+    result = {
+        "iterations": args.iterations,
+        "models_us": round(before, 2),
+        "direct_us": round(after, 2),
+        "direct_shared_now_us": round(batch, 2),
+        "speedup": round(before / after, 2),
+    }
+    print(f"model-gebaseerd:          {before:7.2f} µs/import")
+    print(f"direct:                   {after:7.2f} µs/import  ({before / after:.1f}x)")
+    print(f"direct, gedeelde 'now':   {batch:7.2f} µs/import  ({before / batch:.1f}x)")
+    if args.out:
+        Path(args.out).write_text(json.dumps(result, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,205 @@
+"""
+Beeldverwerking voor lokaal opgeslagen bestanden.
+
+Deze functies draaien in een ProcessPoolExecutor (zie server.py): ze bevatten
+geen app-state en importeren alleen Pillow en numpy, zodat worker-processen
+deze module goedkoop kunnen laden en het decoderen de event loop nooit blokkeert.
+De hamming-helpers onderaan worden door de hash-index in server.py gebruikt.
+probe_dimensions leest alleen de header en is goedkoop genoeg om inline te draaien.
+"""
+import io
+import os
+import struct
+from pathlib import Path
+from typing import BinaryIO, Dict, List, Optional, Tuple
+
+import numpy as np
+from PIL import Image
+
+# Naam → langste zijde in pixels
+THUMBNAIL_SIZES: Dict[str, int] = {
+    "detail": 1024,
+    "grid": 320,
+    "preview": 64,
+}
+THUMBNAIL_QUALITY = 80
+
+
+def _save_webp(img: Image.Image, dest: Path):
+    tmp = dest.with_name(f".{dest.name}.tmp")
+    img.save(tmp, "WEBP", quality=THUMBNAIL_QUALITY, method=4)
+    os.replace(tmp, dest)
+
+
+def dhash(img: Image.Image) -> int:
+    """64-bit difference hash: per rij van 9x8 grijswaarden 'is de rechterbuur lichter?'."""
+    pixels = np.asarray(img.convert("L").resize((9, 8), Image.LANCZOS), dtype=np.int16)
+    bits = np.packbits(pixels[:, 1:] > pixels[:, :-1])
+    return int.from_bytes(bits.tobytes(), "big")
+
+
+def _open_rgb(src: str, max_size: int) -> Image.Image:
+    with Image.open(src) as img:
+        # JPEG: decodeer direct op een lagere schaal i.p.v. volledige resolutie
+        img.draft("RGB", (max_size, max_size))
+        has_alpha = img.mode in ("RGBA", "LA") or (img.mode == "P" and "transparency" in img.info)
+        return img.convert("RGBA" if has_alpha else "RGB")
+
+
+def process_image(src: str, dest_dir: str, sizes: Dict[str, int] = THUMBNAIL_SIZES) -> dict:
+    """
+    Thumbnails + dHash (als 16 hex-tekens) in één decode: {"thumbnails": {...}, "dhash": "..."}.
+    WebP per naam in `sizes`; kleinere formaten worden uit het vorige (grotere)
+    formaat geschaald, zodat het origineel maar één keer gedecodeerd wordt.
+    """
+    dest = Path(dest_dir)
+    dest.mkdir(parents=True, exist_ok=True)
+    ordered = sorted(sizes.items(), key=lambda kv: kv[1], reverse=True)
+    current = _open_rgb(src, ordered[0][1])
+    hash_hex = f"{dhash(current):016x}"
+
+    result = {}
+    for name, size in ordered:
+        current.thumbnail((size, size), Image.LANCZOS)
+        filename = f"{name}.webp"
+        _save_webp(current, dest / filename)
+        result[name] = filename
+    return {"thumbnails": result, "dhash": hash_hex}
+
+
+# ─── Afmetingen uit de header (zonder decoderen) ──────────────────────────────
+
+# Genoeg voor vrijwel elke header; JPEG's met grote EXIF-blokken worden per
+# segment doorzocht (seek), niet ingelezen.
+PROBE_MAX_BYTES = 64 * 1024
+
+# JPEG start-of-frame markers (alle behalve DHT/JPG/DAC)
+_JPEG_SOF = {0xC0, 0xC1, 0xC2, 0xC3, 0xC5, 0xC6, 0xC7, 0xC9, 0xCA, 0xCB, 0xCD, 0xCE, 0xCF}
+
+
+def _probe_jpeg(f: BinaryIO) -> Optional[Tuple[int, int]]:
+    f.seek(2)
+    while True:
+        marker = f.read(2)
+        if len(marker) < 2 or marker[0] != 0xFF:
+            return None
+        code = marker[1]
+        if code == 0xFF:  # opvulbytes
+            f.seek(-1, io.SEEK_CUR)
+            continue
+        if code == 0xD8 or 0xD0 <= code <= 0xD7:  # markers zonder lengte
+            continue
+        length = f.read(2)
+        if len(length) < 2:
+            return None
+        seg_len = struct.unpack(">H", length)[0]
+        if code in _JPEG_SOF:
+            frame = f.read(5)
+            if len(frame) < 5:
+                return None
+            height, width = struct.unpack(">HH", frame[1:5])
+            return width, height
+        if code == 0xDA:  # start of scan zonder frame header
+            return None
+        f.seek(seg_len - 2, io.SEEK_CUR)
+
+
+def probe_dimensions(f: BinaryIO) -> Optional[Tuple[int, int]]:
+    """
+    (breedte, hoogte) van een JPEG, PNG, GIF of WebP uit alleen de header, of
+    None als het formaat onbekend is of de header (nog) niet compleet is.
+    `f` is een open bestand of io.BytesIO met het begin van het bestand.
+    """
+    f.seek(0)
+    head = f.read(32)
+    if head.startswith(b"\x89PNG\r\n\x1a\n") and head[12:16] == b"IHDR" and len(head) >= 24:
+        return struct.unpack(">II", head[16:24])
+    if head[:6] in (b"GIF87a", b"GIF89a") and len(head) >= 10:
+        return struct.unpack("<HH", head[6:10])
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP" and len(head) >= 30:
+        chunk = head[12:16]
+        if chunk == b"VP8X":
+            return 1 + int.from_bytes(head[24:27], "little"), 1 + int.from_bytes(head[27:30], "little")
+        if chunk == b"VP8 " and head[23:26] == b"\x9d\x01\x2a":
+            w, h = struct.unpack("<HH", head[26:30])
+            return w & 0x3FFF, h & 0x3FFF
+        if chunk == b"VP8L" and head[20] == 0x2F:
+            bits = int.from_bytes(head[21:25], "little")
+            return (bits & 0x3FFF) + 1, ((bits >> 14) & 0x3FFF) + 1
+        return None
+    if head[:2] == b"\xff\xd8":
+        return _probe_jpeg(f)
+    return None
+
+
+def probe_file(path: str) -> Optional[Tuple[int, int]]:
+    try:
+        with open(path, "rb") as f:
+            return probe_dimensions(f)
+    except (OSError, struct.error):
+        return None
+
+
+def probe_files(paths: List[str]) -> List[Optional[Tuple[int, int]]]:
+    """Batchversie voor de backfill: één thread-hop voor een hele reeks bestanden."""
+    return [probe_file(p) for p in paths]
+
+
+# ─── Hamming-afstand op 64-bit hashes ────────────────────────────────────────
+
+def hamming(hashes: np.ndarray, target: int) -> np.ndarray:
+    """Afstand van `target` tot elke hash in `hashes` (uint64), gevectoriseerd."""
+    return np.bitwise_count(hashes ^ np.uint64(target))
+
+
+def near_duplicate_pairs(hashes: np.ndarray, max_distance: int) -> List[Tuple[int, int, int]]:
+    """
+    Alle paren (i, j, afstand) met i < j en afstand <= max_distance, zonder alle
+    paren te vergelijken (multi-index hashing). De 64 bits worden in
+    max_distance + 1 blokken gesplitst: twee hashes binnen die afstand zijn in
+    minstens één blok identiek, dus alleen hashes die een blok delen zijn kandidaat.
+    """
+    n_chunks = max_distance + 1
+    bounds = np.linspace(0, 64, n_chunks + 1).astype(int)
+    found: Dict[Tuple[int, int], int] = {}
+    for lo, hi in zip(bounds[:-1], bounds[1:]):
+        mask = np.uint64((1 << int(hi - lo)) - 1)
+        keys = (hashes >> np.uint64(lo)) & mask
+        order = np.argsort(keys, kind="stable")
+        sorted_keys = keys[order]
+        starts = np.flatnonzero(np.r_[True, sorted_keys[1:] != sorted_keys[:-1]])
+        ends = np.r_[starts[1:], len(order)]
+        for start, end in zip(starts, ends):
+            if end - start < 2:
+                continue
+            members = order[start:end]
+            dist = np.bitwise_count(hashes[members][:, None] ^ hashes[members][None, :])
+            ii, jj = np.nonzero(np.triu(dist <= max_distance, k=1))
+            for i, j in zip(ii, jj):
+                a, b = int(members[i]), int(members[j])
+                found[(min(a, b), max(a, b))] = int(dist[i, j])
+    return [(a, b, d) for (a, b), d in found.items()]
+
+
+def duplicate_groups(hashes: np.ndarray, max_distance: int) -> List[Tuple[List[int], int]]:
+    """Groepen (indices, grootste afstand binnen de groep) via union-find over near_duplicate_pairs."""
+    parent: Dict[int, int] = {}
+
+    def find(x: int) -> int:
+        while parent.setdefault(x, x) != x:
+            parent[x] = parent[parent[x]]
+            x = parent[x]
+        return x
+
+    worst: Dict[int, int] = {}
+    for a, b, d in near_duplicate_pairs(hashes, max_distance):
+        ra, rb = find(a), find(b)
+        if ra != rb:
+            parent[rb] = ra
+            worst[ra] = max(worst.get(ra, 0), worst.pop(rb, 0), d)
+        else:
+            worst[ra] = max(worst.get(ra, 0), d)
+    groups: Dict[int, List[int]] = {}
+    for x in parent:
+        groups.setdefault(find(x), []).append(x)
+    return [(members, worst.get(root, 0)) for root, members in groups.items()]
@@ -1,16 +1,46 @@
-from fastapi import FastAPI, APIRouter, HTTPException
+from fastapi import FastAPI, APIRouter, HTTPException, Query, Request, Response
+from fastapi.encoders import jsonable_encoder
+from fastapi.routing import APIRoute
+from fastapi.responses import FileResponse, ORJSONResponse, StreamingResponse
 from fastapi.staticfiles import StaticFiles
+from starlette.staticfiles import NotModifiedResponse
 from dotenv import load_dotenv
+from starlette.datastructures import Headers, MutableHeaders
 from starlette.middleware.cors import CORSMiddleware
 from motor.motor_asyncio import AsyncIOMotorClient
 import os
+import json
+import time
+import bisect
+import asyncio
+import threading
+import functools
+import contextvars
+import io
+import re
+import csv
+import zlib
+import base64
+import shutil
+import hashlib
+import tempfile
+import importlib.util
+import multiprocessing
 import logging
 from pathlib import Path
 from pydantic import BaseModel, Field
-from typing import List, Optional, Any, Dict
+from typing import List, Optional, Any, Dict, Tuple
 import uuid
-from datetime import datetime, timezone
+from datetime import datetime, timedelta, timezone
+from concurrent.futures import ProcessPoolExecutor
+import anyio
 import httpx
+import numpy as np
+import orjson
+from pymongo import ASCENDING, DESCENDING, TEXT, CursorType, IndexModel, ReturnDocument, UpdateOne, monitoring
+from pymongo.errors import BulkWriteError, CollectionInvalid, ConnectionFailure, DuplicateKeyError, OperationFailure
+
+import imaging
 
 
 ROOT_DIR = Path(__file__).parent
@@ -19,16 +49,293 @@ load_dotenv(ROOT_DIR / '.env')
 DOWNLOAD_DIR = ROOT_DIR / 'downloads'
 DOWNLOAD_DIR.mkdir(exist_ok=True)
 
+# ═══════════════════════════════════════════════════════════════════════════════
+# METRICS  (Prometheus tekstformaat op /api/metrics + Server-Timing header)
+# ═══════════════════════════════════════════════════════════════════════════════
+
+# Bewust zonder prometheus_client: een handvol counters en histogrammen met een
+# vaste set labels is genoeg, en het tekstformaat is eenvoudig. Metrics worden
+# ook vanuit motor's executor-threads bijgewerkt (CommandListener), vandaar de locks.
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+_METRICS: List["_Metric"] = []
+
+
+def _label_value(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help: str, labels: Tuple[str, ...] = ()):
+        self.name, self.help, self.labels = name, help, labels
+        self._series: Dict[tuple, Any] = {}
+        self._lock = threading.Lock()
+        _METRICS.append(self)
+
+    def _labels(self, values: tuple, extra: str = "") -> str:
+        pairs = [f'{k}="{_label_value(v)}"' for k, v in zip(self.labels, values)]
+        if extra:
+            pairs.append(extra)
+        return "{" + ",".join(pairs) + "}" if pairs else ""
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        with self._lock:
+            for values in sorted(self._series):
+                lines += self._render_series(values, self._series[values])
+        return lines
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, *labels: str, amount: float = 1):
+        with self._lock:
+            self._series[labels] = self._series.get(labels, 0) + amount
+
+    def _render_series(self, values: tuple, value: float) -> List[str]:
+        return [f"{self.name}{self._labels(values)} {value}"]
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def dec(self, *labels: str, amount: float = 1):
+        self.inc(*labels, amount=-amount)
+
+    def set(self, value: float, *labels: str):
+        with self._lock:
+            self._series[labels] = value
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labels: Tuple[str, ...] = (), buckets: tuple = LATENCY_BUCKETS):
+        super().__init__(name, help, labels)
+        self.buckets = buckets
+
+    def observe(self, value: float, *labels: str):
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                # [aantal per bucket (niet cumulatief), som, aantal]
+                series = self._series[labels] = [[0] * len(self.buckets), 0.0, 0]
+            idx = bisect.bisect_left(self.buckets, value)
+            if idx < len(self.buckets):
+                series[0][idx] += 1
+            series[1] += value
+            series[2] += 1
+
+    def _render_series(self, values: tuple, value: list) -> List[str]:
+        counts, total, n = value
+        lines, cumulative = [], 0
+        for bound, count in zip(self.buckets, counts):
+            cumulative += count
+            le = f'le="{bound}"'
+            lines.append(f"{self.name}_bucket{self._labels(values, le)} {cumulative}")
+        inf = 'le="+Inf"'
+        lines.append(f"{self.name}_bucket{self._labels(values, inf)} {n}")
+        lines.append(f"{self.name}_sum{self._labels(values)} {total}")
+        lines.append(f"{self.name}_count{self._labels(values)} {n}")
+        return lines
+
+
+def render_metrics() -> str:
+    return "\n".join(line for metric in _METRICS for line in metric.render()) + "\n"
+
+
+HTTP_REQUESTS = Counter("nc_http_requests_total", "HTTP requests per route en status", ("method", "route", "status"))
+HTTP_DURATION = Histogram("nc_http_request_duration_seconds", "Request latency per route", ("method", "route"))
+HTTP_IN_FLIGHT = Gauge("nc_http_requests_in_flight", "Requests die nu verwerkt worden (incl. open SSE streams)")
+MONGO_DURATION = Histogram("nc_mongo_command_duration_seconds", "Mongo latency per collection en command", ("collection", "command"))
+MONGO_FAILURES = Counter("nc_mongo_command_failures_total", "Mislukte Mongo commands", ("collection", "command"))
+DOWNLOAD_BYTES = Counter("nc_download_bytes_total", "Gedownloade bytes (nieuwe blobs)")
+DOWNLOAD_FAILURES = Counter("nc_download_failures_total", "Mislukte downloads van afzonderlijke bestanden")
+DUPLICATE_IMPORTS = Counter("nc_duplicate_imports_total", "Imports die al bestonden")
+INGEST_PENDING = Gauge("nc_ingest_pending", "Gejournaliseerde imports die nog niet in Mongo staan")
+
+
+# ─── Tijd per request (Server-Timing) ────────────────────────────────────────
+
+class RequestTiming:
+    """
+    Tijdlijn van één request: parse (tot de endpoint-functie start), db (som van
+    Mongo commands, ook als ze parallel lopen) en serialize (na de endpoint, plus
+    expliciete _json_response calls). Gedeeld via een ContextVar; motor voert
+    commands uit met een kopie van de context, dus de CommandListener ziet hem ook.
+    """
+    __slots__ = ("start", "endpoint_start", "endpoint_end", "db", "serialize")
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.endpoint_start: Optional[float] = None
+        self.endpoint_end: Optional[float] = None
+        self.db = 0.0
+        self.serialize = 0.0
+
+    def header(self) -> str:
+        now = time.perf_counter()
+        parse = (self.endpoint_start or now) - self.start
+        serialize = self.serialize + (now - self.endpoint_end if self.endpoint_end else 0.0)
+        return ", ".join(
+            f"{name};dur={seconds * 1000:.1f}"
+            for name, seconds in (("parse", parse), ("db", self.db), ("serialize", serialize), ("total", now - self.start))
+        )
+
+
+_request_timing: contextvars.ContextVar[Optional[RequestTiming]] = contextvars.ContextVar("request_timing", default=None)
+
+
+def _timed_endpoint(endpoint):
+    @functools.wraps(endpoint)
+    async def wrapper(*args, **kwargs):
+        timing = _request_timing.get()
+        if timing is not None:
+            timing.endpoint_start = time.perf_counter()
+        try:
+            return await endpoint(*args, **kwargs)
+        finally:
+            if timing is not None:
+                timing.endpoint_end = time.perf_counter()
+    return wrapper
+
+
+class TimedRoute(APIRoute):
+    """APIRoute die begin en eind van de endpoint-functie vastlegt (parse vs. serialize)."""
+
+    def __init__(self, path: str, endpoint, **kwargs):
+        if asyncio.iscoroutinefunction(endpoint):
+            endpoint = _timed_endpoint(endpoint)
+        super().__init__(path, endpoint, **kwargs)
+
+
+class MongoMetrics(monitoring.CommandListener):
+    """Latency per collection/command, en de db-tijd van het lopende request."""
+
+    def __init__(self):
+        self._pending: Dict[int, Tuple[str, str]] = {}
+
+    def started(self, event):
+        name = event.command_name
+        target = event.command.get("collection" if name == "getMore" else name)
+        self._pending[event.request_id] = (target if isinstance(target, str) else "", name)
+
+    def _finish(self, event, failed: bool):
+        collection, name = self._pending.pop(event.request_id, ("", event.command_name))
+        seconds = event.duration_micros / 1e6
+        MONGO_DURATION.observe(seconds, collection, name)
+        if failed:
+            MONGO_FAILURES.inc(collection, name)
+        timing = _request_timing.get()
+        if timing is not None:
+            timing.db += seconds
+
+    def succeeded(self, event):
+        self._finish(event, False)
+
+    def failed(self, event):
+        self._finish(event, True)
+
+
+mongo_metrics = MongoMetrics()
+
+
+def _route_template(scope) -> str:
+    """Route-sjabloon als label (/api/gallery-items/{item_id}), nooit het concrete pad."""
+    route = scope.get("route")
+    if route is not None:
+        return route.path
+    if isinstance(scope.get("endpoint"), StaticFiles):
+        return f"{scope.get('root_path', '')}/{{path}}"
+    return "unmatched"
+
+
+class MetricsMiddleware:
+    """Latency, status en in-flight per route, en de Server-Timing header op elke response."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        timing = RequestTiming()
+        token = _request_timing.set(timing)
+        status = 500
+
+        async def send_with_timing(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                MutableHeaders(scope=message).append("Server-Timing", timing.header())
+            await send(message)
+
+        HTTP_IN_FLIGHT.inc()
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            HTTP_IN_FLIGHT.dec()
+            route = _route_template(scope)
+            HTTP_DURATION.observe(time.perf_counter() - timing.start, scope["method"], route)
+            HTTP_REQUESTS.inc(scope["method"], route, str(status))
+            _request_timing.reset(token)
+
 mongo_url = os.environ['MONGO_URL']
-client = AsyncIOMotorClient(mongo_url)
+# Kort houden: bij een onbereikbare database spoolt /import (zie MongoBreaker)
+# in plaats van 30 s (pymongo default) op server selection te wachten.
+MONGO_SERVER_SELECTION_MS = int(os.environ.get("MONGO_SERVER_SELECTION_MS", "2000"))
+client = AsyncIOMotorClient(
+    mongo_url, event_listeners=[mongo_metrics], serverSelectionTimeoutMS=MONGO_SERVER_SELECTION_MS
+)
 db = client[os.environ['DB_NAME']]
 
-app = FastAPI()
-api_router = APIRouter(prefix="/api")
+app = FastAPI(default_response_class=ORJSONResponse)
+api_router = APIRouter(prefix="/api", route_class=TimedRoute)
 
 logger = logging.getLogger(__name__)
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
 
+# ═══════════════════════════════════════════════════════════════════════════════
+# HTTP CLIENT  (gedeeld voor alle uitgaande requests)
+# ═══════════════════════════════════════════════════════════════════════════════
+
+# Eén client voor de hele app: verbindingen naar de NightCafe CDN blijven open
+# (keep-alive) en worden hergebruikt, i.p.v. een TCP+TLS handshake per item.
+HTTP_MAX_CONNECTIONS = int(os.environ.get("HTTP_MAX_CONNECTIONS", "32"))
+HTTP_MAX_KEEPALIVE = int(os.environ.get("HTTP_MAX_KEEPALIVE", "16"))
+HTTP_KEEPALIVE_EXPIRY = float(os.environ.get("HTTP_KEEPALIVE_EXPIRY", "60"))
+# HTTP/2 multiplexing vereist het optionele `h2` pakket (pip install httpx[http2])
+HTTP2_ENABLED = os.environ.get("HTTP2_ENABLED", "1") == "1" and importlib.util.find_spec("h2") is not None
+
+_http_client: Optional[httpx.AsyncClient] = None
+
+
+def get_http_client() -> httpx.AsyncClient:
+    """De gedeelde AsyncClient; wordt bij eerste gebruik aangemaakt en bij shutdown gesloten."""
+    global _http_client
+    if _http_client is None or _http_client.is_closed:
+        _http_client = httpx.AsyncClient(
+            timeout=httpx.Timeout(30, connect=10),
+            follow_redirects=True,
+            http2=HTTP2_ENABLED,
+            limits=httpx.Limits(
+                max_connections=HTTP_MAX_CONNECTIONS,
+                max_keepalive_connections=HTTP_MAX_KEEPALIVE,
+                keepalive_expiry=HTTP_KEEPALIVE_EXPIRY,
+            ),
+        )
+    return _http_client
+
+
+async def close_http_client():
+    global _http_client
+    if _http_client is not None:
+        await _http_client.aclose()
+        _http_client = None
+
 # ═══════════════════════════════════════════════════════════════════════════════
 # INPUT MODEL  (wat de extensie stuurt – camelCase)
 # ═══════════════════════════════════════════════════════════════════════════════
@@ -123,61 +430,90 @@ def _parse_seed(val: Optional[str]) -> Optional[int]:
         return None
 
 
-def map_to_db(creation: CreationImport, gallery_id: str) -> tuple[dict, dict]:
+# Ingest zonder pydantic-rondes: CreationImport is al gevalideerd en alles wat
+# hieronder wordt toegevoegd genereert de server zelf. De documenten worden
+# direct gebouwd op sjablonen met de defaults van Prompt en GalleryItem, zodat
+# die modellen de bron van het schema blijven (velden, volgorde, defaults).
+
+def _model_template(model) -> dict:
+    return {name: field.default for name, field in model.model_fields.items()}
+
+
+_PROMPT_TEMPLATE = _model_template(Prompt)
+_GALLERY_TEMPLATE = _model_template(GalleryItem)
+# Extensie-metadata die al een vaste plek heeft in nc_metadata
+_NC_METADATA_RESERVED = frozenset((
+    "source", "source_url", "nightcafe_creation_id", "all_images", "is_published", "video_prompt",
+    "revised_prompt", "initial_resolution", "sampling_method", "runtime", "extracted_at", "samplingMethod",
+))
+
+
+def map_to_db(creation: CreationImport, gallery_id: str, now: Optional[str] = None) -> tuple[dict, dict]:
     """
     Vertaalt camelCase extensie-data naar db-init.js schema documenten.
     NightCafe-specifieke data wordt opgeslagen in metadata (gallery_items) of
-    als extra velden (prompts) zodat niets verloren gaat.
+    als extra velden (prompts) zodat niets verloren gaat. `now` laat een batch
+    één timestamp delen.
     """
+    now = now or datetime.now(timezone.utc).isoformat()
     ext_meta = creation.metadata or {}
     prompt_text = creation.prompt or creation.videoPrompt
-
-    prompt = Prompt(
-        title=creation.title,
-        content=prompt_text,
-        revised_prompt=creation.revisedPrompt,
-        model=creation.model,
-        seed=_parse_seed(creation.seed),
-        aspect_ratio=creation.aspectRatio,
-        gallery_item_id=gallery_id,
-    )
-
-    # NightCafe-specifieke metadata voor gallery_items
-    nc_metadata = {
-        "source": creation.source or "NightCafe Studio",
-        "source_url": creation.url,
-        "nightcafe_creation_id": creation.creationId,
-        "all_images": creation.allImages,
-        "is_published": creation.isPublished,
-        "video_prompt": creation.videoPrompt,
+    prompt_id = str(uuid.uuid4())
+
+    prompt = {
+        **_PROMPT_TEMPLATE,
+        "id": prompt_id,
+        "title": creation.title,
+        "content": prompt_text,
+        "created_at": now,
+        "updated_at": now,
+        "model": creation.model,
         "revised_prompt": creation.revisedPrompt,
-        "initial_resolution": creation.initialResolution,
-        "sampling_method": ext_meta.get("samplingMethod"),
-        "runtime": ext_meta.get("runtime"),
-        "extracted_at": creation.extractedAt,
+        "seed": _parse_seed(creation.seed),
+        "aspect_ratio": creation.aspectRatio,
+        "gallery_item_id": gallery_id,
     }
+
+    # NightCafe-specifieke metadata voor gallery_items (zonder None waarden)
+    nc_metadata = {}
+    for key, value in (
+        ("source", creation.source or "NightCafe Studio"),
+        ("source_url", creation.url),
+        ("nightcafe_creation_id", creation.creationId),
+        ("all_images", creation.allImages),
+        ("is_published", creation.isPublished),
+        ("video_prompt", creation.videoPrompt),
+        ("revised_prompt", creation.revisedPrompt),
+        ("initial_resolution", creation.initialResolution),
+        ("sampling_method", ext_meta.get("samplingMethod")),
+        ("runtime", ext_meta.get("runtime")),
+        ("extracted_at", creation.extractedAt),
+    ):
+        if value is not None:
+            nc_metadata[key] = value
     # Voeg overige extensie-metadata toe
-    for k, v in ext_meta.items():
-        if k not in ("samplingMethod", "runtime") and k not in nc_metadata:
-            nc_metadata[k] = v
-    # Verwijder None waarden
-    nc_metadata = {k: v for k, v in nc_metadata.items() if v is not None}
-
-    gallery_item = GalleryItem(
-        id=gallery_id,
-        title=creation.title,
-        image_url=creation.imageUrl,
-        prompt_used=prompt_text,
-        model_used=creation.model,
-        model=creation.model,
-        aspect_ratio=creation.aspectRatio,
-        start_image=creation.startImageUrl,
-        prompt_id=prompt.id,
-        metadata=nc_metadata,
-        media_type=creation.creationType or "image",
-    )
+    for key, value in ext_meta.items():
+        if value is not None and key not in _NC_METADATA_RESERVED:
+            nc_metadata[key] = value
+
+    gallery_item = {
+        **_GALLERY_TEMPLATE,
+        "id": gallery_id,
+        "title": creation.title,
+        "image_url": creation.imageUrl,
+        "prompt_used": prompt_text,
+        "model_used": creation.model,
+        "aspect_ratio": creation.aspectRatio,
+        "start_image": creation.startImageUrl,
+        "created_at": now,
+        "updated_at": now,
+        "prompt_id": prompt_id,
+        "model": creation.model,
+        "metadata": nc_metadata,
+        "media_type": creation.creationType or "image",
+    }
 
-    return prompt.model_dump(), gallery_item.model_dump()
+    return prompt, gallery_item
 
 
 # ═══════════════════════════════════════════════════════════════════════════════
@@ -224,13 +560,14 @@ async def import_health():
         "timestamp": datetime.now(timezone.utc).isoformat()
     }
 
-@api_router.get("/import/status")
-async def check_import_status(creationId: str):
-    """Controleer of een creatie al geïmporteerd is (gebruikt door de browser extensie)."""
-    item = await db.gallery_items.find_one(
-        {"metadata.nightcafe_creation_id": creationId},
-        {"_id": 0, "id": 1, "title": 1, "created_at": 1, "media_type": 1}
-    )
+IMPORT_STATUS_PROJECTION = {
+    "_id": 0, "id": 1, "title": 1, "created_at": 1, "media_type": 1,
+    "metadata.nightcafe_creation_id": 1,
+}
+IMPORT_STATUS_BATCH_MAX = 1000
+
+
+def _import_status(item: Optional[dict]) -> dict:
     if item:
         return {
             "exists": True,
@@ -241,39 +578,169 @@ async def check_import_status(creationId: str):
         }
     return {"exists": False}
 
+
+class ImportStatusBatch(BaseModel):
+    creationIds: List[str]
+
+
+@api_router.get("/import/status")
+async def check_import_status(creationId: str):
+    """
+    Controleer of een creatie al geïmporteerd is (gebruikt door de browser extensie).
+    Gespoolde imports tellen mee; is de database onbereikbaar, dan antwoordt
+    alleen de spool (met "offline": true).
+    """
+    pending = ingest_buffer.pending_item(creationId)
+    if pending:
+        return _import_status(pending)
+    if not mongo_breaker.allow():
+        return {**_import_status(None), "offline": True}
+    try:
+        item = await db.gallery_items.find_one(
+            {"metadata.nightcafe_creation_id": creationId},
+            IMPORT_STATUS_PROJECTION
+        )
+    except ConnectionFailure as e:
+        mongo_breaker.failure(e)
+        return {**_import_status(None), "offline": True}
+    mongo_breaker.success()
+    return _import_status(item)
+
+@api_router.post("/import/status/batch")
+async def check_import_status_batch(body: ImportStatusBatch):
+    """
+    Import-status voor veel creaties tegelijk (lijst-pagina's en bulk runs).
+    Eén $in query in plaats van één request per creationId.
+    """
+    creation_ids = list(dict.fromkeys(body.creationIds))
+    if len(creation_ids) > IMPORT_STATUS_BATCH_MAX:
+        raise HTTPException(413, f"Maximaal {IMPORT_STATUS_BATCH_MAX} creationIds per request")
+
+    found: Dict[str, dict] = {}
+    offline = False
+    for cid in creation_ids:
+        if pending := ingest_buffer.pending_item(cid):
+            found[cid] = pending
+    lookup = [cid for cid in creation_ids if cid not in found]
+    if lookup and not mongo_breaker.allow():
+        offline = True
+    elif lookup:
+        try:
+            cursor = db.gallery_items.find(
+                {"metadata.nightcafe_creation_id": {"$in": lookup}},
+                IMPORT_STATUS_PROJECTION
+            )
+            async for item in cursor:
+                found[item["metadata"]["nightcafe_creation_id"]] = item
+        except ConnectionFailure as e:
+            mongo_breaker.failure(e)
+            offline = True
+        else:
+            mongo_breaker.success()
+
+    result = {
+        "total": len(creation_ids),
+        "existing": len(found),
+        "results": {cid: _import_status(found.get(cid)) for cid in creation_ids},
+    }
+    if offline:
+        result["offline"] = True
+    return result
+
 @api_router.post("/import", status_code=201)
 async def import_creation(creation: CreationImport):
     """
     Ontvang een NightCafe creatie en sla op in:
       - prompts        → prompt-tekst + AI-instellingen
       - gallery_items  → afbeelding + koppeling prompt_id (matcht app-schema)
+    Met INGEST_MODE=buffered, of als de database onbereikbaar is, gaat de
+    creatie via het journal en volgt 202 (zie IngestBuffer / MongoBreaker).
     """
-    # ── Duplicate check op nightcafe_creation_id (nu in metadata) ──
-    if creation.creationId:
+    pending = ingest_buffer.pending_item(creation.creationId)
+    if pending:
+        # Zelfde status (201) en vorm als een duplicate die al in Mongo staat
+        return _duplicate_import(pending["id"])
+
+    prompt_doc, gallery_doc = map_to_db(creation, str(uuid.uuid4()))
+    if INGEST_BUFFERED:
+        # Niet (meer) in de buffer: misschien al weggeschreven. Zonder deze
+        # lookup zou een re-import na de flush 202 krijgen en stil wegvallen.
+        existing = await _stored_import(creation.creationId)
+        if existing:
+            return _duplicate_import(existing["id"])
+        return await _spool_import(prompt_doc, gallery_doc, offline=False)
+    if not mongo_breaker.allow():
+        return await _spool_import(prompt_doc, gallery_doc, offline=True)
+    try:
+        result = await _import_direct(creation, prompt_doc, gallery_doc)
+    except ConnectionFailure as e:
+        # Dezelfde documenten spoolen: wat al wel geschreven was geeft bij het
+        # flushen een duplicate key op id en wordt aangevuld, niet verdubbeld.
+        mongo_breaker.failure(e)
+        return await _spool_import(prompt_doc, gallery_doc, offline=True)
+    mongo_breaker.success()
+    return result
+
+
+def _duplicate_import(item_id: str) -> dict:
+    DUPLICATE_IMPORTS.inc()
+    return {
+        "success": True,
+        "id": item_id,
+        "prompt_id": None,
+        "duplicate": True,
+        "message": "Al eerder geïmporteerd"
+    }
+
+
+async def _stored_import(creation_id: Optional[str]) -> Optional[dict]:
+    """Bestaand item met deze creation id (unique index); None als Mongo onbereikbaar is."""
+    if not creation_id or not mongo_breaker.allow():
+        return None
+    try:
         existing = await db.gallery_items.find_one(
-            {"metadata.nightcafe_creation_id": creation.creationId},
-            {"_id": 0, "id": 1, "title": 1, "created_at": 1}
+            {"metadata.nightcafe_creation_id": creation_id}, {"_id": 0, "id": 1}
         )
+    except ConnectionFailure as e:
+        mongo_breaker.failure(e)
+        return None
+    mongo_breaker.success()
+    return existing
+
+
+async def _import_direct(creation: CreationImport, prompt_doc: dict, gallery_doc: dict) -> dict:
+    # ── Duplicate check op nightcafe_creation_id via de unique index ──
+    # Upsert met $setOnInsert: bestaat de creatie al, dan komt het bestaande
+    # document terug; gelijktijdige imports kunnen zo geen dubbele rijen maken.
+    if creation.creationId:
+        try:
+            existing = await db.gallery_items.find_one_and_update(
+                {"metadata.nightcafe_creation_id": creation.creationId},
+                {"$setOnInsert": gallery_doc},
+                projection={"_id": 0, "id": 1, "title": 1, "created_at": 1},
+                upsert=True,
+                return_document=ReturnDocument.BEFORE,
+            )
+        except DuplicateKeyError:
+            # Een gelijktijdige upsert was ons net voor
+            existing = await db.gallery_items.find_one(
+                {"metadata.nightcafe_creation_id": creation.creationId},
+                {"_id": 0, "id": 1, "title": 1, "created_at": 1}
+            )
         if existing:
             logger.info(f"Duplicate: {creation.creationId}")
-            return {
-                "success": True,
-                "id": existing["id"],
-                "prompt_id": None,
-                "duplicate": True,
-                "message": "Al eerder geïmporteerd"
-            }
-
-    gallery_id = str(uuid.uuid4())
-    prompt_doc, gallery_doc = map_to_db(creation, gallery_id)
+            return _duplicate_import(existing["id"])
+    else:
+        await db.gallery_items.insert_one(gallery_doc)
+    gallery_doc.pop("_id", None)
+    await event_bus.publish("import", {"items": [gallery_doc]})
+    logger.info(f"Gallery item aangemaakt: {gallery_doc['id']} – {gallery_doc.get('title')}")
 
     # Schrijf naar prompts tabel
     await db.prompts.insert_one(prompt_doc)
-    logger.info(f"Prompt aangemaakt: {prompt_doc['id']} – {(prompt_doc.get('text') or '')[:60]}")
-
-    # Schrijf naar gallery_items tabel
-    await db.gallery_items.insert_one(gallery_doc)
-    logger.info(f"Gallery item aangemaakt: {gallery_doc['id']} – {gallery_doc.get('title')}")
+    logger.info(f"Prompt aangemaakt: {prompt_doc['id']} – {(prompt_doc.get('content') or '')[:60]}")
+    await stats_cache.record(_stats_delta([gallery_doc], prompts=1))
+    _gallery_changed()
 
     return {
         "success": True,
@@ -287,64 +754,1330 @@ async def import_creation(creation: CreationImport):
         }
     }
 
+# ─── Batch import ─────────────────────────────────────────────────────────────
+
+IMPORT_BATCH_MAX = 500
+
+
+def _batch_result(index: int, creation: CreationImport, status: str, **extra) -> dict:
+    return {"index": index, "creationId": creation.creationId, "status": status, **extra}
+
+
+def _bulk_write_errors(exc: BulkWriteError) -> Dict[int, dict]:
+    """Index (binnen de insert_many lijst) → write error."""
+    return {err["index"]: err for err in exc.details.get("writeErrors", [])}
+
+
+@api_router.post("/import/batch")
+async def import_creations_batch(creations: List[CreationImport]):
+    """
+    Importeer een lijst creaties in één request.
+      - duplicates → één $in query op metadata.nightcafe_creation_id
+      - schrijven  → unordered insert_many op gallery_items en daarna prompts
+    Per creatie komt een resultaat terug: created / duplicate / error.
+    """
+    if len(creations) > IMPORT_BATCH_MAX:
+        raise HTTPException(413, f"Maximaal {IMPORT_BATCH_MAX} creaties per batch")
+
+    results: List[Optional[dict]] = [None] * len(creations)
+
+    # ── Duplicate check: één round trip voor de hele batch ──
+    creation_ids = list({c.creationId for c in creations if c.creationId})
+    existing: Dict[str, str] = {}
+    if creation_ids:
+        cursor = db.gallery_items.find(
+            {"metadata.nightcafe_creation_id": {"$in": creation_ids}},
+            {"_id": 0, "id": 1, "metadata.nightcafe_creation_id": 1}
+        )
+        async for doc in cursor:
+            existing[doc["metadata"]["nightcafe_creation_id"]] = doc["id"]
+
+    prompt_docs: List[dict] = []
+    gallery_docs: List[dict] = []
+    pending: List[int] = []           # creations-index per gallery_docs positie
+    batch_ids: Dict[str, str] = {}    # creationId → gallery id binnen deze batch
+
+    now = datetime.now(timezone.utc).isoformat()
+    for i, creation in enumerate(creations):
+        cid = creation.creationId
+        if cid and cid in existing:
+            results[i] = _batch_result(i, creation, "duplicate", id=existing[cid], prompt_id=None)
+            continue
+        if cid and cid in batch_ids:
+            results[i] = _batch_result(i, creation, "duplicate", id=batch_ids[cid], prompt_id=None)
+            continue
+        try:
+            prompt_doc, gallery_doc = map_to_db(creation, str(uuid.uuid4()), now)
+        except Exception as e:
+            results[i] = _batch_result(i, creation, "error", error=str(e))
+            continue
+        if cid:
+            batch_ids[cid] = gallery_doc["id"]
+        prompt_docs.append(prompt_doc)
+        gallery_docs.append(gallery_doc)
+        pending.append(i)
+
+    # ── Gallery items eerst, zodat een mislukte insert geen wees-prompt achterlaat ──
+    gallery_errors: Dict[int, dict] = {}
+    if gallery_docs:
+        try:
+            await db.gallery_items.insert_many(gallery_docs, ordered=False)
+        except BulkWriteError as e:
+            gallery_errors = _bulk_write_errors(e)
+
+    # Duplicate key: een gelijktijdige import was ons voor → bestaande id opzoeken
+    # (zonder creation id kan het alleen een botsing op id zijn: dat blijft een fout)
+    raced: Dict[str, int] = {}
+    for pos, err in gallery_errors.items():
+        cid = (gallery_docs[pos].get("metadata") or {}).get("nightcafe_creation_id")
+        if err.get("code") == 11000 and cid:
+            raced[cid] = pos
+    raced_ids: Dict[str, str] = {}
+    if raced:
+        cursor = db.gallery_items.find(
+            {"metadata.nightcafe_creation_id": {"$in": list(raced)}},
+            {"_id": 0, "id": 1, "metadata.nightcafe_creation_id": 1}
+        )
+        async for doc in cursor:
+            cid = (doc.get("metadata") or {}).get("nightcafe_creation_id")
+            if cid:
+                raced_ids[cid] = doc["id"]
+
+    inserted_prompts = [p for pos, p in enumerate(prompt_docs) if pos not in gallery_errors]
+    prompt_errors: Dict[int, dict] = {}
+    if inserted_prompts:
+        try:
+            await db.prompts.insert_many(inserted_prompts, ordered=False)
+        except BulkWriteError as e:
+            failed = {inserted_prompts[idx]["id"]: err for idx, err in _bulk_write_errors(e).items()}
+            prompt_errors = {
+                pos: failed[p["id"]] for pos, p in enumerate(prompt_docs) if p["id"] in failed
+            }
+
+    for pos, i in enumerate(pending):
+        creation = creations[i]
+        if creation.creationId in raced_ids and raced.get(creation.creationId) == pos:
+            results[i] = _batch_result(
+                i, creation, "duplicate", id=raced_ids[creation.creationId], prompt_id=None
+            )
+        elif pos in gallery_errors:
+            results[i] = _batch_result(i, creation, "error", error=gallery_errors[pos].get("errmsg"))
+        elif pos in prompt_errors:
+            results[i] = _batch_result(
+                i, creation, "created", id=gallery_docs[pos]["id"], prompt_id=None,
+                error=prompt_errors[pos]["errmsg"],
+            )
+        else:
+            results[i] = _batch_result(
+                i, creation, "created", id=gallery_docs[pos]["id"], prompt_id=prompt_docs[pos]["id"]
+            )
+
+    if gallery_docs:
+        created_docs = [
+            {k: v for k, v in doc.items() if k != "_id"}
+            for pos, doc in enumerate(gallery_docs) if pos not in gallery_errors
+        ]
+        await stats_cache.record(_stats_delta(created_docs, prompts=len(inserted_prompts) - len(prompt_errors)))
+        _gallery_changed()
+        if created_docs:
+            await event_bus.publish("import", {"items": created_docs})
+
+    created = sum(1 for r in results if r["status"] == "created")
+    duplicates = sum(1 for r in results if r["status"] == "duplicate")
+    DUPLICATE_IMPORTS.inc(amount=duplicates)
+    errors = sum(1 for r in results if r["status"] == "error")
+    logger.info(f"Batch import: {created} aangemaakt, {duplicates} duplicates, {errors} fouten")
+
+    return {
+        "success": errors == 0,
+        "total": len(creations),
+        "created": created,
+        "duplicates": duplicates,
+        "errors": errors,
+        "results": results,
+    }
+
+# ─── Gebufferde ingest (write-behind met journal) ────────────────────────────
+# Optioneel (INGEST_MODE=buffered): /import schrijft de kant-en-klare documenten
+# als één regel naar een lokaal append-only journal, fsynct (gegroepeerd voor
+# gelijktijdige requests) en antwoordt 202. Een flusher schrijft ze elke
+# INGEST_FLUSH_ITEMS items of INGEST_FLUSH_MS milliseconden met insert_many naar
+# Mongo en compacteert daarna het journal. Bij startup wordt het journal
+# opnieuw afgespeeld; al weggeschreven items geven dan een duplicate key en
+# worden overgeslagen. Duplicates die al in Mongo staan worden pas bij het
+# flushen herkend: het bestaande item wint, de voorlopige id vervalt.
+
+INGEST_BUFFERED = os.environ.get("INGEST_MODE", "direct") == "buffered"
+INGEST_JOURNAL_PATH = Path(os.environ.get("INGEST_JOURNAL_PATH", str(ROOT_DIR / "ingest.journal")))
+INGEST_FLUSH_ITEMS = int(os.environ.get("INGEST_FLUSH_ITEMS", "500"))
+INGEST_FLUSH_MS = int(os.environ.get("INGEST_FLUSH_MS", "200"))
+# Maximaal aantal items per insert_many vanuit de buffer
+INGEST_BATCH_FLUSH_MAX = 5000
+
+
+class IngestBuffer:
+    def __init__(self, path: Path, flush_items: int, flush_interval: float):
+        self.path = path
+        self.flush_items = flush_items
+        self.flush_interval = flush_interval
+        # (journal-regel, prompt_doc, gallery_doc): gejournaliseerd, nog niet in Mongo
+        self._pending: List[Tuple[bytes, dict, dict]] = []
+        self._pending_by_cid: Dict[str, dict] = {}
+        self._writes: List[Tuple[bytes, dict, dict, asyncio.Future]] = []
+        self._write_wake = asyncio.Event()
+        self._flush_wake = asyncio.Event()
+        self._file_lock = asyncio.Lock()
+        self._flush_lock = asyncio.Lock()
+        self._file = None
+        self._tasks: List[asyncio.Task] = []
+        # Pas flushen als de indexen er zijn (unique creation id), zie enable_flush
+        self.flush_enabled = False
+        self.last_flush_at: Optional[str] = None
+        self.last_error: Optional[str] = None
+
+    @property
+    def pending(self) -> int:
+        return len(self._pending)
+
+    async def enable_flush(self):
+        self.flush_enabled = True
+        if self._pending:
+            self._flush_wake.set()
+
+    def pending_item(self, creation_id: Optional[str]) -> Optional[dict]:
+        return self._pending_by_cid.get(creation_id) if creation_id else None
+
+    async def start(self):
+        replayed = await asyncio.to_thread(self._read_journal)
+        self._file = await asyncio.to_thread(open, self.path, "ab")
+        for line, prompt_doc, gallery_doc in replayed:
+            self._add_pending(line, prompt_doc, gallery_doc)
+        if replayed:
+            logger.info(f"Ingest journal: {len(replayed)} items opnieuw afgespeeld")
+        self._tasks = [asyncio.create_task(self._writer()), asyncio.create_task(self._flusher())]
+        if replayed:
+            self._flush_wake.set()
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        try:
+            if self.flush_enabled and mongo_breaker.state == "closed":
+                await self.flush()
+        except Exception as e:
+            # Blijft in het journal staan en wordt bij de volgende start afgespeeld
+            logger.warning(f"Ingest buffer niet geleegd bij shutdown ({self.pending} items): {e}")
+        if self._file is not None:
+            await asyncio.to_thread(self._file.close)
+            self._file = None
+
+    async def submit(self, prompt_doc: dict, gallery_doc: dict):
+        """Terug zodra de documenten in het journal staan (na fsync)."""
+        line = orjson.dumps({"prompt": prompt_doc, "gallery": gallery_doc}) + b"\n"
+        future = asyncio.get_running_loop().create_future()
+        self._writes.append((line, prompt_doc, gallery_doc, future))
+        self._write_wake.set()
+        await future
+
+    def _add_pending(self, line: bytes, prompt_doc: dict, gallery_doc: dict):
+        self._pending.append((line, prompt_doc, gallery_doc))
+        cid = gallery_doc["metadata"].get("nightcafe_creation_id")
+        if cid:
+            self._pending_by_cid[cid] = gallery_doc
+        INGEST_PENDING.set(len(self._pending))
+        if len(self._pending) >= self.flush_items:
+            self._flush_wake.set()
+
+    # ─── Journal ───
+
+    def _read_journal(self) -> List[Tuple[bytes, dict, dict]]:
+        entries = []
+        try:
+            with open(self.path, "rb") as f:
+                for line in f:
+                    try:
+                        record = orjson.loads(line)
+                    except orjson.JSONDecodeError:
+                        # Half geschreven laatste regel (crash tijdens append): nooit bevestigd
+                        logger.warning("Ingest journal: onvolledige regel overgeslagen")
+                        continue
+                    entries.append((line if line.endswith(b"\n") else line + b"\n", record["prompt"], record["gallery"]))
+        except FileNotFoundError:
+            pass
+        return entries
+
+    def _append(self, data: bytes):
+        self._file.write(data)
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+    def _rewrite(self, lines: List[bytes]):
+        """Vervang het journal atomair door alleen de nog openstaande regels."""
+        self._file.close()
+        tmp = self.path.with_name(self.path.name + ".tmp")
+        with open(tmp, "wb") as f:
+            f.writelines(lines)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self.path)
+        self._file = open(self.path, "ab")
+
+    async def _writer(self):
+        """Group commit: alle regels die binnenkomen tijdens een fsync gaan samen in de volgende."""
+        while True:
+            await self._write_wake.wait()
+            self._write_wake.clear()
+            batch, self._writes = self._writes, []
+            if not batch:
+                continue
+            async with self._file_lock:
+                try:
+                    await asyncio.to_thread(self._append, b"".join(line for line, *_ in batch))
+                except Exception as e:
+                    for *_, future in batch:
+                        if not future.done():
+                            future.set_exception(e)
+                    continue
+                for line, prompt_doc, gallery_doc, future in batch:
+                    self._add_pending(line, prompt_doc, gallery_doc)
+                    if not future.done():
+                        future.set_result(None)
+
+    # ─── Flushen naar Mongo ───
+
+    async def _flusher(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._flush_wake.wait(), self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._flush_wake.clear()
+            if not self._pending or not self.flush_enabled or not mongo_breaker.allow():
+                continue
+            try:
+                await self.flush()
+            except ConnectionFailure as e:
+                mongo_breaker.failure(e)
+                self.last_error = str(e)
+            except Exception as e:
+                self.last_error = str(e)
+                logger.warning(f"Ingest flush mislukt, opnieuw over {self.flush_interval}s: {e}")
+
+    async def flush(self):
+        async with self._flush_lock:
+            if not self._pending:
+                return
+            batch = self._pending[:INGEST_BATCH_FLUSH_MAX]
+            await _insert_journaled([(p, g) for _, p, g in batch])
+            mongo_breaker.success()
+            async with self._file_lock:
+                del self._pending[:len(batch)]
+                for _, _, gallery_doc in batch:
+                    cid = gallery_doc["metadata"].get("nightcafe_creation_id")
+                    if cid and self._pending_by_cid.get(cid) is gallery_doc:
+                        del self._pending_by_cid[cid]
+                await asyncio.to_thread(self._rewrite, [line for line, *_ in self._pending])
+            INGEST_PENDING.set(len(self._pending))
+            self.last_flush_at = _now()
+            self.last_error = None
+            if self._pending:
+                self._flush_wake.set()
+
+
+async def _insert_journaled(entries: List[Tuple[dict, dict]]):
+    """
+    Schrijf gejournaliseerde (prompt, gallery) paren weg. Duplicate keys zijn
+    verwacht: op creation id (bestond al) of op id (replay van een al
+    weggeschreven item; de prompt wordt dan alsnog geprobeerd).
+
+    updated_at wordt het tijdstip van wegschrijven, niet dat van journaliseren:
+    na een Mongo-storing kan dat minuten later zijn, en /changes kijkt maar
+    CHANGES_SAFETY_WINDOW terug vanaf het token van de client.
+    """
+    now = datetime.now(timezone.utc).isoformat()
+    gallery_docs = [{**g, "created_at": g.get("created_at") or now, "updated_at": now} for _, g in entries]
+    errors: Dict[int, dict] = {}
+    try:
+        await db.gallery_items.insert_many(gallery_docs, ordered=False)
+    except BulkWriteError as e:
+        errors = _bulk_write_errors(e)
+
+    replayed = {pos for pos, err in errors.items() if err.get("code") == 11000 and "id" in (err.get("keyValue") or {})}
+    duplicates = sum(1 for pos, err in errors.items() if err.get("code") == 11000 and pos not in replayed)
+    for pos, err in errors.items():
+        if err.get("code") != 11000:
+            logger.error(f"Ingest: item {gallery_docs[pos]['id']} niet opgeslagen: {err.get('errmsg')}")
+
+    prompts = [
+        {**p, "created_at": p.get("created_at") or now, "updated_at": now}
+        for pos, (p, _) in enumerate(entries) if pos not in errors or pos in replayed
+    ]
+    prompts_inserted = len(prompts)
+    if prompts:
+        try:
+            await db.prompts.insert_many(prompts, ordered=False)
+        except BulkWriteError as e:
+            prompt_errors = _bulk_write_errors(e)
+            prompts_inserted -= len(prompt_errors)
+            for err in prompt_errors.values():
+                if err.get("code") != 11000:
+                    logger.error(f"Ingest: prompt niet opgeslagen: {err.get('errmsg')}")
+
+    created = [
+        {k: v for k, v in doc.items() if k != "_id"}
+        for pos, doc in enumerate(gallery_docs) if pos not in errors
+    ]
+    DUPLICATE_IMPORTS.inc(amount=duplicates)
+    await stats_cache.record(_stats_delta(created, prompts=prompts_inserted))
+    if created:
+        _gallery_changed()
+        await event_bus.publish("import", {"items": created})
+    logger.info(f"Ingest flush: {len(created)} aangemaakt, {duplicates} duplicates")
+
+
+ingest_buffer = IngestBuffer(INGEST_JOURNAL_PATH, INGEST_FLUSH_ITEMS, INGEST_FLUSH_MS / 1000)
+
+
+async def _spool_import(prompt_doc: dict, gallery_doc: dict, offline: bool) -> Response:
+    gallery_doc.pop("_id", None)
+    prompt_doc.pop("_id", None)
+    await ingest_buffer.submit(prompt_doc, gallery_doc)
+    return _json_response({
+        "success": True,
+        "id": gallery_doc["id"],
+        "prompt_id": prompt_doc["id"],
+        "duplicate": False,
+        "queued": True,
+        "offline": offline,
+        "message": (
+            "Database niet bereikbaar; lokaal opgeslagen en later weggeschreven" if offline
+            else "Ontvangen, wordt op de achtergrond opgeslagen"
+        ),
+        "mapping": {
+            "prompts": prompt_doc["id"],
+            "gallery_items": gallery_doc["id"]
+        }
+    }, status_code=202)
+
+
+# ─── Offline spool (circuit breaker) ─────────────────────────────────────────
+# Na MONGO_BREAKER_FAILURES verbindingsfouten op rij gaat de breaker open:
+# /import spoolt dan meteen naar het ingest journal (202) en status lookups
+# antwoorden uit de spool, zonder eerst op server selection te wachten. Na
+# MONGO_BREAKER_RESET_S mag één poging door (half-open); lukt die, dan sluit
+# de breaker. De flusher van IngestBuffer leegt de spool in bulk zodra de
+# database terug is, ook in INGEST_MODE=direct.
+
+MONGO_BREAKER_FAILURES = int(os.environ.get("MONGO_BREAKER_FAILURES", "3"))
+MONGO_BREAKER_RESET_S = float(os.environ.get("MONGO_BREAKER_RESET_S", "10"))
+MONGO_BREAKER_OPEN = Gauge("nc_mongo_breaker_open", "1 als de Mongo circuit breaker open staat")
+
+
+class MongoBreaker:
+    def __init__(self, threshold: int, reset_after: float):
+        self.threshold = threshold
+        self.reset_after = reset_after
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self.last_error: Optional[str] = None
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        return "half-open" if time.monotonic() - self.opened_at >= self.reset_after else "open"
+
+    def allow(self) -> bool:
+        """Mag deze aanroep naar Mongo? In half-open één proefaanroep per reset-periode."""
+        if self.opened_at is None:
+            return True
+        if time.monotonic() - self.opened_at < self.reset_after:
+            return False
+        self.opened_at = time.monotonic()
+        return True
+
+    def success(self):
+        if self.opened_at is not None:
+            logger.info("Mongo weer bereikbaar, circuit breaker gesloten")
+        self.failures = 0
+        self.opened_at = None
+        MONGO_BREAKER_OPEN.set(0)
+
+    def failure(self, exc: Exception):
+        self.failures += 1
+        self.last_error = str(exc)
+        if self.opened_at is not None or self.failures >= self.threshold:
+            if self.opened_at is None:
+                logger.warning(f"Mongo onbereikbaar, circuit breaker open: {exc}")
+            self.opened_at = time.monotonic()
+            MONGO_BREAKER_OPEN.set(1)
+
+
+mongo_breaker = MongoBreaker(MONGO_BREAKER_FAILURES, MONGO_BREAKER_RESET_S)
+
+
+@app.exception_handler(ConnectionFailure)
+async def mongo_unavailable_handler(request: Request, exc: ConnectionFailure):
+    mongo_breaker.failure(exc)
+    return _json_response({"detail": "Database niet bereikbaar"}, status_code=503)
+
+
+@api_router.get("/import/buffer")
+async def ingest_buffer_status():
+    """Status van de ingest buffer / offline spool en de Mongo circuit breaker."""
+    return {
+        "mode": "buffered" if INGEST_BUFFERED else "direct",
+        "pending": ingest_buffer.pending,
+        "flush_items": INGEST_FLUSH_ITEMS,
+        "flush_ms": INGEST_FLUSH_MS,
+        "last_flush_at": ingest_buffer.last_flush_at,
+        "last_error": ingest_buffer.last_error,
+        "database": mongo_breaker.state,
+    }
+
 # ═══════════════════════════════════════════════════════════════════════════════
-# GALLERY ITEMS ROUTES
+# STATISTIEKEN  (incrementele tellers + periodieke controle)
 # ═══════════════════════════════════════════════════════════════════════════════
 
-@api_router.get("/gallery-items/stats/summary")
-async def get_gallery_stats():
-    total = await db.gallery_items.count_documents({})
-    with_image = await db.gallery_items.count_documents({"image_url": {"$ne": None}})
-    with_prompt = await db.gallery_items.count_documents({"prompt_used": {"$ne": None}})
-    with_multi = await db.gallery_items.count_documents({"metadata.all_images.1": {"$exists": True}})
-    published = await db.gallery_items.count_documents({"metadata.is_published": True})
-    total_prompts = await db.prompts.count_documents({})
+STATS_CACHE_TTL = float(os.environ.get("STATS_CACHE_TTL", "10"))
+STATS_RECONCILE_S = float(os.environ.get("STATS_RECONCILE_S", "600"))
+STATS_DOC_ID = "gallery"
+STATS_FIELDS = ("total", "withImage", "withPrompt", "withMultipleImages", "published", "local", "totalPrompts")
+
+
+def _count_if(expr: dict) -> dict:
+    return {"$sum": {"$cond": [expr, 1, 0]}}
+
+
+def _is_set(field: str) -> dict:
+    return {"$ne": [{"$ifNull": [field, None]}, None]}
+
+
+GALLERY_STATS_PIPELINE = [
+    {"$group": {
+        "_id": None,
+        "total": {"$sum": 1},
+        "withImage": _count_if(_is_set("$image_url")),
+        "withPrompt": _count_if(_is_set("$prompt_used")),
+        "withMultipleImages": _count_if({"$gt": [
+            {"$cond": [{"$isArray": "$metadata.all_images"}, {"$size": "$metadata.all_images"}, 0]}, 1
+        ]}),
+        "published": _count_if({"$eq": ["$metadata.is_published", True]}),
+        "local": _count_if({"$eq": ["$storage_mode", "both"]}),
+    }},
+    {"$project": {"_id": 0}},
+]
+
+# Velden die _stats_delta nodig heeft (projectie bij delete)
+STATS_PROJECTION = {
+    "image_url": 1, "prompt_used": 1, "storage_mode": 1,
+    "metadata.all_images": 1, "metadata.is_published": 1,
+}
+
+
+def _stats_delta(docs: List[dict], sign: int = 1, prompts: int = 0) -> Dict[str, int]:
+    """Tellerwijziging voor toegevoegde (sign=1) of verwijderde (sign=-1) items; zelfde regels als de pipeline."""
+    delta = dict.fromkeys(STATS_FIELDS, 0)
+    for doc in docs:
+        meta = doc.get("metadata") or {}
+        all_images = meta.get("all_images")
+        delta["total"] += sign
+        delta["withImage"] += sign if doc.get("image_url") is not None else 0
+        delta["withPrompt"] += sign if doc.get("prompt_used") is not None else 0
+        delta["withMultipleImages"] += sign if isinstance(all_images, list) and len(all_images) > 1 else 0
+        delta["published"] += sign if meta.get("is_published") is True else 0
+        delta["local"] += sign if doc.get("storage_mode") == "both" else 0
+    delta["totalPrompts"] = prompts
+    return delta
+
+
+class StatsCache:
+    """
+    Gallery-statistieken als tellers in één document (stats, _id "gallery").
+    Imports, deletes en downloads passen ze aan met $inc (record); lezen is
+    één find_one op _id, hoe groot de collectie ook is. De volledige
+    aggregatie draait alleen als het document ontbreekt, bij startup en elke
+    STATS_RECONCILE_S seconden, en herstelt eventuele drift (bijv. een crash
+    tussen een write en zijn $inc). Het gelezen document wordt STATS_CACHE_TTL
+    seconden hergebruikt; eigen writes worden er direct in verwerkt, die van
+    andere workers na de TTL.
+    """
+
+    def __init__(self, ttl: float, reconcile_interval: float):
+        self.ttl = ttl
+        self.reconcile_interval = reconcile_interval
+        self._value: Optional[dict] = None
+        self._expires = 0.0
+        self._lock = asyncio.Lock()
+        self._task: Optional[asyncio.Task] = None
+
+    async def start(self):
+        self._task = asyncio.create_task(self._reconcile_loop())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    def invalidate(self):
+        """Vergeet de lokale kopie: de volgende get leest het tellerdocument opnieuw."""
+        self._value = None
+
+    async def record(self, delta: Dict[str, int]):
+        """Verwerk een tellerwijziging. Faalt nooit de aanroepende write (de reconcile herstelt)."""
+        delta = {k: v for k, v in delta.items() if v}
+        if not delta:
+            return
+        if self._value is not None:
+            for k, v in delta.items():
+                self._value[k] += v
+        try:
+            await db.stats.update_one({"_id": STATS_DOC_ID}, {"$inc": delta})
+        except Exception as e:
+            logger.warning(f"Stats-tellers niet bijgewerkt: {e}")
+
+    async def get(self) -> dict:
+        if self._value is not None and time.monotonic() < self._expires:
+            return self._value
+        async with self._lock:
+            # Gelijktijdige pollers wachten op één lookup
+            if self._value is not None and time.monotonic() < self._expires:
+                return self._value
+            doc = await db.stats.find_one({"_id": STATS_DOC_ID}, {"_id": 0})
+            if doc is None:
+                doc = await self.reconcile()
+            self._value = {k: doc.get(k, 0) for k in STATS_FIELDS}
+            self._expires = time.monotonic() + self.ttl
+            return self._value
+
+    async def reconcile(self) -> dict:
+        """Tel alles opnieuw (één $group over gallery_items) en overschrijf de tellers."""
+        rows = await db.gallery_items.aggregate(GALLERY_STATS_PIPELINE).to_list(1)
+        stats = rows[0] if rows else {}
+        stats = {k: stats.get(k, 0) for k in STATS_FIELDS}
+        stats["totalPrompts"] = await db.prompts.count_documents({})
+        await db.stats.replace_one({"_id": STATS_DOC_ID}, stats, upsert=True)
+        self._value = dict(stats)
+        self._expires = time.monotonic() + self.ttl
+        return stats
+
+    async def _reconcile_loop(self):
+        while True:
+            try:
+                await self.reconcile()
+            except Exception as e:
+                logger.warning(f"Stats reconcile mislukt: {e}")
+            await asyncio.sleep(self.reconcile_interval)
+
+
+stats_cache = StatsCache(STATS_CACHE_TTL, STATS_RECONCILE_S)
+
+
+def _gallery_stats_view(stats: dict) -> dict:
+    return {k: stats[k] for k in
+            ("total", "withImage", "withPrompt", "withMultipleImages", "published", "totalPrompts")}
+
+
+def _download_stats_view(stats: dict) -> dict:
+    total, local = stats["total"], stats["local"]
+    return {"total": total, "local": local, "pending": total - local}
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# EVENTS  (server-sent events voor het dashboard)
+# ═══════════════════════════════════════════════════════════════════════════════
+
+# In-process pub/sub: elke SSE-verbinding is een subscriber met een eigen,
+# begrensde queue. Met EVENTS_BACKEND=mongo lopen events via een capped
+# collection die elk proces tailt, zodat meerdere uvicorn workers elkaars
+# events doorgeven. Event types:
+#   import  {items}  – nieuwe items        update {items} – gewijzigde items
+#   delete  {ids}    – verwijderde items   download {job} – voortgang bulk download
+#   stats   {gallery, downloads}           resync {}      – haal /changes op
+EVENTS_BACKEND = os.environ.get("EVENTS_BACKEND", "memory")
+EVENTS_QUEUE_SIZE = 256
+EVENTS_HEARTBEAT = 15.0
+EVENTS_CAPPED_BYTES = 16 * 1024 * 1024
+STATS_EVENT_DELAY = 1.0
+
+
+class EventBus:
+    def __init__(self, backend: str):
+        self.backend = backend
+        self._subscribers: set = set()
+        self._tail_task: Optional[asyncio.Task] = None
+        self._stats_task: Optional[asyncio.Task] = None
+        self._stats_dirty = False
+
+    async def start(self):
+        if self.backend != "mongo":
+            return
+        try:
+            await db.create_collection("events", capped=True, size=EVENTS_CAPPED_BYTES)
+        except CollectionInvalid:
+            pass  # bestaat al
+        self._tail_task = asyncio.create_task(self._tail())
+
+    async def stop(self):
+        tasks = [t for t in (self._tail_task, self._stats_task) if t]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    def subscribe(self) -> asyncio.Queue:
+        queue: asyncio.Queue = asyncio.Queue(EVENTS_QUEUE_SIZE)
+        self._subscribers.add(queue)
+        return queue
+
+    def unsubscribe(self, queue: asyncio.Queue):
+        self._subscribers.discard(queue)
+
+    def _dispatch(self, event: dict):
+        for queue in self._subscribers:
+            try:
+                queue.put_nowait(event)
+            except asyncio.QueueFull:
+                # Trage client: achterstand weggooien, de client haalt alles op via /changes
+                while not queue.empty():
+                    queue.get_nowait()
+                queue.put_nowait({"type": "resync", "data": {}})
+
+    async def publish(self, event_type: str, data: Any):
+        """Stuur een event naar alle verbonden clients. Faalt nooit de aanroepende request."""
+        event = {"type": event_type, "data": jsonable_encoder(data)}
+        if self.backend == "mongo":
+            try:
+                await db.events.insert_one({**event, "at": datetime.now(timezone.utc)})
+                return
+            except Exception as e:
+                logger.warning(f"Event niet via Mongo verstuurd: {e}")
+        self._dispatch(event)
+
+    async def _tail(self):
+        last = await db.events.find_one({}, {"_id": 1}, sort=[("$natural", DESCENDING)])
+        last_id = last["_id"] if last else None
+        while True:
+            cursor = db.events.find(
+                {"_id": {"$gt": last_id}} if last_id else {},
+                {"_id": 1, "type": 1, "data": 1},
+                cursor_type=CursorType.TAILABLE_AWAIT,
+            )
+            try:
+                async for doc in cursor:
+                    last_id = doc["_id"]
+                    self._dispatch({"type": doc["type"], "data": doc["data"]})
+            except Exception as e:
+                logger.warning(f"Event tail onderbroken: {e}")
+            # Lege collection of afgebroken cursor: opnieuw proberen
+            await asyncio.sleep(1)
+
+    def stats_changed(self):
+        """Gedebounced: hoogstens één stats-event per STATS_EVENT_DELAY, hoeveel writes er ook zijn."""
+        self._stats_dirty = True
+        if self._stats_task is None or self._stats_task.done():
+            self._stats_task = asyncio.create_task(self._publish_stats())
+
+    async def _publish_stats(self):
+        while self._stats_dirty:
+            await asyncio.sleep(STATS_EVENT_DELAY)
+            self._stats_dirty = False
+            if not self._subscribers and self.backend != "mongo":
+                continue
+            try:
+                stats = await stats_cache.get()
+                await self.publish("stats", {
+                    "gallery": _gallery_stats_view(stats),
+                    "downloads": _download_stats_view(stats),
+                })
+            except Exception as e:
+                logger.warning(f"Stats-event mislukt: {e}")
+
+
+event_bus = EventBus(EVENTS_BACKEND)
+
+
+def _gallery_changed():
+    """Na elke schrijfactie op gallery_items: (gedebounced) een stats-event naar clients sturen."""
+    event_bus.stats_changed()
+
+
+@api_router.get("/events")
+async def event_stream():
+    """Server-sent events voor het dashboard (zie EventBus voor de event types)."""
+    async def stream():
+        queue = event_bus.subscribe()
+        try:
+            yield "retry: 3000\n\n"
+            while True:
+                try:
+                    event = await asyncio.wait_for(queue.get(), EVENTS_HEARTBEAT)
+                except asyncio.TimeoutError:
+                    yield ": keepalive\n\n"
+                    continue
+                yield f"event: {event['type']}\ndata: {json.dumps(event['data'], ensure_ascii=False)}\n\n"
+        finally:
+            event_bus.unsubscribe(queue)
+
+    return StreamingResponse(
+        stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@api_router.get("/metrics")
+async def metrics():
+    """Prometheus tekstformaat: latency per route en per Mongo collection/command, downloads, imports."""
+    return Response(render_metrics(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# KEYSET PAGINATION  (cursor op (created_at, id), nieuwste eerst)
+# ═══════════════════════════════════════════════════════════════════════════════
+
+PAGE_LIMIT_DEFAULT = 100
+PAGE_LIMIT_MAX = 500
+KEYSET_SORT = [("created_at", DESCENDING), ("id", DESCENDING)]
+
+
+def _encode_cursor(doc: dict) -> str:
+    raw = json.dumps([doc.get("created_at"), doc.get("id")], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def _decode_cursor(token: str) -> tuple[str, str]:
+    try:
+        raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+        created_at, last_id = json.loads(raw)
+    except (ValueError, TypeError):
+        raise HTTPException(400, "Ongeldige cursor")
+    if not isinstance(created_at, str) or not isinstance(last_id, str):
+        raise HTTPException(400, "Ongeldige cursor")
+    return created_at, last_id
+
+
+async def _keyset_page(coll, limit: int, after: Optional[str] = None,
+                       query: Optional[dict] = None, projection: Optional[dict] = None) -> dict:
+    """
+    Eén pagina uit `coll`, gesorteerd op (created_at, id) aflopend.
+    Gebruikt de nc_created_at_id index: kosten per pagina zijn constant,
+    ongeacht hoe diep er gepagineerd wordt (anders dan skip/offset).
+    """
+    conditions = [query] if query else []
+    if after:
+        created_at, last_id = _decode_cursor(after)
+        conditions.append({"$or": [
+            {"created_at": {"$lt": created_at}},
+            {"created_at": created_at, "id": {"$lt": last_id}},
+        ]})
+    if not conditions:
+        flt = {}
+    elif len(conditions) == 1:
+        flt = conditions[0]
+    else:
+        flt = {"$and": conditions}
+
+    docs = await coll.find(flt, projection or {"_id": 0}).sort(KEYSET_SORT).limit(limit + 1).to_list(limit + 1)
+    has_more = len(docs) > limit
+    docs = docs[:limit]
     return {
-        "total": total,
-        "withImage": with_image,
-        "withPrompt": with_prompt,
-        "withMultipleImages": with_multi,
-        "published": published,
-        "totalPrompts": total_prompts,
+        "items": docs,
+        "next_cursor": _encode_cursor(docs[-1]) if has_more else None,
     }
 
+# ═══════════════════════════════════════════════════════════════════════════════
+# RESPONSES  (orjson, compressie, sparse fieldsets)
+# ═══════════════════════════════════════════════════════════════════════════════
+
+# Lijstroutes geven Mongo-documenten terug die al JSON-compatibel zijn: orjson
+# serialiseert ze direct, zonder de (trage) jsonable_encoder van FastAPI.
+def _json_response(content: Any, status_code: int = 200, headers: Optional[dict] = None) -> Response:
+    start = time.perf_counter()
+    body = orjson.dumps(content, default=str, option=orjson.OPT_NON_STR_KEYS)
+    timing = _request_timing.get()
+    if timing is not None:
+        timing.serialize += time.perf_counter() - start
+    return Response(body, status_code=status_code, media_type="application/json", headers=headers)
+
+
+# ─── Sparse fieldsets (?fields=a,b.c) ────────────────────────────────────────
+
+_FIELD_PATH = re.compile(r"^[A-Za-z][A-Za-z0-9_]*(\.[A-Za-z0-9_]+)*$")
+
+
+def _parse_fields(fields: Optional[str]) -> Optional[List[str]]:
+    if not fields:
+        return None
+    paths = [f.strip() for f in fields.split(",") if f.strip()]
+    bad = [f for f in paths if not _FIELD_PATH.match(f)]
+    if bad:
+        raise HTTPException(400, f"Ongeldige velden: {', '.join(bad)}")
+    return paths
+
+
+def _projection(paths: Optional[List[str]], required: tuple = ()) -> dict:
+    """
+    Veldenlijst → Mongo projectie. `required` (bijv. de cursorvelden) gaat altijd
+    mee; bij overlappende paden (metadata + metadata.x) wint het ouderpad.
+    """
+    if not paths:
+        return {"_id": 0}
+    wanted = set(paths) | set(required)
+    return {"_id": 0, **{p: 1 for p in sorted(wanted) if not any(p.startswith(q + ".") for q in wanted)}}
+
+
+# ─── Compressie ──────────────────────────────────────────────────────────────
+# gzip, of brotli als het optionele `brotli` pakket geïnstalleerd is en de
+# client het accepteert. Kleine responses en al gecomprimeerde/streamende
+# inhoud (SSE, lokale bestanden) worden overgeslagen. Streaming responses
+# (export) worden per chunk gecomprimeerd en geflusht.
+COMPRESS_MIN_SIZE = int(os.environ.get("COMPRESS_MIN_SIZE", "1024"))
+COMPRESS_GZIP_LEVEL = 6
+COMPRESS_BROTLI_QUALITY = 5
+COMPRESS_EXCLUDE = ("/api/events", "/api/downloads")
+COMPRESS_TYPES = ("application/json", "application/x-ndjson", "text/")
+BROTLI_ENABLED = importlib.util.find_spec("brotli") is not None
+if BROTLI_ENABLED:
+    import brotli
+
+
+def _accepted_encoding(accept_encoding: str) -> Optional[str]:
+    accepted = set()
+    for part in accept_encoding.lower().split(","):
+        token, _, params = part.strip().partition(";")
+        if params.strip().replace(" ", "") in ("q=0", "q=0.0", "q=0.00", "q=0.000"):
+            continue
+        accepted.add(token.strip())
+    if BROTLI_ENABLED and "br" in accepted:
+        return "br"
+    if "gzip" in accepted:
+        return "gzip"
+    return None
+
+
+# Gecomprimeerde bytes verschillen per encoding, dus ook de ETag: de tag blijft
+# sterk maar krijgt de encoding binnen de quotes ("abc" → "abc-gzip").
+# _etag_matches haalt dat achtervoegsel weer weg bij het vergelijken.
+_ETAG_ENCODINGS = ("gzip", "br")
+
+
+def _encoded_etag(etag: str, encoding: str) -> str:
+    return f'{etag[:-1]}-{encoding}"' if etag.endswith('"') else etag
+
+
+def _decoded_etag(etag: str) -> str:
+    for encoding in _ETAG_ENCODINGS:
+        if etag.endswith(f'-{encoding}"'):
+            return f'{etag[:-len(encoding) - 2]}"'
+    return etag
+
+
+class _Compressor:
+    def __init__(self, encoding: str):
+        if encoding == "br":
+            c = brotli.Compressor(quality=COMPRESS_BROTLI_QUALITY)
+            self.compress = lambda data: c.process(data) + c.flush()
+            self.finish = c.finish
+        else:
+            c = zlib.compressobj(COMPRESS_GZIP_LEVEL, zlib.DEFLATED, 31)  # 31 = gzip-container
+            self.compress = lambda data: c.compress(data) + c.flush(zlib.Z_SYNC_FLUSH)
+            self.finish = c.flush
+
+
+class CompressionMiddleware:
+    def __init__(self, app, minimum_size: int = COMPRESS_MIN_SIZE):
+        self.app = app
+        self.minimum_size = minimum_size
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"].startswith(COMPRESS_EXCLUDE):
+            await self.app(scope, receive, send)
+            return
+        encoding = _accepted_encoding(Headers(scope=scope).get("accept-encoding", ""))
+        if not encoding:
+            await self.app(scope, receive, send)
+            return
+
+        start: Optional[dict] = None
+        compressor: Optional[_Compressor] = None
+        passthrough = False
+
+        async def send_compressed(message):
+            nonlocal start, compressor, passthrough
+            if message["type"] == "http.response.start":
+                start = message
+                return
+            if message["type"] != "http.response.body" or passthrough:
+                await send(message)
+                return
+            body = message.get("body", b"")
+            more_body = message.get("more_body", False)
+            if compressor is None:
+                headers = MutableHeaders(raw=start["headers"])
+                if (
+                    "content-encoding" in headers
+                    or not headers.get("content-type", "").startswith(COMPRESS_TYPES)
+                    or (not more_body and len(body) < self.minimum_size)
+                ):
+                    passthrough = True
+                    # 304 op een gecomprimeerde representatie: dezelfde tag terugsturen
+                    etag = headers.get("etag")
+                    if start["status"] == 304 and etag:
+                        encoded = _encoded_etag(etag, encoding)
+                        if_none_match = Headers(scope=scope).get("if-none-match", "")
+                        if encoded in (t.strip() for t in if_none_match.split(",")):
+                            headers["ETag"] = encoded
+                    await send(start)
+                    await send(message)
+                    return
+                compressor = _Compressor(encoding)
+                headers["Content-Encoding"] = encoding
+                headers.add_vary_header("Accept-Encoding")
+                if "content-length" in headers:
+                    del headers["content-length"]
+                etag = headers.get("etag")
+                if etag:
+                    headers["ETag"] = _encoded_etag(etag, encoding)
+                if not more_body:
+                    data = compressor.compress(body) + compressor.finish()
+                    headers["Content-Length"] = str(len(data))
+                    await send(start)
+                    await send({"type": "http.response.body", "body": data})
+                    return
+                await send(start)
+            data = compressor.compress(body)
+            if not more_body:
+                data += compressor.finish()
+            await send({"type": "http.response.body", "body": data, "more_body": more_body})
+
+        await self.app(scope, receive, send_compressed)
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# DELTA SYNC  (wijzigingen sinds een token + ETags)
+# ═══════════════════════════════════════════════════════════════════════════════
+
+# Elke schrijfactie op gallery_items zet updated_at; een verwijderd item laat een
+# tombstone achter in `deleted_items` (TTL-index). Een sync-token bevat het
+# serverstijdstip van de vorige poll. Er wordt CHANGES_SAFETY_WINDOW seconden
+# extra teruggekeken, zodat writes die vlak vóór de poll een updated_at kregen
+# maar pas erna gecommit werden niet gemist worden; de client past wijzigingen
+# idempotent toe. Tokens ouder dan de tombstones geven `reset: true`.
+TOMBSTONE_RETENTION_DAYS = int(os.environ.get("TOMBSTONE_RETENTION_DAYS", "7"))
+CHANGES_SAFETY_WINDOW = timedelta(seconds=float(os.environ.get("CHANGES_SAFETY_WINDOW", "5")))
+CHANGES_LIMIT = 1000
+CHANGES_SORT = [("updated_at", ASCENDING), ("id", ASCENDING)]
+
+
+def _encode_token(at: datetime, after: Optional[dict] = None) -> str:
+    data = {"t": at.isoformat()}
+    if after:
+        data["a"] = [after["updated_at"], after["id"]]
+    raw = json.dumps(data, separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def _decode_token(token: str) -> tuple[datetime, Optional[tuple[str, str]]]:
+    try:
+        data = json.loads(base64.urlsafe_b64decode(token + "=" * (-len(token) % 4)))
+        at = datetime.fromisoformat(data["t"])
+        after = tuple(data["a"]) if "a" in data else None
+    except (ValueError, TypeError, KeyError):
+        raise HTTPException(400, "Ongeldig sync-token")
+    if at.tzinfo is None or (after is not None and (len(after) != 2 or not all(isinstance(v, str) for v in after))):
+        raise HTTPException(400, "Ongeldig sync-token")
+    return at, after
+
+
+async def _record_tombstones(item_ids: List[str]):
+    """Onthoud verwijderde items voor /gallery-items/changes."""
+    if item_ids:
+        now = datetime.now(timezone.utc)
+        await db.deleted_items.insert_many([{"id": i, "deleted_at": now} for i in item_ids])
+
+
+async def _gallery_version() -> str:
+    """
+    Goedkope versie van gallery_items + prompts (drie index-lookups): laatste
+    updated_at, laatste tombstone en aantal. Verandert bij elke schrijfactie.
+    """
+    latest, tombstone, count = await asyncio.gather(
+        db.gallery_items.find_one({}, {"_id": 0, "updated_at": 1}, sort=[("updated_at", DESCENDING)]),
+        db.deleted_items.find_one({}, {"_id": 0, "deleted_at": 1}, sort=[("deleted_at", DESCENDING)]),
+        db.gallery_items.estimated_document_count(),
+    )
+    return f"{(latest or {}).get('updated_at')}|{(tombstone or {}).get('deleted_at')}|{count}"
+
+
+def _etag_matches(if_none_match: Optional[str], tag: str) -> bool:
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    return tag in (_decoded_etag(t.strip().removeprefix("W/")) for t in if_none_match.split(","))
+
+
+async def _conditional(request: Request, produce, version: Optional[str] = None) -> Response:
+    """
+    JSON response (orjson) met een sterke ETag en If-None-Match → 304.
+    Met `version` wordt de ETag bepaald vóór `produce()` draait: een ongewijzigde
+    poll kost dan geen query en geen serialisatie. Zonder `version` (bijv. voor
+    gecachte statistieken) wordt de geserialiseerde body gehasht.
+    """
+    headers = {"Cache-Control": "no-cache"}
+    if version is not None:
+        key = f"{version}|{request.url.path}?{request.url.query}"
+        tag = f'"{hashlib.sha1(key.encode()).hexdigest()}"'
+        if _etag_matches(request.headers.get("if-none-match"), tag):
+            return Response(status_code=304, headers={**headers, "ETag": tag})
+        return _json_response(await produce(), headers={**headers, "ETag": tag})
+
+    response = _json_response(await produce(), headers=headers)
+    tag = f'"{hashlib.sha1(response.body).hexdigest()}"'
+    if _etag_matches(request.headers.get("if-none-match"), tag):
+        return Response(status_code=304, headers={**headers, "ETag": tag})
+    response.headers["ETag"] = tag
+    return response
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# GALLERY ITEMS ROUTES
+# ═══════════════════════════════════════════════════════════════════════════════
+
+@api_router.get("/gallery-items/stats/summary")
+async def get_gallery_stats(request: Request):
+    async def body():
+        return _gallery_stats_view(await stats_cache.get())
+    return await _conditional(request, body)
+
+# Velden die altijd meekomen bij ?fields= (cursor en sortering hebben ze nodig)
+KEYSET_FIELDS = ("id", "created_at")
+# Maximum aantal ids per batch-get (?ids=) en per bulk-delete
+BATCH_GET_MAX = int(os.environ.get("BATCH_GET_MAX", "200"))
+BULK_DELETE_MAX = int(os.environ.get("BULK_DELETE_MAX", "5000"))
+
+
+def _with_prompt_pipeline(match: dict, projection: Optional[dict] = None) -> List[dict]:
+    """
+    Aggregation voor gallery items mét bijbehorende prompt (`_prompt`) in één
+    round trip: $lookup op prompt_id via de unieke id-index van prompts.
+    """
+    pipeline = [
+        {"$match": match},
+        {"$lookup": {"from": "prompts", "localField": "prompt_id", "foreignField": "id", "as": "_prompt"}},
+        # Lege lijst (geen prompt) → veld valt weg, net als voorheen
+        {"$addFields": {"_prompt": {"$arrayElemAt": ["$_prompt", 0]}}},
+        {"$project": {"_id": 0, "_prompt._id": 0}},
+    ]
+    if projection and len(projection) > 1:
+        pipeline.append({"$project": {**{k: v for k, v in projection.items() if k != "_id"}, "_prompt": 1}})
+    return pipeline
+
+
+def _parse_ids(ids: str) -> List[str]:
+    wanted = list(dict.fromkeys(i.strip() for i in ids.split(",") if i.strip()))
+    if len(wanted) > BATCH_GET_MAX:
+        raise HTTPException(413, f"Maximaal {BATCH_GET_MAX} ids per request")
+    return wanted
+
+
 @api_router.get("/gallery-items")
-async def list_gallery_items():
-    items = await db.gallery_items.find({}, {"_id": 0}).sort("created_at", -1).to_list(500)
-    return items
+async def list_gallery_items(
+    request: Request,
+    fields: Optional[str] = None,
+    ids: Optional[str] = None,
+):
+    """
+    Compat: eerste pagina (max 500) als platte lijst. Gebruik /gallery-items/page voor de rest.
+    Met `ids` komen precies die items terug (in de gevraagde volgorde, onbekende
+    ids vallen weg), elk met bijbehorende prompt als `_prompt`, in één aggregation.
+    """
+    projection = _projection(_parse_fields(fields), KEYSET_FIELDS)
+
+    if ids is not None:
+        wanted = _parse_ids(ids)
+
+        async def batch():
+            if not wanted:
+                return []
+            pipeline = _with_prompt_pipeline({"id": {"$in": wanted}}, projection)
+            found = {doc["id"]: doc async for doc in db.gallery_items.aggregate(pipeline)}
+            return [found[i] for i in wanted if i in found]
+        return await _conditional(request, batch, await _gallery_version())
+
+    async def body():
+        page = await _keyset_page(db.gallery_items, PAGE_LIMIT_MAX, projection=projection)
+        return page["items"]
+    return await _conditional(request, body, await _gallery_version())
+
+@api_router.get("/gallery-items/page")
+async def list_gallery_items_page(
+    request: Request,
+    limit: int = Query(PAGE_LIMIT_DEFAULT, ge=1, le=PAGE_LIMIT_MAX),
+    after: Optional[str] = None,
+    min_width: Optional[int] = Query(None, ge=1),
+    min_height: Optional[int] = Query(None, ge=1),
+    fields: Optional[str] = Query(None, description="Komma-gescheiden velden, bv. id,title,thumbnail_url"),
+):
+    """
+    Gepagineerde gallery items: geef `next_cursor` terug als `after` voor de volgende pagina.
+    Optioneel filter op resolutie (items zonder bekende afmetingen vallen dan weg)
+    en een beperkte veldenlijst (`fields`; id en created_at komen altijd mee).
+    """
+    projection = _projection(_parse_fields(fields), KEYSET_FIELDS)
+    query = {}
+    if min_width:
+        query["width"] = {"$gte": min_width}
+    if min_height:
+        query["height"] = {"$gte": min_height}
+    return await _conditional(
+        request,
+        lambda: _keyset_page(db.gallery_items, limit, after, query=query or None, projection=projection),
+        await _gallery_version(),
+    )
+
+@api_router.get("/gallery-items/changes")
+async def gallery_item_changes(
+    since: Optional[str] = None,
+    limit: int = Query(CHANGES_LIMIT, ge=1, le=CHANGES_LIMIT),
+    fields: Optional[str] = None,
+):
+    """
+    Items die sinds `since` zijn aangemaakt of gewijzigd (volledige documenten,
+    oplopend op updated_at, optioneel beperkt tot `fields`) en ids van verwijderde items. Zonder `since` (of met
+    een te oud token) komt `reset: true` terug: laad dan volledig en gebruik
+    `next_token` voor de volgende poll. Bij `has_more` direct opnieuw aanroepen.
+    """
+    now = datetime.now(timezone.utc)
+    reset = {"reset": True, "items": [], "deleted": [], "has_more": False, "next_token": _encode_token(now)}
+    if not since:
+        return reset
+    at, after = _decode_token(since)
+    if now - at > timedelta(days=TOMBSTONE_RETENTION_DAYS):
+        return reset
+
+    deleted = []
+    if after:
+        # Vervolgpagina: verder na het laatst geleverde item; `at` is het begin van deze sync
+        sync_start = at
+        query = {"$or": [
+            {"updated_at": {"$gt": after[0]}},
+            {"updated_at": after[0], "id": {"$gt": after[1]}},
+        ]}
+    else:
+        sync_start = now
+        lower = at - CHANGES_SAFETY_WINDOW
+        query = {"updated_at": {"$gte": lower.isoformat()}}
+        deleted = [
+            d["id"] async for d in db.deleted_items.find(
+                {"deleted_at": {"$gte": lower}}, {"_id": 0, "id": 1}
+            )
+        ]
+
+    projection = _projection(_parse_fields(fields), KEYSET_FIELDS + ("updated_at",))
+    items = await db.gallery_items.find(query, projection).sort(CHANGES_SORT).limit(limit + 1).to_list(limit + 1)
+    has_more = len(items) > limit
+    items = items[:limit]
+    return _json_response({
+        "reset": False,
+        "items": items,
+        "deleted": deleted,
+        "has_more": has_more,
+        "next_token": _encode_token(sync_start, items[-1] if has_more else None),
+    })
+
+@api_router.get("/gallery-items/search")
+async def search_gallery_items(
+    q: str = Query(..., min_length=1, max_length=200),
+    limit: int = Query(50, ge=1, le=PAGE_LIMIT_MAX),
+    offset: int = Query(0, ge=0, le=10_000),
+    fields: Optional[str] = None,
+):
+    """
+    Full-text zoeken (nc_search_text index) over titel, prompt, revised prompt,
+    video prompt en creation id. Resultaten gerangschikt op relevantie.
+    """
+    projection = {**_projection(_parse_fields(fields), KEYSET_FIELDS), "score": {"$meta": "textScore"}}
+    cursor = db.gallery_items.find(
+        {"$text": {"$search": q}}, projection,
+    ).sort([("score", {"$meta": "textScore"}), ("created_at", DESCENDING)]).skip(offset).limit(limit + 1)
+    items = await cursor.to_list(limit + 1)
+    has_more = len(items) > limit
+    return _json_response({
+        "query": q,
+        "items": items[:limit],
+        "next_offset": offset + limit if has_more else None,
+    })
 
 @api_router.get("/gallery-items/{item_id}")
 async def get_gallery_item(item_id: str):
-    item = await db.gallery_items.find_one({"id": item_id}, {"_id": 0})
-    if not item:
+    # Item + bijbehorende prompt in één round trip
+    items = await db.gallery_items.aggregate(_with_prompt_pipeline({"id": item_id})).to_list(1)
+    if not items:
         raise HTTPException(404, "Item niet gevonden")
-    # Voeg bijbehorende prompt toe
-    if item.get("prompt_id"):
-        prompt = await db.prompts.find_one({"id": item["prompt_id"]}, {"_id": 0})
-        if prompt:
-            item["_prompt"] = prompt
-    return item
+    return items[0]
 
 @api_router.delete("/gallery-items/{item_id}")
 async def delete_gallery_item(item_id: str):
-    item = await db.gallery_items.find_one({"id": item_id}, {"_id": 0, "prompt_id": 1})
-    if not item:
+    result = await _delete_items([item_id])
+    if not result["deleted"]:
         raise HTTPException(404, "Item niet gevonden")
-    # Verwijder gallery item en bijbehorende prompt
-    await db.gallery_items.delete_one({"id": item_id})
-    if item.get("prompt_id"):
-        await db.prompts.delete_one({"id": item["prompt_id"]})
     return {"success": True}
 
+
+class BulkDeleteRequest(BaseModel):
+    ids: List[str]
+
+
+@api_router.post("/gallery-items/bulk-delete")
+async def bulk_delete_gallery_items(body: BulkDeleteRequest):
+    """
+    Verwijder veel items (en hun prompts) met één delete_many per collectie.
+    Lokale bestanden worden op de achtergrond opgeruimd; de response wacht daar niet op.
+    """
+    ids = list(dict.fromkeys(body.ids))
+    if len(ids) > BULK_DELETE_MAX:
+        raise HTTPException(413, f"Maximaal {BULK_DELETE_MAX} ids per request")
+    result = await _delete_items(ids)
+    return {"success": True, **result}
+
+
+async def _delete_items(ids: List[str]) -> dict:
+    """Verwijder items + prompts, leg tombstones vast en plan het opruimen van lokale bestanden in."""
+    if not ids:
+        return {"deleted": 0, "not_found": []}
+    items = await db.gallery_items.find(
+        {"id": {"$in": ids}},
+        {"_id": 0, "id": 1, "prompt_id": 1, "metadata.local_blobs": 1, **STATS_PROJECTION}
+    ).to_list(None)
+    found = [item["id"] for item in items]
+    if found:
+        await db.gallery_items.delete_many({"id": {"$in": found}})
+        prompt_ids = [item["prompt_id"] for item in items if item.get("prompt_id")]
+        prompts_deleted = 0
+        if prompt_ids:
+            prompts_deleted = (await db.prompts.delete_many({"id": {"$in": prompt_ids}})).deleted_count
+        await _record_tombstones(found)
+        await stats_cache.record(_stats_delta(items, sign=-1, prompts=-prompts_deleted))
+        _gallery_changed()
+        await event_bus.publish("delete", {"ids": found})
+        for item_id in found:
+            hash_index.remove(item_id)
+        await file_cleanup.enqueue(items)
+    found_set = set(found)
+    return {"deleted": len(found), "not_found": [i for i in ids if i not in found_set]}
+
 # ─── Backward compat: /api/imports → gallery_items ───────────────────────────
 
 @api_router.get("/imports/stats/summary")
-async def get_stats_compat():
-    return await get_gallery_stats()
+async def get_stats_compat(request: Request):
+    return await get_gallery_stats(request)
 
 @api_router.get("/imports")
-async def list_imports_compat():
-    return await list_gallery_items()
+async def list_imports_compat(request: Request):
+    return await list_gallery_items(request)
 
 @api_router.get("/imports/{item_id}")
 async def get_import_compat(item_id: str):
@@ -358,10 +2091,162 @@ async def delete_import_compat(item_id: str):
 # PROMPTS ROUTES
 # ═══════════════════════════════════════════════════════════════════════════════
 
+# Prompts worden alleen samen met hun gallery item aangemaakt/verwijderd,
+# dus _gallery_version dekt ook deze lijsten.
+
 @api_router.get("/prompts")
-async def list_prompts():
-    prompts = await db.prompts.find({}, {"_id": 0}).sort("created_at", -1).to_list(500)
-    return prompts
+async def list_prompts(request: Request):
+    """Compat: eerste pagina (max 500) als platte lijst. Gebruik /prompts/page voor de rest."""
+    async def body():
+        page = await _keyset_page(db.prompts, PAGE_LIMIT_MAX)
+        return page["items"]
+    return await _conditional(request, body, await _gallery_version())
+
+@api_router.get("/prompts/page")
+async def list_prompts_page(
+    request: Request,
+    limit: int = Query(PAGE_LIMIT_DEFAULT, ge=1, le=PAGE_LIMIT_MAX),
+    after: Optional[str] = None,
+):
+    """Gepagineerde prompts: geef `next_cursor` terug als `after` voor de volgende pagina."""
+    return await _conditional(request, lambda: _keyset_page(db.prompts, limit, after), await _gallery_version())
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# EXPORT  (streaming vanaf een Mongo cursor)
+# ═══════════════════════════════════════════════════════════════════════════════
+
+# Documenten worden per cursor-batch geserialiseerd en meteen verstuurd; het
+# servergeheugen blijft gelijk, of de export nu 1k of 1M items bevat.
+EXPORT_BATCH_SIZE = 500
+EXPORT_MEDIA_TYPES = {
+    "ndjson": "application/x-ndjson",
+    "json": "application/json",
+    "csv": "text/csv; charset=utf-8",
+}
+
+
+def _ja_nee(v) -> str:
+    return "ja" if v else "nee"
+
+
+# Standaard CSV-kolommen (gelijk aan de oude export in de frontend): kolom → waarde
+EXPORT_CSV_COLUMNS = {
+    "id": lambda d: d.get("id"),
+    "title": lambda d: d.get("title"),
+    "prompt_used": lambda d: d.get("prompt_used"),
+    "model": lambda d: d.get("model"),
+    "aspect_ratio": lambda d: d.get("aspect_ratio"),
+    "media_type": lambda d: d.get("media_type"),
+    "start_image": lambda d: d.get("start_image"),
+    "image_url": lambda d: d.get("image_url"),
+    "allImagesCount": lambda d: len((d.get("metadata") or {}).get("all_images") or []),
+    "nightcafe_creation_id": lambda d: (d.get("metadata") or {}).get("nightcafe_creation_id"),
+    "source_url": lambda d: (d.get("metadata") or {}).get("source_url"),
+    "created_at": lambda d: d.get("created_at"),
+    "is_published": lambda d: _ja_nee((d.get("metadata") or {}).get("is_published")),
+    "rating": lambda d: d.get("rating"),
+    "is_favorite": lambda d: _ja_nee(d.get("is_favorite")),
+}
+
+
+def _get_path(doc: dict, path: str) -> Any:
+    for key in path.split("."):
+        if not isinstance(doc, dict):
+            return None
+        doc = doc.get(key)
+    return doc
+
+
+def _csv_value(value: Any) -> Any:
+    if isinstance(value, (dict, list)):
+        return json.dumps(value, ensure_ascii=False, default=str)
+    return value
+
+
+async def _export_rows(cursor, fmt: str, fields: Optional[List[str]]):
+    """Async generator: geserialiseerde export, één chunk per cursor-batch."""
+    if fmt == "csv":
+        columns = fields or list(EXPORT_CSV_COLUMNS)
+        getters = (
+            [lambda d, p=p: _csv_value(_get_path(d, p)) for p in fields] if fields
+            else list(EXPORT_CSV_COLUMNS.values())
+        )
+        buf = io.StringIO()
+        writer = csv.writer(buf, lineterminator="\n")
+        writer.writerow(columns)
+    elif fmt == "json":
+        yield "["
+    first = True
+    batch = []
+
+    def encode(docs: List[dict]):
+        nonlocal first
+        if fmt == "csv":
+            buf.seek(0)
+            buf.truncate()
+            writer.writerows([[get(d) for get in getters] for d in docs])
+            return buf.getvalue()
+        lines = [orjson.dumps(d, default=str) for d in docs]
+        if fmt == "ndjson":
+            return b"\n".join(lines) + b"\n"
+        chunk = (b"" if first else b",") + b",".join(lines)
+        first = False
+        return chunk
+
+    if fmt == "csv":
+        yield buf.getvalue()
+    async for doc in cursor:
+        batch.append(doc)
+        if len(batch) >= EXPORT_BATCH_SIZE:
+            yield encode(batch)
+            batch = []
+    if batch:
+        yield encode(batch)
+    if fmt == "json":
+        yield "]"
+
+
+@api_router.get("/export")
+async def export_gallery_items(
+    format: str = Query("ndjson", pattern="^(ndjson|json|csv)$"),
+    q: Optional[str] = Query(None, min_length=1, max_length=200),
+    media_type: Optional[str] = None,
+    storage_mode: Optional[str] = None,
+    published: Optional[bool] = None,
+    created_after: Optional[str] = None,
+    created_before: Optional[str] = None,
+    fields: Optional[str] = Query(None, description="Komma-gescheiden velden, bv. id,title,metadata.source_url"),
+):
+    """
+    Exporteer gallery items (nieuwste eerst) als NDJSON, JSON of CSV.
+    Optionele filters: zoekterm, media type, opslag, gepubliceerd, periode.
+    `fields` beperkt de velden; CSV zonder `fields` gebruikt de standaard kolommen.
+    """
+    query: Dict[str, Any] = {}
+    if q:
+        query["$text"] = {"$search": q}
+    if media_type:
+        query["media_type"] = media_type
+    if storage_mode:
+        query["storage_mode"] = storage_mode
+    if published is not None:
+        query["metadata.is_published"] = True if published else {"$ne": True}
+    if created_after or created_before:
+        query["created_at"] = {
+            **({"$gte": created_after} if created_after else {}),
+            **({"$lt": created_before} if created_before else {}),
+        }
+    paths = _parse_fields(fields)
+    projection = _projection(paths)
+
+    cursor = db.gallery_items.find(query, projection).sort("created_at", DESCENDING).batch_size(EXPORT_BATCH_SIZE)
+    ts = datetime.now(timezone.utc).strftime("%Y-%m-%d")
+    return StreamingResponse(
+        _export_rows(cursor, format, paths),
+        media_type=EXPORT_MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="nightcafe-imports-{ts}.{format}"'},
+    )
+
 
 # ═══════════════════════════════════════════════════════════════════════════════
 # DOWNLOAD ROUTES  (afbeeldingen lokaal opslaan)
@@ -381,15 +2266,245 @@ def _detect_ext(url: str, content_type: str = "") -> str:
     return ".jpg"
 
 
-@api_router.post("/gallery-items/{item_id}/download")
-async def download_gallery_item_images(item_id: str):
-    """Download alle afbeeldingen van een gallery item naar lokale opslag."""
-    item = await db.gallery_items.find_one({"id": item_id}, {"_id": 0})
-    if not item:
-        raise HTTPException(404, "Item niet gevonden")
+# Max. gelijktijdige transfers (over alle requests heen) en chunkgrootte
+DOWNLOAD_CONCURRENCY = int(os.environ.get("DOWNLOAD_CONCURRENCY", "4"))
+DOWNLOAD_CHUNK_SIZE = 256 * 1024
+_download_slots = asyncio.Semaphore(DOWNLOAD_CONCURRENCY)
+
+# ─── Content-addressed blob store ────────────────────────────────────────────
+# Elk bestand wordt tijdens het streamen gehasht (sha256) en één keer opgeslagen
+# onder _blobs/<aa>/<digest><ext>. Items verwijzen ernaar via een hardlink in
+# DOWNLOAD_DIR/<item_id>/ (zodat /api/downloads/<item_id>/<file> blijft werken).
+# De `blobs` collectie houdt per digest een refcount en de bekende bron-URLs bij.
+
+BLOB_DIR = DOWNLOAD_DIR / "_blobs"
+
+
+def _blob_path(digest: str, ext: str) -> Path:
+    return BLOB_DIR / digest[:2] / f"{digest}{ext}"
 
-    if item.get("storage_mode") == "both":
-        return {"success": True, "downloaded": 0, "message": "Al lokaal opgeslagen", "local_path": item.get("local_path")}
+
+def _open_part_file():
+    BLOB_DIR.mkdir(parents=True, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=BLOB_DIR, suffix=".part")
+    return os.fdopen(fd, "wb"), tmp
+
+
+def _write_chunk(f, hasher, chunk: bytes):
+    f.write(chunk)
+    hasher.update(chunk)
+
+
+def _commit_blob(f, tmp: str, digest: str, ext: str) -> Path:
+    f.close()
+    blob = _blob_path(digest, ext)
+    if blob.exists():
+        os.unlink(tmp)  # identieke bytes staan er al
+    else:
+        blob.parent.mkdir(parents=True, exist_ok=True)
+        os.replace(tmp, blob)  # atomisch: nooit een half bestand onder de echte naam
+    return blob
+
+
+def _discard_part_file(f, tmp: str):
+    f.close()
+    _unlink_quiet(tmp)
+
+
+def _unlink_quiet(path):
+    try:
+        os.unlink(path)
+    except FileNotFoundError:
+        pass
+
+
+def _link_blob(blob: Path, dest: Path):
+    """Hardlink `blob` naar `dest` (kopie als het filesystem geen hardlinks kan)."""
+    dest.parent.mkdir(parents=True, exist_ok=True)
+    tmp = dest.with_name(f".{dest.name}.link")
+    _unlink_quiet(tmp)
+    try:
+        os.link(blob, tmp)
+    except OSError:
+        shutil.copyfile(blob, tmp)
+    os.replace(tmp, dest)
+
+
+async def _stream_to_blob(client: httpx.AsyncClient, url: str) -> Optional[tuple]:
+    """
+    Stream `url` chunk voor chunk naar een tijdelijk bestand, hash onderweg en
+    sla het op in de blob store. Bestands-I/O en hashing draaien in een thread,
+    zodat grote PNG's/MP4's de event loop niet blokkeren; geheugengebruik is
+    één chunk per transfer. De afmetingen worden uit de eerste bytes gelezen.
+    Geeft (digest, ext, bytes, (breedte, hoogte) | None) terug, of None bij non-200.
+    """
+    async with _download_slots:
+        async with client.stream("GET", url) as resp:
+            if resp.status_code != 200:
+                return None
+            ext = _detect_ext(url, resp.headers.get("content-type", ""))
+            f, tmp = await asyncio.to_thread(_open_part_file)
+            hasher = hashlib.sha256()
+            size = 0
+            head, dims = bytearray(), None
+            try:
+                async for chunk in resp.aiter_bytes(DOWNLOAD_CHUNK_SIZE):
+                    await asyncio.to_thread(_write_chunk, f, hasher, chunk)
+                    size += len(chunk)
+                    if dims is None and len(head) < imaging.PROBE_MAX_BYTES:
+                        head += chunk
+                        dims = imaging.probe_dimensions(io.BytesIO(head))
+                digest = hasher.hexdigest()
+                await asyncio.to_thread(_commit_blob, f, tmp, digest, ext)
+            except BaseException:
+                await asyncio.to_thread(_discard_part_file, f, tmp)
+                raise
+    return digest, ext, size, dims
+
+
+async def _known_blobs(urls: List[str]) -> Dict[str, dict]:
+    """URL → blob document, voor URLs waarvan de inhoud al in de store staat."""
+    known = {}
+    async for blob in db.blobs.find({"urls": {"$in": urls}}, {"_id": 0, "digest": 1, "ext": 1, "urls": 1}):
+        if _blob_path(blob["digest"], blob["ext"]).exists():
+            for url in blob["urls"]:
+                known[url] = blob
+    return known
+
+
+async def _release_blobs(digests: List[str]):
+    """Verlaag de refcount per verwijzing; blobs zonder verwijzingen worden opgeruimd."""
+    if not digests:
+        return
+    counts: Dict[str, int] = {}
+    for digest in digests:
+        counts[digest] = counts.get(digest, 0) + 1
+    await db.blobs.bulk_write(
+        [UpdateOne({"digest": d}, {"$inc": {"refcount": -n}}) for d, n in counts.items()],
+        ordered=False,
+    )
+    orphans = await db.blobs.find(
+        {"digest": {"$in": list(counts)}, "refcount": {"$lte": 0}}, {"_id": 0, "digest": 1, "ext": 1}
+    ).to_list(None)
+    for blob in orphans:
+        # Opnieuw met refcount-voorwaarde: een gelijktijdige download kan net een verwijzing toegevoegd hebben
+        res = await db.blobs.delete_one({"digest": blob["digest"], "refcount": {"$lte": 0}})
+        if res.deleted_count:
+            await asyncio.to_thread(_unlink_quiet, _blob_path(blob["digest"], blob["ext"]))
+
+
+# ─── Opruimen van verwijderde items ──────────────────────────────────────────
+# Verwijderen in de API is alleen Mongo-werk; de bestanden (blob refcounts +
+# DOWNLOAD_DIR/<item_id>) gaan via een persistente wachtrij (`file_cleanup`) naar
+# CLEANUP_WORKERS achtergrondworkers. Na een herstart worden openstaande taken
+# hervat en mappen van verwijderde items (tombstone in `deleted_items`) alsnog
+# opgeruimd. Mappen zonder tombstone blijven staan: wijst MONGO_URL/DB_NAME naar
+# een andere of lege database, dan zijn dat geen wezen maar downloads.
+
+CLEANUP_WORKERS = int(os.environ.get("CLEANUP_WORKERS", "2"))
+CLEANUP_SWEEP_BATCH = 1000
+
+
+class FileCleanupQueue:
+    def __init__(self, workers: int):
+        self.workers = workers
+        self._queue: asyncio.Queue = asyncio.Queue()
+        self._tasks: List[asyncio.Task] = []
+
+    @property
+    def pending(self) -> int:
+        return self._queue.qsize()
+
+    async def start(self):
+        # Eerst lezen: faalt dit (database onbereikbaar), dan kan start opnieuw
+        pending = await db.file_cleanup.find({}, {"_id": 0}).to_list(None)
+        for task in pending:
+            self._queue.put_nowait(task)
+        if pending:
+            logger.info(f"Opruimen hervat: {len(pending)} items")
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+        self._tasks.append(asyncio.create_task(self._sweep_orphans()))
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def enqueue(self, items: List[dict]):
+        """Plan het opruimen van de bestanden van verwijderde items in (documenten met id + metadata.local_blobs)."""
+        now = datetime.now(timezone.utc)
+        tasks = [
+            {
+                "item_id": item["id"],
+                "digests": [b["digest"] for b in (item.get("metadata") or {}).get("local_blobs") or []],
+                "created_at": now,
+            }
+            for item in items
+        ]
+        if not tasks:
+            return
+        await db.file_cleanup.insert_many(tasks)
+        for task in tasks:
+            task.pop("_id", None)
+            self._queue.put_nowait(task)
+
+    async def _worker(self):
+        while True:
+            task = await self._queue.get()
+            try:
+                await self._process(task)
+            except Exception:
+                logger.exception(f"Opruimen van item {task['item_id']} mislukt")
+            finally:
+                self._queue.task_done()
+
+    async def _process(self, task: dict):
+        if task["digests"]:
+            await _release_blobs(task["digests"])
+            # Vastleggen dat de refcounts verlaagd zijn: een hervatte taak mag dat niet nog eens doen
+            await db.file_cleanup.update_one({"item_id": task["item_id"]}, {"$set": {"digests": []}})
+        await asyncio.to_thread(shutil.rmtree, DOWNLOAD_DIR / task["item_id"], True)
+        await db.file_cleanup.delete_one({"item_id": task["item_id"]})
+
+    async def _sweep_orphans(self):
+        """
+        Verwijder mappen van verwijderde items die er nog staan (bijv. een
+        download die klaar was na het verwijderen). Alleen ids met een
+        tombstone en zonder gallery item of openstaande opruimtaak.
+        """
+        def list_dirs() -> List[str]:
+            if not DOWNLOAD_DIR.is_dir():
+                return []
+            return [p.name for p in DOWNLOAD_DIR.iterdir() if p.is_dir() and not p.name.startswith(("_", "."))]
+
+        names = await asyncio.to_thread(list_dirs)
+        removed = 0
+        for start in range(0, len(names), CLEANUP_SWEEP_BATCH):
+            batch = names[start:start + CLEANUP_SWEEP_BATCH]
+            deleted = {d["id"] async for d in db.deleted_items.find({"id": {"$in": batch}}, {"_id": 0, "id": 1})}
+            if not deleted:
+                continue
+            existing = {d["id"] async for d in db.gallery_items.find({"id": {"$in": list(deleted)}}, {"_id": 0, "id": 1})}
+            queued = {d["item_id"] async for d in db.file_cleanup.find({"item_id": {"$in": list(deleted)}}, {"_id": 0, "item_id": 1})}
+            for name in deleted:
+                if name not in existing and name not in queued:
+                    await asyncio.to_thread(shutil.rmtree, DOWNLOAD_DIR / name, True)
+                    removed += 1
+        if removed:
+            logger.info(f"Opruimen: {removed} verweesde download-mappen verwijderd")
+
+
+file_cleanup = FileCleanupQueue(CLEANUP_WORKERS)
+
+
+async def _download_item(item: dict) -> dict:
+    """
+    Download alle afbeeldingen van `item` en werk het document bij.
+    Gedeeld door de download-route en de job-workers. Geeft
+    {"downloaded": [paden], "bytes": n} terug; HTTPException bij niets te doen/mislukt.
+    """
+    item_id = item["id"]
 
     # Verzamel alle URLs om te downloaden
     urls = []
@@ -406,37 +2521,114 @@ async def download_gallery_item_images(item_id: str):
         raise HTTPException(400, "Geen afbeeldingen om te downloaden")
 
     item_dir = DOWNLOAD_DIR / item_id
-    item_dir.mkdir(parents=True, exist_ok=True)
+    known = await _known_blobs([url for _, url in urls])
+
+    async def fetch(label: str, url: str) -> Optional[dict]:
+        blob = known.get(url)
+        size = 0
+        try:
+            if blob:
+                # Inhoud al bekend: niet opnieuw downloaden, alleen linken
+                digest, ext = blob["digest"], blob["ext"]
+                dims = await asyncio.to_thread(imaging.probe_file, _blob_path(digest, ext))
+            else:
+                result = await _stream_to_blob(client, url)
+                if result is None:
+                    DOWNLOAD_FAILURES.inc()
+                    return None
+                digest, ext, size, dims = result
+            filename = f"{label}{ext}"
+            await asyncio.to_thread(_link_blob, _blob_path(digest, ext), item_dir / filename)
+        except Exception as e:
+            logger.warning(f"Download failed {url}: {e}")
+            DOWNLOAD_FAILURES.inc()
+            return None
+        logger.info(f"Downloaded: {item_id}/{filename} ({size} bytes{', uit blob store' if blob else ''})")
+        return {
+            "path": f"/api/downloads/{item_id}/{filename}",
+            "file": filename, "url": url, "digest": digest, "ext": ext, "size": size, "dims": dims,
+        }
 
-    downloaded = []
-    async with httpx.AsyncClient(timeout=30, follow_redirects=True) as client:
-        for label, url in urls:
-            try:
-                resp = await client.get(url)
-                if resp.status_code != 200:
-                    continue
-                ext = _detect_ext(url, resp.headers.get("content-type", ""))
-                filename = f"{label}{ext}"
-                (item_dir / filename).write_bytes(resp.content)
-                downloaded.append(f"/api/downloads/{item_id}/{filename}")
-                logger.info(f"Downloaded: {item_id}/{filename} ({len(resp.content)} bytes)")
-            except Exception as e:
-                logger.warning(f"Download failed {url}: {e}")
+    # Alle URLs van het item tegelijk (begrensd door DOWNLOAD_CONCURRENCY);
+    # gather behoudt de volgorde, dus "main" blijft vooraan
+    client = get_http_client()
+    results = [r for r in await asyncio.gather(*(fetch(label, url) for label, url in urls)) if r]
+    downloaded = [r["path"] for r in results]
+    DOWNLOAD_BYTES.inc(amount=sum(r["size"] for r in results))
 
     if not downloaded:
         raise HTTPException(502, "Geen afbeeldingen gedownload")
 
+    # Eén verwijzing per gelinkt bestand
+    now = datetime.now(timezone.utc).isoformat()
+    await db.blobs.bulk_write([
+        UpdateOne(
+            {"digest": r["digest"]},
+            {
+                "$setOnInsert": {"ext": r["ext"], "size": r["size"], "created_at": now},
+                "$inc": {"refcount": 1},
+                "$addToSet": {"urls": r["url"]},
+            },
+            upsert=True,
+        )
+        for r in results
+    ], ordered=False)
+
     # Update database
     meta = item.get("metadata", {})
     meta["local_images"] = downloaded
+    meta["local_blobs"] = [{"file": r["file"], "digest": r["digest"]} for r in results]
     update = {
         "local_path": downloaded[0],
         "storage_mode": "both",
         "metadata": meta,
+        "updated_at": _now(),
     }
-    await db.gallery_items.update_one({"id": item_id}, {"$set": update})
+    image = next((r for r in results if r["ext"] != ".mp4"), None)
+    if image and image["dims"]:
+        update["width"], update["height"] = image["dims"]
+    processed = await _process_image(item_id, item_dir / image["file"]) if image else None
+    if processed:
+        meta["thumbnails"] = processed["thumbnails"]
+        meta["dhash"] = processed["dhash"]
+        update["thumbnail_url"] = processed["thumbnails"]["grid"]
+    before = await db.gallery_items.find_one_and_update(
+        {"id": item_id}, {"$set": update}, projection={"_id": 0}, return_document=ReturnDocument.BEFORE
+    )
+    if before is None:
+        # Tijdens de download verwijderd: de verwijzingen hierboven teruggeven en
+        # de map opruimen (de cleanup-taak van de delete kan al gedraaid hebben)
+        await _release_blobs([r["digest"] for r in results])
+        await asyncio.to_thread(shutil.rmtree, item_dir, True)
+        raise HTTPException(404, "Item verwijderd tijdens het downloaden")
+    # local_blobs is in één atomaire update vervangen: de verwijzingen van de
+    # vorige set (een eerdere of gelijktijdige download van dit item) vervallen.
+    # Zo telt elk item precies één keer mee, wie er ook als laatste schreef.
+    await _release_blobs([b["digest"] for b in (before.get("metadata") or {}).get("local_blobs") or []])
+    updated = {**before, **update}
+    if before.get("storage_mode") != "both":
+        await stats_cache.record({"local": 1})
+    _gallery_changed()
+    await event_bus.publish("update", {"items": [updated]})
+    if processed:
+        hash_index.add(item_id, processed["dhash"])
     logger.info(f"Lokaal opgeslagen: {item_id} ({len(downloaded)} bestanden)")
 
+    return {"downloaded": downloaded, "bytes": sum(r["size"] for r in results)}
+
+
+@api_router.post("/gallery-items/{item_id}/download")
+async def download_gallery_item_images(item_id: str):
+    """Download alle afbeeldingen van een gallery item naar lokale opslag."""
+    item = await db.gallery_items.find_one({"id": item_id}, {"_id": 0})
+    if not item:
+        raise HTTPException(404, "Item niet gevonden")
+
+    if item.get("storage_mode") == "both":
+        return {"success": True, "downloaded": 0, "message": "Al lokaal opgeslagen", "local_path": item.get("local_path")}
+
+    result = await _download_item(item)
+    downloaded = result["downloaded"]
     return {
         "success": True,
         "downloaded": len(downloaded),
@@ -446,21 +2638,799 @@ async def download_gallery_item_images(item_id: str):
 
 
 @api_router.get("/gallery-items/download/stats")
-async def download_stats():
+async def download_stats(request: Request):
     """Hoeveel items zijn lokaal opgeslagen."""
-    total = await db.gallery_items.count_documents({})
-    local = await db.gallery_items.count_documents({"storage_mode": "both"})
-    pending = total - local
-    return {"total": total, "local": local, "pending": pending}
+    async def body():
+        return _download_stats_view(await stats_cache.get())
+    return await _conditional(request, body)
+
+
+# ─── Thumbnails (WebP, in een process pool) ──────────────────────────────────
+
+THUMBNAIL_WORKERS = int(os.environ.get("THUMBNAIL_WORKERS", str(max(1, (os.cpu_count() or 2) // 2))))
+
+_process_pool: Optional[ProcessPoolExecutor] = None
+
+
+def get_process_pool() -> ProcessPoolExecutor:
+    """Process pool voor CPU-werk (decoderen/schalen); 'spawn' i.v.m. threads van motor."""
+    global _process_pool
+    if _process_pool is None:
+        _process_pool = ProcessPoolExecutor(
+            max_workers=THUMBNAIL_WORKERS, mp_context=multiprocessing.get_context("spawn")
+        )
+    return _process_pool
+
+
+def close_process_pool():
+    global _process_pool
+    if _process_pool is not None:
+        _process_pool.shutdown(wait=False, cancel_futures=True)
+        _process_pool = None
+
+
+async def _process_image(item_id: str, src: Path) -> Optional[dict]:
+    """
+    Thumbnails + perceptual hash van één item in de process pool.
+    Geeft {"thumbnails": naam → URL onder /api/downloads, "dhash": hex} of None bij een fout.
+    """
+    loop = asyncio.get_running_loop()
+    try:
+        result = await loop.run_in_executor(
+            get_process_pool(), imaging.process_image, str(src), str(DOWNLOAD_DIR / item_id / "thumbs")
+        )
+    except Exception as e:
+        logger.warning(f"Thumbnails mislukt voor {item_id}: {e}")
+        return None
+    result["thumbnails"] = {
+        name: f"/api/downloads/{item_id}/thumbs/{filename}" for name, filename in result["thumbnails"].items()
+    }
+    return result
+
+
+def _local_file(local_path: str) -> Path:
+    """/api/downloads/<item_id>/<file> → pad op schijf."""
+    return DOWNLOAD_DIR / local_path.removeprefix("/api/downloads/")
+
+
+class ThumbnailBackfill:
+    """Maakt op de achtergrond thumbnails en hashes voor lokale items die er nog geen hebben."""
+
+    FILTER = {
+        "storage_mode": "both",
+        "media_type": {"$ne": "video"},
+        "$or": [{"thumbnail_url": None}, {"metadata.dhash": None}],
+    }
+
+    def __init__(self):
+        self._task: Optional[asyncio.Task] = None
+        self.processed = 0
+        self.failed = 0
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    async def start(self) -> dict:
+        pending = await db.gallery_items.count_documents(self.FILTER)
+        if not self.running and pending:
+            self.processed = self.failed = 0
+            self._task = asyncio.create_task(self._run())
+        return {"running": self.running, "pending": pending, "processed": self.processed, "failed": self.failed}
+
+    async def _run(self):
+        slots = asyncio.Semaphore(THUMBNAIL_WORKERS)
+
+        async def one(item: dict):
+            async with slots:
+                src = _local_file(item["local_path"])
+                processed = await _process_image(item["id"], src) if src.exists() else None
+                if not processed:
+                    self.failed += 1
+                    return
+                thumbnails = processed["thumbnails"]
+                await db.gallery_items.update_one(
+                    {"id": item["id"]},
+                    {"$set": {
+                        "thumbnail_url": thumbnails["grid"],
+                        "metadata.thumbnails": thumbnails,
+                        "metadata.dhash": processed["dhash"],
+                        "updated_at": _now(),
+                    }}
+                )
+                hash_index.add(item["id"], processed["dhash"])
+                self.processed += 1
+
+        cursor = db.gallery_items.find(self.FILTER, {"_id": 0, "id": 1, "local_path": 1})
+        batch = []
+        async for item in cursor:
+            batch.append(one(item))
+            if len(batch) >= THUMBNAIL_WORKERS * 4:
+                await asyncio.gather(*batch)
+                batch = []
+        await asyncio.gather(*batch)
+        logger.info(f"Thumbnail backfill klaar: {self.processed} items, {self.failed} mislukt")
+        await event_bus.publish("resync", {})
+
+
+thumbnail_backfill = ThumbnailBackfill()
+
+
+@api_router.post("/gallery-items/thumbnails/backfill", status_code=202)
+async def backfill_thumbnails():
+    """Start (of volg) het aanmaken van thumbnails en hashes voor bestaande lokale items."""
+    return await thumbnail_backfill.start()
+
+
+# ─── Afmetingen (header probe, geen decode) ──────────────────────────────────
+
+DIMENSIONS_BATCH_SIZE = 500
+DIMENSIONS_PENDING_FILTER = {
+    "storage_mode": "both", "width": None, "local_path": {"$ne": None}, "media_type": {"$ne": "video"},
+}
+
+
+@api_router.post("/gallery-items/dimensions/backfill")
+async def backfill_dimensions(limit: int = Query(5000, ge=1, le=100_000)):
+    """
+    Vul width/height van al lokaal opgeslagen items door alleen de header van
+    het bestand te lezen. Werkt in batches (één thread-hop en één bulk_write per
+    batch); roep opnieuw aan zolang `remaining` > 0.
+    """
+    processed = updated = 0
+
+    async def flush(batch: List[dict]):
+        nonlocal updated
+        dims = await asyncio.to_thread(imaging.probe_files, [str(_local_file(i["local_path"])) for i in batch])
+        ops = [
+            UpdateOne({"id": item["id"]}, {"$set": {"width": d[0], "height": d[1], "updated_at": _now()}})
+            for item, d in zip(batch, dims) if d
+        ]
+        if ops:
+            await db.gallery_items.bulk_write(ops, ordered=False)
+        updated += len(ops)
+
+    batch = []
+    cursor = db.gallery_items.find(DIMENSIONS_PENDING_FILTER, {"_id": 0, "id": 1, "local_path": 1}).limit(limit)
+    async for item in cursor:
+        batch.append(item)
+        processed += 1
+        if len(batch) >= DIMENSIONS_BATCH_SIZE:
+            await flush(batch)
+            batch = []
+    if batch:
+        await flush(batch)
+    if updated:
+        await event_bus.publish("resync", {})
+
+    return {
+        "processed": processed,
+        "updated": updated,
+        "failed": processed - updated,
+        "remaining": await db.gallery_items.count_documents(DIMENSIONS_PENDING_FILTER),
+    }
+
+
+# ─── Download jobs (server-side bulk download) ───────────────────────────────
+
+DOWNLOAD_WORKERS = int(os.environ.get("DOWNLOAD_WORKERS", "4"))
+DOWNLOAD_PENDING_FILTER = {"storage_mode": {"$ne": "both"}, "image_url": {"$ne": None}}
+ACTIVE_JOB_STATUSES = ["queued", "running"]
+JOB_ERRORS_KEPT = 100
+JOB_EVENT_INTERVAL = 0.5
+# Item-ids van een job staan in `download_job_items`, per JOB_CHUNK_SIZE in één
+# document: een lijst in het job-document zelf loopt bij grote bibliotheken
+# tegen de 16 MB documentlimiet aan.
+JOB_CHUNK_SIZE = 1000
+# Waarde van download_jobs.active zolang een job queued/running is. De unique
+# sparse index op dat veld laat hooguit één actieve job toe, ook als twee
+# POSTs tegelijk binnenkomen.
+JOB_ACTIVE_LOCK = "download"
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+def _job_view(job: dict) -> dict:
+    """Publieke weergave van een job: zonder item_ids, met voortgang en ETA."""
+    view = {k: v for k, v in job.items() if k not in ("_id", "item_ids", "progress_base", "active")}
+    total = job.get("total", 0)
+    processed = job.get("done", 0) + job.get("failed", 0)
+    view["progress"] = round(processed / total, 4) if total else 1.0
+    view["eta_seconds"] = None
+    # ETA op basis van het tempo sinds (her)start van de job
+    since_start = processed - job.get("progress_base", 0)
+    if job.get("status") == "running" and job.get("started_at") and since_start > 0:
+        elapsed = (datetime.now(timezone.utc) - datetime.fromisoformat(job["started_at"])).total_seconds()
+        view["eta_seconds"] = round(elapsed / since_start * (total - processed), 1)
+    return view
+
+
+class DownloadJobQueue:
+    """
+    Server-side bulk download. Een job wordt in `download_jobs` opgeslagen
+    (voortgang, bytes, fouten) en de items gaan in een asyncio.Queue die door
+    DOWNLOAD_WORKERS workers wordt afgewerkt. Bij startup worden onafgemaakte
+    jobs hervat: items die inmiddels lokaal staan worden overgeslagen.
+    """
+
+    def __init__(self, workers: int):
+        self.workers = workers
+        self._queue: asyncio.Queue = asyncio.Queue()
+        self._tasks: List[asyncio.Task] = []
+        self._last_event: Dict[str, float] = {}
+
+    async def start(self):
+        jobs = await db.download_jobs.find({"status": {"$in": ACTIVE_JOB_STATUSES}}, {"_id": 0}).to_list(None)
+        if not self._tasks:
+            self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+        for job in jobs:
+            await self._resume(job)
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def create(self) -> dict:
+        active = await db.download_jobs.find_one({"active": JOB_ACTIVE_LOCK}, {"_id": 0})
+        if active:
+            return active
+
+        now = _now()
+        job = {
+            "id": str(uuid.uuid4()),
+            "status": "queued",
+            "active": JOB_ACTIVE_LOCK,
+            "total": 0,
+            "done": 0,
+            "failed": 0,
+            "bytes": 0,
+            "errors": [],
+            "progress_base": 0,
+            "created_at": now,
+            "updated_at": now,
+            "started_at": None,
+            "finished_at": None,
+        }
+        try:
+            await db.download_jobs.insert_one(job)
+        except DuplicateKeyError:
+            # Een gelijktijdige POST was ons voor
+            active = await db.download_jobs.find_one({"active": JOB_ACTIVE_LOCK}, {"_id": 0})
+            if active:
+                return active
+            raise HTTPException(409, "Er werd net een andere download job gestart")
+        job.pop("_id", None)
+
+        item_ids = [d["id"] async for d in db.gallery_items.find(DOWNLOAD_PENDING_FILTER, {"_id": 0, "id": 1})]
+        if item_ids:
+            await db.download_job_items.insert_many([
+                {"job_id": job["id"], "seq": seq, "item_ids": item_ids[start:start + JOB_CHUNK_SIZE]}
+                for seq, start in enumerate(range(0, len(item_ids), JOB_CHUNK_SIZE))
+            ])
+            job["total"] = len(item_ids)
+            await db.download_jobs.update_one({"id": job["id"]}, {"$set": {"total": job["total"]}})
+        else:
+            job.update(status="completed", finished_at=now)
+            job.pop("active")
+            await db.download_jobs.update_one(
+                {"id": job["id"]},
+                {"$set": {"status": "completed", "finished_at": now}, "$unset": {"active": ""}},
+            )
+        for item_id in item_ids:
+            self._queue.put_nowait((job["id"], item_id))
+        logger.info(f"Download job {job['id']}: {len(item_ids)} items in de wachtrij")
+        return job
+
+    @staticmethod
+    async def _job_item_ids(job: dict) -> List[str]:
+        if "item_ids" in job:
+            return job["item_ids"]  # job van vóór de chunks
+        chunks = await db.download_job_items.find(
+            {"job_id": job["id"]}, {"_id": 0, "item_ids": 1}
+        ).sort("seq", ASCENDING).to_list(None)
+        return [item_id for chunk in chunks for item_id in chunk["item_ids"]]
+
+    async def _resume(self, job: dict):
+        item_ids = await self._job_item_ids(job)
+        failed_ids = {e["item_id"] for e in job.get("errors", [])}
+        modes: Dict[str, Optional[str]] = {}
+        for start in range(0, len(item_ids), JOB_CHUNK_SIZE):
+            async for d in db.gallery_items.find(
+                {"id": {"$in": item_ids[start:start + JOB_CHUNK_SIZE]}}, {"_id": 0, "id": 1, "storage_mode": 1}
+            ):
+                modes[d["id"]] = d.get("storage_mode")
+        remaining = [i for i in item_ids if i in modes and modes[i] != "both" and i not in failed_ids]
+        # total opnieuw uit de chunks: een crash midden in create() laat hem op 0 staan
+        processed = len(item_ids) - len(remaining)
+        update = {
+            "total": len(item_ids),
+            "done": processed - job.get("failed", 0),
+            "progress_base": processed,
+            "updated_at": _now(),
+        }
+        if remaining:
+            update.update(status="running", started_at=_now(), active=JOB_ACTIVE_LOCK)
+            change = {"$set": update}
+        else:
+            update.update(status="completed", finished_at=_now())
+            change = {"$set": update, "$unset": {"active": ""}}
+        await db.download_jobs.update_one({"id": job["id"]}, change)
+        for item_id in remaining:
+            self._queue.put_nowait((job["id"], item_id))
+        logger.info(f"Download job {job['id']} hervat: {len(remaining)} items resterend")
+
+    async def _worker(self):
+        while True:
+            job_id, item_id = await self._queue.get()
+            try:
+                await self._process(job_id, item_id)
+            except Exception:
+                logger.exception(f"Download job {job_id}: item {item_id} mislukt")
+            finally:
+                self._queue.task_done()
+
+    async def _process(self, job_id: str, item_id: str):
+        await db.download_jobs.update_one(
+            {"id": job_id, "status": "queued"},
+            {"$set": {"status": "running", "started_at": _now()}}
+        )
+        error = None
+        inc = {}
+        item = await db.gallery_items.find_one({"id": item_id}, {"_id": 0})
+        if item is None:
+            error = "Item niet gevonden"
+        elif item.get("storage_mode") == "both":
+            inc = {"done": 1}
+        else:
+            try:
+                result = await _download_item(item)
+                inc = {"done": 1, "bytes": result["bytes"]}
+            except HTTPException as e:
+                error = e.detail
+            except Exception as e:
+                error = str(e)
+
+        update: dict = {"$set": {"updated_at": _now()}}
+        if error:
+            inc = {"failed": 1}
+            update["$push"] = {"errors": {"$each": [{"item_id": item_id, "error": error}], "$slice": -JOB_ERRORS_KEPT}}
+        update["$inc"] = inc
+        job = await db.download_jobs.find_one_and_update(
+            {"id": job_id}, update,
+            projection={"_id": 0, "item_ids": 0, "active": 0},
+            return_document=ReturnDocument.AFTER,
+        )
+        if job and job["done"] + job["failed"] >= job["total"]:
+            finished = {"status": "completed", "finished_at": _now()}
+            # Alleen de worker die de job afsluit krijgt het document terug
+            before = await db.download_jobs.find_one_and_update(
+                {"id": job_id, "status": {"$ne": "completed"}},
+                {"$set": finished, "$unset": {"active": ""}},
+                projection={"_id": 0, "status": 1},
+            )
+            if before:
+                job.update(finished)
+                logger.info(f"Download job {job_id} klaar: {job['done']} gedownload, {job['failed']} fouten")
+        if job:
+            await self._publish_progress(job)
+
+    async def _publish_progress(self, job: dict):
+        """Voortgang als event, hoogstens elke JOB_EVENT_INTERVAL seconden (plus het eindresultaat)."""
+        now = time.monotonic()
+        if job["status"] == "completed":
+            self._last_event.pop(job["id"], None)
+        elif now - self._last_event.get(job["id"], 0) < JOB_EVENT_INTERVAL:
+            return
+        else:
+            self._last_event[job["id"]] = now
+        await event_bus.publish("download", _job_view(job))
+
+
+download_queue = DownloadJobQueue(DOWNLOAD_WORKERS)
+
+
+@api_router.post("/gallery-items/download/jobs", status_code=202)
+async def create_download_job():
+    """Zet alle nog niet lokaal opgeslagen items in de download-wachtrij (of geef de actieve job terug)."""
+    return _job_view(await download_queue.create())
+
+@api_router.get("/gallery-items/download/jobs")
+async def list_download_jobs(limit: int = Query(20, ge=1, le=100)):
+    jobs = await db.download_jobs.find({}, {"_id": 0, "item_ids": 0}).sort("created_at", DESCENDING).to_list(limit)
+    return [_job_view(job) for job in jobs]
+
+@api_router.get("/gallery-items/download/jobs/{job_id}")
+async def get_download_job(job_id: str):
+    job = await db.download_jobs.find_one({"id": job_id}, {"_id": 0, "item_ids": 0})
+    if not job:
+        raise HTTPException(404, "Job niet gevonden")
+    return _job_view(job)
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# VERGELIJKBARE AFBEELDINGEN  (dHash + hamming-index in het geheugen)
+# ═══════════════════════════════════════════════════════════════════════════════
+
+# Elke lokaal opgeslagen afbeelding krijgt een 64-bit dHash (metadata.dhash, hex).
+# Alle hashes staan als één uint64 array in het geheugen: één item vergelijken
+# met 100k hashes is een enkele XOR + popcount (< 1 ms). Het rapport met
+# bijna-duplicaten gebruikt multi-index hashing (zie imaging.near_duplicate_pairs).
+# Wijzigingen in dit proces worden direct bijgewerkt; na HASH_INDEX_TTL seconden
+# wordt de index opnieuw uit Mongo geladen (wijzigingen door andere workers).
+HASH_INDEX_TTL = float(os.environ.get("HASH_INDEX_TTL", "300"))
+SIMILAR_DISTANCE_DEFAULT = 10
+DUPLICATE_DISTANCE_DEFAULT = 4
+# Boven ~10 bits worden de multi-index blokken te smal (≤ 6 bits): de buckets
+# lopen vol, de kosten gaan richting O(n²) en ongerelateerde hashes gaan als
+# "duplicaat" meetellen.
+DUPLICATE_DISTANCE_MAX = 10
+SIMILAR_PROJECTION = {
+    "_id": 0, "id": 1, "title": 1, "created_at": 1,
+    "image_url": 1, "thumbnail_url": 1, "metadata.dhash": 1,
+}
+
+
+class HashIndex:
+    def __init__(self, ttl: float):
+        self._ttl = ttl
+        self._built_at: Optional[float] = None
+        self._lock = asyncio.Lock()
+        self._ids: List[str] = []
+        self._pos: Dict[str, int] = {}
+        self._hashes = np.empty(0, dtype=np.uint64)
+        self._alive = np.empty(0, dtype=bool)
+
+    async def _ensure(self):
+        if self._built_at is not None and time.monotonic() - self._built_at < self._ttl:
+            return
+        async with self._lock:
+            if self._built_at is not None and time.monotonic() - self._built_at < self._ttl:
+                return
+            started = time.monotonic()
+            ids, hashes = [], []
+            cursor = db.gallery_items.find(
+                {"metadata.dhash": {"$ne": None}}, {"_id": 0, "id": 1, "metadata.dhash": 1}
+            )
+            async for doc in cursor:
+                ids.append(doc["id"])
+                hashes.append(int(doc["metadata"]["dhash"], 16))
+            self._ids = ids
+            self._pos = {item_id: i for i, item_id in enumerate(ids)}
+            self._hashes = np.array(hashes, dtype=np.uint64)
+            self._alive = np.ones(len(ids), dtype=bool)
+            self._built_at = time.monotonic()
+            logger.info(f"Hash-index geladen: {len(ids)} hashes in {self._built_at - started:.2f}s")
+
+    def add(self, item_id: str, dhash: str):
+        if self._built_at is None:
+            return  # wordt bij de eerste query volledig geladen
+        value = np.uint64(int(dhash, 16))
+        pos = self._pos.get(item_id)
+        if pos is not None:
+            self._hashes[pos] = value
+            self._alive[pos] = True
+            return
+        self._pos[item_id] = len(self._ids)
+        self._ids.append(item_id)
+        self._hashes = np.append(self._hashes, value)
+        self._alive = np.append(self._alive, True)
+
+    def remove(self, item_id: str):
+        pos = self._pos.get(item_id)
+        if pos is not None:
+            self._alive[pos] = False
+
+    async def similar(self, dhash: str, max_distance: int, limit: int) -> List[Tuple[str, int]]:
+        """(id, afstand) van de dichtstbijzijnde hashes, oplopend op afstand."""
+        await self._ensure()
+        dist = imaging.hamming(self._hashes, int(dhash, 16))
+        hits = np.flatnonzero((dist <= max_distance) & self._alive)
+        hits = hits[np.argsort(dist[hits], kind="stable")][:limit]
+        return [(self._ids[i], int(dist[i])) for i in hits]
+
+    async def duplicate_groups(self, max_distance: int) -> List[Tuple[List[str], int]]:
+        """Groepen bijna-duplicaten; paren zoeken en groeperen gebeurt buiten de event loop."""
+        await self._ensure()
+        alive = np.flatnonzero(self._alive)
+        groups = await asyncio.get_running_loop().run_in_executor(
+            None, imaging.duplicate_groups, self._hashes[alive], max_distance
+        )
+        return [([self._ids[alive[x]] for x in members], worst) for members, worst in groups]
+
+
+hash_index = HashIndex(HASH_INDEX_TTL)
+
+
+@api_router.get("/gallery-items/duplicates/report")
+async def duplicate_report(
+    max_distance: int = Query(DUPLICATE_DISTANCE_DEFAULT, ge=0, le=DUPLICATE_DISTANCE_MAX),
+    limit: int = Query(100, ge=1, le=1000),
+):
+    """Groepen bijna-identieke afbeeldingen, grootste groep eerst."""
+    groups = await hash_index.duplicate_groups(max_distance)
+    groups.sort(key=lambda g: len(g[0]), reverse=True)
+    shown = groups[:limit]
+    ids = [item_id for members, _ in shown for item_id in members]
+    docs = {d["id"]: d async for d in db.gallery_items.find({"id": {"$in": ids}}, SIMILAR_PROJECTION)}
+    return {
+        "max_distance": max_distance,
+        "total_groups": len(groups),
+        "items_in_groups": sum(len(members) for members, _ in groups),
+        "groups": [
+            {
+                "size": len(members),
+                "max_distance": worst,
+                "items": [docs[item_id] for item_id in members if item_id in docs],
+            }
+            for members, worst in shown
+        ],
+    }
+
+
+@api_router.get("/gallery-items/{item_id}/similar")
+async def similar_items(
+    item_id: str,
+    max_distance: int = Query(SIMILAR_DISTANCE_DEFAULT, ge=0, le=32),
+    limit: int = Query(20, ge=1, le=200),
+):
+    """Afbeeldingen met een dHash binnen `max_distance` bits van dit item."""
+    item = await db.gallery_items.find_one({"id": item_id}, {"_id": 0, "id": 1, "metadata.dhash": 1})
+    if not item:
+        raise HTTPException(404, "Item niet gevonden")
+    dhash = (item.get("metadata") or {}).get("dhash")
+    if not dhash:
+        raise HTTPException(409, "Item heeft nog geen hash – sla het eerst lokaal op")
+    hits = [(hid, d) for hid, d in await hash_index.similar(dhash, max_distance, limit + 1) if hid != item_id][:limit]
+    docs = {d["id"]: d async for d in db.gallery_items.find({"id": {"$in": [h for h, _ in hits]}}, SIMILAR_PROJECTION)}
+    return {
+        "id": item_id,
+        "dhash": dhash,
+        "max_distance": max_distance,
+        "items": [{**docs[hid], "distance": d} for hid, d in hits if hid in docs],
+    }
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# LOKALE MEDIA  (/api/downloads: cache headers en range requests)
+# ═══════════════════════════════════════════════════════════════════════════════
+
+# Alleen blobs onder _blobs/ zijn content-addressed: hun pad verandert mee met
+# de inhoud, dus die mag de browser een jaar cachen zonder te hervalideren. De
+# paden per item (<item_id>/main.jpg, thumbs/grid.webp) kunnen bij een nieuwe
+# download of thumbnail-generatie herschreven worden; die krijgen een korte
+# max-age en worden daarna via ETag/Last-Modified gehervalideerd (304).
+MEDIA_IMMUTABLE_MAX_AGE = int(os.environ.get("MEDIA_IMMUTABLE_MAX_AGE", str(365 * 24 * 3600)))
+MEDIA_MAX_AGE = int(os.environ.get("MEDIA_MAX_AGE", "300"))
+MEDIA_IMMUTABLE_HEADERS = {
+    "Cache-Control": f"public, max-age={MEDIA_IMMUTABLE_MAX_AGE}, immutable",
+    "Accept-Ranges": "bytes",
+}
+MEDIA_HEADERS = {
+    "Cache-Control": f"public, max-age={MEDIA_MAX_AGE}, must-revalidate",
+    "Accept-Ranges": "bytes",
+}
+_RANGE_RE = re.compile(r"bytes=(\d*)-(\d*)")
+
+
+def _parse_range(value: str, size: int) -> Optional[Tuple[int, int]]:
+    """
+    Eén byte-range → (start, end), end inclusief. None als de header niet
+    bruikbaar is (dan volgt het hele bestand, zoals RFC 9110 toestaat), ook bij
+    meerdere ranges. start >= size betekent: niet te leveren (416).
+    """
+    m = _RANGE_RE.fullmatch(value.strip())
+    if not m or not (m[1] or m[2]):
+        return None
+    if not m[1]:
+        # Suffix-range: de laatste n bytes
+        return max(size - int(m[2]), 0) if int(m[2]) else size, size - 1
+    start = int(m[1])
+    if m[2] and int(m[2]) < start:
+        return None
+    return start, min(int(m[2]), size - 1) if m[2] else size - 1
+
+
+class RangeFileResponse(FileResponse):
+    """206 Partial Content: alleen bytes start..end (inclusief) van het bestand."""
+    chunk_size = 256 * 1024
+
+    def __init__(self, path: str, start: int, end: int, stat_result: os.stat_result, headers: Dict[str, str]):
+        self.start, self.end = start, end
+        super().__init__(
+            path,
+            status_code=206,
+            headers={
+                **headers,
+                "Content-Range": f"bytes {start}-{end}/{stat_result.st_size}",
+                "Content-Length": str(end - start + 1),
+            },
+            stat_result=stat_result,
+        )
+
+    async def __call__(self, scope, receive, send):
+        await send({"type": "http.response.start", "status": self.status_code, "headers": self.raw_headers})
+        if scope["method"].upper() == "HEAD":
+            await send({"type": "http.response.body", "body": b"", "more_body": False})
+            return
+        remaining = self.end - self.start + 1
+        async with await anyio.open_file(self.path, mode="rb") as f:
+            await f.seek(self.start)
+            while remaining:
+                chunk = await f.read(min(self.chunk_size, remaining))
+                if not chunk:  # bestand ingekort tijdens het lezen
+                    break
+                remaining -= len(chunk)
+                await send({"type": "http.response.body", "body": chunk, "more_body": remaining > 0})
+        if remaining:
+            await send({"type": "http.response.body", "body": b"", "more_body": False})
+
+
+class MediaFiles(StaticFiles):
+    """
+    StaticFiles met Cache-Control per pad (immutable voor blobs, kort plus
+    hervalidatie voor de rest), If-None-Match/If-Modified-Since (304) en
+    enkelvoudige byte-ranges (206/416) voor video seeking. Hele bestanden
+    gaan via FileResponse, dat zero-copy `http.response.pathsend` gebruikt als de
+    ASGI-server dat aanbiedt.
+    """
+
+    def file_response(self, full_path, stat_result: os.stat_result, scope, status_code: int = 200) -> Response:
+        request_headers = Headers(scope=scope)
+        headers = self.cache_headers(full_path)
+        response = FileResponse(full_path, status_code=status_code, stat_result=stat_result, headers=headers)
+        if self.is_not_modified(response.headers, request_headers):
+            return NotModifiedResponse(response.headers)
+
+        range_header = request_headers.get("range")
+        if not range_header or not self._if_range_matches(request_headers.get("if-range"), response.headers):
+            return response
+        byte_range = _parse_range(range_header, stat_result.st_size)
+        if byte_range is None:
+            return response
+        start, end = byte_range
+        if start >= stat_result.st_size:
+            return Response(
+                status_code=416,
+                headers={"Content-Range": f"bytes */{stat_result.st_size}", "Accept-Ranges": "bytes"},
+            )
+        return RangeFileResponse(full_path, start, end, stat_result, headers)
+
+    def cache_headers(self, full_path) -> Dict[str, str]:
+        """Immutable alleen voor content-addressed blobs (eerste padsegment _blobs)."""
+        rel = os.path.relpath(full_path, os.path.realpath(self.directory))
+        return MEDIA_IMMUTABLE_HEADERS if rel.split(os.sep, 1)[0] == BLOB_DIR.name else MEDIA_HEADERS
+
+    @staticmethod
+    def _if_range_matches(if_range: Optional[str], response_headers) -> bool:
+        """Zonder If-Range altijd; anders alleen als ETag of Last-Modified nog klopt."""
+        if not if_range:
+            return True
+        return if_range.strip() in (response_headers.get("etag"), response_headers.get("last-modified"))
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# INDEXES  (bij startup aangemaakt en bijgewerkt)
+# ═══════════════════════════════════════════════════════════════════════════════
+
+# Alle indexen die deze app beheert beginnen met MANAGED_INDEX_PREFIX; een
+# beheerde index die hier niet (meer) gedeclareerd is wordt bij startup gedropt.
+# Andere indexen (handmatig aangemaakt) blijven ongemoeid.
+MANAGED_INDEX_PREFIX = "nc_"
+
+# Velden (en gewicht in de ranking) van de full-text zoekindex
+SEARCH_WEIGHTS = {
+    "title": 10,
+    "metadata.nightcafe_creation_id": 10,
+    "prompt_used": 5,
+    "metadata.revised_prompt": 3,
+    "metadata.video_prompt": 3,
+}
+
+MANAGED_INDEXES: Dict[str, List[IndexModel]] = {
+    "gallery_items": [
+        IndexModel([("id", ASCENDING)], name="nc_id_unique", unique=True),
+        IndexModel(
+            [("metadata.nightcafe_creation_id", ASCENDING)],
+            name="nc_creation_id_unique", unique=True, sparse=True,
+        ),
+        IndexModel([("created_at", DESCENDING), ("id", DESCENDING)], name="nc_created_at_id"),
+        IndexModel([("storage_mode", ASCENDING), ("created_at", DESCENDING)], name="nc_storage_mode_created_at"),
+        IndexModel([("updated_at", ASCENDING), ("id", ASCENDING)], name="nc_updated_at_id"),
+        IndexModel(
+            [(field, TEXT) for field in SEARCH_WEIGHTS],
+            name="nc_search_text", weights=SEARCH_WEIGHTS, default_language="english",
+        ),
+    ],
+    "blobs": [
+        IndexModel([("digest", ASCENDING)], name="nc_digest_unique", unique=True),
+        IndexModel([("urls", ASCENDING)], name="nc_urls"),
+    ],
+    "download_jobs": [
+        IndexModel([("id", ASCENDING)], name="nc_id_unique", unique=True),
+        IndexModel([("status", ASCENDING), ("created_at", DESCENDING)], name="nc_status_created_at"),
+        # Hooguit één actieve job (zie JOB_ACTIVE_LOCK)
+        IndexModel([("active", ASCENDING)], name="nc_active_unique", unique=True, sparse=True),
+    ],
+    "download_job_items": [
+        IndexModel([("job_id", ASCENDING), ("seq", ASCENDING)], name="nc_job_id_seq", unique=True),
+    ],
+    "file_cleanup": [
+        IndexModel([("item_id", ASCENDING)], name="nc_item_id"),
+    ],
+    "deleted_items": [
+        # Sweep van achtergebleven download-mappen (FileCleanupQueue)
+        IndexModel([("id", ASCENDING)], name="nc_id"),
+        # Tombstones verlopen vanzelf; sync-tokens ouder dan dit geven reset
+        IndexModel(
+            [("deleted_at", ASCENDING)],
+            name="nc_deleted_at_ttl", expireAfterSeconds=TOMBSTONE_RETENTION_DAYS * 86400,
+        ),
+    ],
+    "prompts": [
+        IndexModel([("id", ASCENDING)], name="nc_id_unique", unique=True),
+        IndexModel([("created_at", DESCENDING), ("id", DESCENDING)], name="nc_created_at_id"),
+    ],
+}
+
+# Opties die bepalen of een bestaande index nog overeenkomt met de declaratie
+_INDEX_OPTIONS = ("unique", "sparse", "partialFilterExpression", "expireAfterSeconds", "weights")
+
+
+def _index_matches(existing: dict, declared: dict) -> bool:
+    if TEXT in declared["key"].values():
+        # Text indexen hebben intern key {_fts, _ftsx}; vergelijk velden via weights
+        weights = declared.get("weights", {})
+        declared_weights = {f: weights.get(f, 1) for f, t in declared["key"].items() if t == TEXT}
+        return (
+            existing.get("weights") == declared_weights
+            and existing.get("default_language") == declared.get("default_language", "english")
+        )
+    if [tuple(k) for k in existing["key"]] != [tuple(k) for k in declared["key"].items()]:
+        return False
+    return all(existing.get(opt) == declared.get(opt) for opt in _INDEX_OPTIONS)
+
+
+async def ensure_indexes():
+    """Maak ontbrekende indexen aan, vervang gewijzigde en drop verouderde beheerde indexen."""
+    for coll_name, models in MANAGED_INDEXES.items():
+        coll = db[coll_name]
+        try:
+            existing = await coll.index_information()
+        except OperationFailure:
+            existing = {}  # collectie bestaat nog niet
+
+        declared = {m.document["name"]: m for m in models}
+        for name, info in existing.items():
+            if name.startswith(MANAGED_INDEX_PREFIX) and name not in declared:
+                logger.info(f"Index verwijderd: {coll_name}.{name}")
+                await coll.drop_index(name)
+
+        for name, model in declared.items():
+            if name in existing:
+                if _index_matches(existing[name], model.document):
+                    continue
+                logger.info(f"Index gewijzigd, opnieuw aanmaken: {coll_name}.{name}")
+                await coll.drop_index(name)
+            try:
+                await coll.create_indexes([model])
+                logger.info(f"Index aangemaakt: {coll_name}.{name}")
+            except OperationFailure as e:
+                # Bijv. bestaande duplicates die een unique index blokkeren
+                logger.error(f"Index {coll_name}.{name} niet aangemaakt: {e}")
 
 
 # ─── App ─────────────────────────────────────────────────────────────────────
 
 app.include_router(api_router)
 
-# Serve lokaal gedownloade bestanden
-app.mount("/api/downloads", StaticFiles(directory=str(DOWNLOAD_DIR)), name="downloads")
+# Serve lokaal gedownloade bestanden (cache headers + range requests)
+app.mount("/api/downloads", MediaFiles(directory=str(DOWNLOAD_DIR)), name="downloads")
 
+app.add_middleware(CompressionMiddleware)
 app.add_middleware(
     CORSMiddleware,
     allow_credentials=True,
@@ -468,7 +3438,74 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+app.add_middleware(MetricsMiddleware)
+
+# ─── Startup / shutdown ──────────────────────────────────────────────────────
+# De ingest buffer (alleen het lokale journal) start als eerste, zodat
+# replay en spoolen ook werken als Mongo bij het opstarten onbereikbaar is.
+# De stappen die Mongo nodig hebben draaien daarna op volgorde; faalt er een
+# met een verbindingsfout, dan start de app toch en worden de resterende
+# stappen op de achtergrond elke DB_STARTUP_RETRY_S seconden opnieuw geprobeerd.
+
+DB_STARTUP_RETRY_S = float(os.environ.get("DB_STARTUP_RETRY_S", "5"))
+
+_db_startup_task: Optional[asyncio.Task] = None
+
+
+async def _run_db_startup(steps: list):
+    """Voer de stappen uit en haal ze één voor één van de lijst (een retry gaat verder waar het stopte)."""
+    while steps:
+        await steps[0]()
+        steps.pop(0)
+    mongo_breaker.success()
+
+
+async def _retry_db_startup(steps: list):
+    while True:
+        await asyncio.sleep(DB_STARTUP_RETRY_S)
+        try:
+            await _run_db_startup(steps)
+        except ConnectionFailure as e:
+            mongo_breaker.failure(e)
+            continue
+        logger.info("Mongo bereikbaar, startup afgerond")
+        return
+
+
+@app.on_event("startup")
+async def startup_ingest_buffer():
+    # Ook in direct mode: de offline spool gebruikt hetzelfde journal
+    await ingest_buffer.start()
+
+@app.on_event("startup")
+async def startup_http_client():
+    get_http_client()
+    logger.info(f"HTTP client: max {HTTP_MAX_CONNECTIONS} verbindingen, HTTP/2 {'aan' if HTTP2_ENABLED else 'uit'}")
+
+@app.on_event("startup")
+async def startup_database():
+    global _db_startup_task
+    steps = [
+        ensure_indexes, ingest_buffer.enable_flush, download_queue.start,
+        event_bus.start, file_cleanup.start, stats_cache.start,
+    ]
+    try:
+        await _run_db_startup(steps)
+    except ConnectionFailure as e:
+        mongo_breaker.failure(e)
+        logger.warning(f"Mongo onbereikbaar bij startup, {len(steps)} stappen worden later opnieuw geprobeerd: {e}")
+        _db_startup_task = asyncio.create_task(_retry_db_startup(steps))
 
 @app.on_event("shutdown")
 async def shutdown_db_client():
+    if _db_startup_task:
+        _db_startup_task.cancel()
+        await asyncio.gather(_db_startup_task, return_exceptions=True)
+    await download_queue.stop()
+    await file_cleanup.stop()
+    await stats_cache.stop()
+    await ingest_buffer.stop()
+    await event_bus.stop()
+    await close_http_client()
+    close_process_pool()
     client.close()
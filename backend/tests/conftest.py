@@ -0,0 +1,124 @@
+"""
+Gedeelde fixtures voor de in-process tests (TestClient op mongomock-motor).
+
+De meeste tests praten via HTTP met een draaiende backend (BASE_URL). Gedrag
+dat alleen in-process te sturen is (storingen, timing, bestanden en blobs op
+schijf) draait tegen server.py met verse state per test; mongomock-motor staat
+in benchmarks/requirements.txt.
+"""
+import io
+import os
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault("MONGO_URL", "mongodb://127.0.0.1:1")
+os.environ.setdefault("DB_NAME", "nc_test")
+
+
+def wait_for(condition, timeout=10.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if condition():
+            return True
+        time.sleep(0.05)
+    return False
+
+
+@pytest.fixture
+def server(tmp_path, monkeypatch):
+    """server.py op een lege mongomock database, met downloads en journal in tmp_path."""
+    server = pytest.importorskip("server")
+    mongomock_motor = pytest.importorskip("mongomock_motor")
+    import asyncio
+
+    client = mongomock_motor.AsyncMongoMockClient()
+    monkeypatch.setattr(server, "client", client)
+    monkeypatch.setattr(server, "db", client["nc_test"])
+    monkeypatch.setattr(server, "DOWNLOAD_DIR", tmp_path / "downloads")
+    monkeypatch.setattr(server, "BLOB_DIR", tmp_path / "downloads" / "_blobs")
+    # asyncio-primitieven en taken horen bij één event loop: per test nieuw
+    monkeypatch.setattr(server, "_download_slots", asyncio.Semaphore(server.DOWNLOAD_CONCURRENCY))
+    monkeypatch.setattr(server, "mongo_breaker", server.MongoBreaker(server.MONGO_BREAKER_FAILURES, 0.2))
+    monkeypatch.setattr(server, "ingest_buffer", server.IngestBuffer(tmp_path / "ingest.journal", 500, 0.05))
+    monkeypatch.setattr(server, "download_queue", server.DownloadJobQueue(server.DOWNLOAD_WORKERS))
+    monkeypatch.setattr(server, "file_cleanup", server.FileCleanupQueue(1))
+    monkeypatch.setattr(server, "event_bus", server.EventBus("memory"))
+    monkeypatch.setattr(server, "stats_cache", server.StatsCache(server.STATS_CACHE_TTL, server.STATS_RECONCILE_S))
+    monkeypatch.setattr(server, "hash_index", server.HashIndex(server.HASH_INDEX_TTL))
+    monkeypatch.setattr(server, "_db_startup_task", None)
+    monkeypatch.setattr(server, "_http_client", None)
+    return server
+
+
+def _png(seed: int) -> bytes:
+    from PIL import Image
+    buf = io.BytesIO()
+    Image.new("RGB", (32 + seed % 32, 24), (seed * 37 % 256, 80, 160)).save(buf, "PNG")
+    return buf.getvalue()
+
+
+class ImageServer:
+    """
+    Lokale HTTP-server met PNG's (HTTP/1.1, keep-alive):
+      /same/<x>      – altijd dezelfde bytes
+      /slow/<n>      – unieke bytes na `delay` seconden
+      /<n>           – unieke bytes per n
+    Houdt bij hoeveel requests tegelijk liepen en over hoeveel verbindingen.
+    """
+
+    def __init__(self, delay: float = 0.2):
+        self.delay = delay
+        self.requests = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.connections = set()
+        self._lock = threading.Lock()
+        images = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                with images._lock:
+                    images.requests += 1
+                    images.in_flight += 1
+                    images.max_in_flight = max(images.max_in_flight, images.in_flight)
+                    images.connections.add(self.client_address)
+                try:
+                    parts = self.path.strip("/").split("/")
+                    if parts[0] == "slow":
+                        time.sleep(images.delay)
+                    body = _png(0) if parts[0] == "same" else _png(int(parts[-1].split(".")[0]) + 1)
+                    self.send_response(200)
+                    self.send_header("Content-Type", "image/png")
+                    self.send_header("Content-Length", str(len(body)))
+                    self.end_headers()
+                    self.wfile.write(body)
+                finally:
+                    with images._lock:
+                        images.in_flight -= 1
+
+        self._httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self._httpd.daemon_threads = True
+        self.url = f"http://127.0.0.1:{self._httpd.server_port}"
+        threading.Thread(target=self._httpd.serve_forever, daemon=True).start()
+
+    def close(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+
+@pytest.fixture
+def image_server():
+    images = ImageServer()
+    yield images
+    images.close()
@@ -0,0 +1,184 @@
+"""Tests for Batch Import - NightCafe Studio Data Bridge
+Testing:
+- POST /api/import/batch - imports a list of creations in one request
+- POST /api/import/batch - duplicates (existing + within the batch) are reported per item
+- POST /api/import/status/batch - resolves many creationIds in one request
+- GET /api/gallery-items?ids= - batch get with _prompt, in requested order
+- POST /api/gallery-items/bulk-delete - deletes items + prompts, reports unknown ids
+- POST /api/import/batch - id-botsing bij een item zonder creation id is een fout, geen 500 (in-process)
+"""
+import pytest
+import requests
+import os
+import uuid
+
+from fastapi.testclient import TestClient
+
+def get_base_url():
+    url = os.environ.get('REACT_APP_BACKEND_URL', '')
+    if not url:
+        env_path = '/app/frontend/.env'
+        if os.path.exists(env_path):
+            with open(env_path) as f:
+                for line in f:
+                    if line.startswith('REACT_APP_BACKEND_URL='):
+                        url = line.strip().split('=', 1)[1]
+                        break
+    return url.rstrip('/')
+
+BASE_URL = get_base_url()
+
+
+def _creation(creation_id, **extra):
+    return {
+        "url": f"https://creator.nightcafe.studio/creation/{creation_id}",
+        "creationId": creation_id,
+        "title": f"TEST_Batch {creation_id}",
+        "prompt": "batch test prompt",
+        **extra,
+    }
+
+
+class TestBatchImport:
+    """POST /api/import/batch"""
+    prefix = f"TEST_batch_{uuid.uuid4().hex[:8]}"
+    created_ids = []
+
+    def test_batch_creates_items(self):
+        payload = [_creation(f"{self.prefix}_{i}") for i in range(3)]
+        r = requests.post(f"{BASE_URL}/api/import/batch", json=payload)
+        assert r.status_code == 200, f"Expected 200, got {r.status_code}: {r.text}"
+        data = r.json()
+        assert data['success'] is True
+        assert data['total'] == 3
+        assert data['created'] == 3
+        assert data['duplicates'] == 0
+        assert [res['status'] for res in data['results']] == ['created'] * 3
+        for res in data['results']:
+            assert res['id']
+            assert res['prompt_id']
+        TestBatchImport.created_ids = [res['id'] for res in data['results']]
+
+    def test_batch_reports_duplicates(self):
+        assert TestBatchImport.created_ids, "Need created_ids from previous test"
+        new_id = f"{self.prefix}_new"
+        payload = [
+            _creation(f"{self.prefix}_0"),   # al geïmporteerd
+            _creation(new_id),
+            _creation(new_id),               # dubbel binnen de batch
+        ]
+        r = requests.post(f"{BASE_URL}/api/import/batch", json=payload)
+        assert r.status_code == 200
+        data = r.json()
+        statuses = [res['status'] for res in data['results']]
+        assert statuses == ['duplicate', 'created', 'duplicate']
+        assert data['results'][0]['id'] == TestBatchImport.created_ids[0]
+        assert data['results'][2]['id'] == data['results'][1]['id']
+        TestBatchImport.created_ids.append(data['results'][1]['id'])
+
+    def test_batch_items_readable(self):
+        for item_id in TestBatchImport.created_ids:
+            r = requests.get(f"{BASE_URL}/api/gallery-items/{item_id}")
+            assert r.status_code == 200
+            item = r.json()
+            assert item['metadata']['nightcafe_creation_id'].startswith(self.prefix)
+            assert '_prompt' in item
+
+    def test_empty_batch(self):
+        r = requests.post(f"{BASE_URL}/api/import/batch", json=[])
+        assert r.status_code == 200
+        assert r.json()['total'] == 0
+
+    def test_status_batch(self):
+        assert TestBatchImport.created_ids, "Need created_ids from previous test"
+        known = f"{self.prefix}_0"
+        unknown = f"{self.prefix}_does_not_exist"
+        r = requests.post(
+            f"{BASE_URL}/api/import/status/batch",
+            json={"creationIds": [known, unknown, known]}
+        )
+        assert r.status_code == 200
+        data = r.json()
+        assert data['total'] == 2
+        assert data['existing'] == 1
+        assert data['results'][known]['exists'] is True
+        assert data['results'][known]['id'] == TestBatchImport.created_ids[0]
+        assert data['results'][known]['importedAt']
+        assert data['results'][unknown] == {"exists": False}
+
+    def test_status_batch_too_large(self):
+        ids = [f"{self.prefix}_{i}" for i in range(1001)]
+        r = requests.post(f"{BASE_URL}/api/import/status/batch", json={"creationIds": ids})
+        assert r.status_code == 413
+
+    def test_batch_get(self):
+        assert len(TestBatchImport.created_ids) >= 2, "Need created_ids from previous test"
+        first, second = TestBatchImport.created_ids[:2]
+        r = requests.get(f"{BASE_URL}/api/gallery-items", params={"ids": f"{second},does-not-exist,{first}"})
+        assert r.status_code == 200
+        items = r.json()
+        assert [i['id'] for i in items] == [second, first]
+        for item in items:
+            assert item['_prompt']['id'] == item['prompt_id']
+            assert '_id' not in item and '_id' not in item['_prompt']
+
+    def test_batch_get_too_many(self):
+        ids = ",".join(f"{self.prefix}_{i}" for i in range(201))
+        r = requests.get(f"{BASE_URL}/api/gallery-items", params={"ids": ids})
+        assert r.status_code == 413
+
+    def test_cleanup(self):
+        for item_id in TestBatchImport.created_ids:
+            r = requests.delete(f"{BASE_URL}/api/gallery-items/{item_id}")
+            assert r.status_code == 200
+
+
+class TestBulkDelete:
+    """POST /api/gallery-items/bulk-delete"""
+    prefix = f"TEST_bulkdel_{uuid.uuid4().hex[:8]}"
+
+    def test_bulk_delete(self):
+        payload = [_creation(f"{self.prefix}_{i}") for i in range(3)]
+        r = requests.post(f"{BASE_URL}/api/import/batch", json=payload)
+        assert r.status_code == 200
+        results = r.json()['results']
+        ids = [res['id'] for res in results]
+        prompt_ids = [res['prompt_id'] for res in results]
+
+        r = requests.post(f"{BASE_URL}/api/gallery-items/bulk-delete", json={"ids": ids + ["does-not-exist"]})
+        assert r.status_code == 200
+        data = r.json()
+        assert data['deleted'] == 3
+        assert data['not_found'] == ["does-not-exist"]
+        for item_id in ids:
+            assert requests.get(f"{BASE_URL}/api/gallery-items/{item_id}").status_code == 404
+        remaining = {p['id'] for p in requests.get(f"{BASE_URL}/api/prompts").json()}
+        assert not remaining & set(prompt_ids)
+
+    def test_bulk_delete_empty(self):
+        r = requests.post(f"{BASE_URL}/api/gallery-items/bulk-delete", json={"ids": []})
+        assert r.status_code == 200
+        assert r.json()['deleted'] == 0
+
+    def test_bulk_delete_too_many(self):
+        ids = [f"{self.prefix}_{i}" for i in range(5001)]
+        r = requests.post(f"{BASE_URL}/api/gallery-items/bulk-delete", json={"ids": ids})
+        assert r.status_code == 413
+
+
+class TestBatchImportInProcess:
+    """In-process (zie conftest.py): botsingen die via HTTP niet te sturen zijn"""
+
+    def test_id_collision_without_creation_id(self, server, monkeypatch):
+        taken = str(uuid.uuid4())
+        real_map_to_db = server.map_to_db
+        monkeypatch.setattr(server, "map_to_db", lambda creation, _id, now=None: real_map_to_db(creation, taken, now))
+        with TestClient(server.app) as cl:
+            # Bestaand document met dezelfde id en zonder metadata
+            cl.portal.call(lambda: server.db.gallery_items.insert_one({"id": taken, "title": "TEST_Legacy"}))
+            r = cl.post("/api/import/batch", json=[{
+                "url": "https://creator.nightcafe.studio/creation/none",
+                "title": "TEST_Batch zonder creation id",
+            }])
+            assert r.status_code == 200, r.text
+            assert r.json()['results'][0]['status'] == "error"
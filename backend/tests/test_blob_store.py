@@ -0,0 +1,129 @@
+"""Tests for Blob Store - NightCafe Studio Data Bridge
+Testing:
+- POST /api/gallery-items/{id}/download - identieke bytes van twee items staan één keer in de blob store
+- POST /api/gallery-items/bulk-delete - na het verwijderen van beide items verdwijnt de blob
+- _download_item - item verwijderd tijdens de download: refcount wordt teruggegeven, geen lek
+- _download_item - gelijktijdige downloads van hetzelfde item tellen één keer mee
+- Startup-sweep - alleen mappen van verwijderde items (tombstone), nooit onbekende mappen
+- MediaFiles - immutable Cache-Control alleen voor _blobs/, per-item paden hervalideren
+
+In-process (zie conftest.py).
+"""
+import asyncio
+import uuid
+from datetime import datetime, timezone
+
+import pytest
+from fastapi import HTTPException
+from fastapi.testclient import TestClient
+from starlette.applications import Starlette
+
+from conftest import wait_for
+
+
+def _import(cl, image_url):
+    creation_id = f"TEST_blob_{uuid.uuid4().hex[:8]}"
+    r = cl.post("/api/import", json={
+        "url": f"https://creator.nightcafe.studio/creation/{creation_id}",
+        "creationId": creation_id,
+        "imageUrl": image_url,
+    })
+    assert r.status_code == 201, r.text
+    return r.json()['id']
+
+
+def _blob_files(server):
+    return sorted(p for p in server.BLOB_DIR.rglob("*") if p.is_file())
+
+
+def _blobs(cl, server):
+    return cl.portal.call(lambda: server.db.blobs.find({}, {"_id": 0}).to_list(None))
+
+
+class TestBlobStore:
+    def test_same_bytes_stored_once_and_reclaimed(self, server, image_server):
+        with TestClient(server.app) as cl:
+            first = _import(cl, f"{image_server.url}/same/a.png")
+            second = _import(cl, f"{image_server.url}/same/b.png")
+            for item_id in (first, second):
+                assert cl.post(f"/api/gallery-items/{item_id}/download").status_code == 200
+
+            blobs = _blobs(cl, server)
+            assert len(blobs) == 1
+            assert blobs[0]['refcount'] == 2
+            assert len(_blob_files(server)) == 1
+            for item_id in (first, second):
+                assert (server.DOWNLOAD_DIR / item_id / "main.png").read_bytes() == _blob_files(server)[0].read_bytes()
+
+            r = cl.post("/api/gallery-items/bulk-delete", json={"ids": [first, second]})
+            assert r.json()['deleted'] == 2
+            assert wait_for(lambda: not _blob_files(server) and not _blobs(cl, server))
+            assert not (server.DOWNLOAD_DIR / first).exists()
+            assert not (server.DOWNLOAD_DIR / second).exists()
+
+    def test_deleted_during_download_releases_refcount(self, server, image_server):
+        with TestClient(server.app) as cl:
+            # Een item dat (niet meer) in de database staat: de update vindt niets
+            item = {"id": str(uuid.uuid4()), "image_url": f"{image_server.url}/same/gone.png", "metadata": {}}
+
+            async def download():
+                with pytest.raises(HTTPException) as exc:
+                    await server._download_item(item)
+                return exc.value.status_code
+
+            assert cl.portal.call(download) == 404
+            assert _blobs(cl, server) == []
+            assert _blob_files(server) == []
+            assert not (server.DOWNLOAD_DIR / item["id"]).exists()
+
+    def test_concurrent_downloads_of_same_item_counted_once(self, server, image_server):
+        with TestClient(server.app) as cl:
+            item_id = _import(cl, f"{image_server.url}/same/a.png")
+            item = cl.get(f"/api/gallery-items/{item_id}").json()
+
+            async def download_twice():
+                return await asyncio.gather(server._download_item(dict(item)), server._download_item(dict(item)))
+
+            cl.portal.call(download_twice)
+            blobs = _blobs(cl, server)
+            assert len(blobs) == 1 and blobs[0]['refcount'] == 1
+            assert cl.get("/api/gallery-items/download/stats").json()['local'] == 1
+
+            assert cl.delete(f"/api/gallery-items/{item_id}").status_code == 200
+            assert wait_for(lambda: not _blob_files(server) and not _blobs(cl, server))
+
+    def test_startup_sweep_only_removes_deleted_items(self, server):
+        deleted, foreign = str(uuid.uuid4()), str(uuid.uuid4())
+        for item_id in (deleted, foreign):
+            (server.DOWNLOAD_DIR / item_id).mkdir(parents=True)
+            (server.DOWNLOAD_DIR / item_id / "main.png").write_bytes(b"x")
+        with TestClient(server.app) as cl:
+            cl.portal.call(lambda: server.db.deleted_items.insert_one(
+                {"id": deleted, "deleted_at": datetime.now(timezone.utc)}
+            ))
+            cl.portal.call(server.file_cleanup._sweep_orphans)
+        assert not (server.DOWNLOAD_DIR / deleted).exists()
+        # Geen tombstone (bijv. een andere database): blijft staan
+        assert (server.DOWNLOAD_DIR / foreign / "main.png").exists()
+
+    def test_immutable_only_for_blobs(self, server, image_server):
+        with TestClient(server.app) as cl:
+            item_id = _import(cl, f"{image_server.url}/same/a.png")
+            assert cl.post(f"/api/gallery-items/{item_id}/download").status_code == 200
+        blob = _blob_files(server)[0].relative_to(server.DOWNLOAD_DIR).as_posix()
+
+        media = Starlette()
+        media.mount("/media", server.MediaFiles(directory=str(server.DOWNLOAD_DIR)))
+        with TestClient(media) as cl:
+            r = cl.get(f"/media/{blob}")
+            assert r.status_code == 200
+            assert 'immutable' in r.headers['cache-control']
+
+            r = cl.get(f"/media/{item_id}/main.png")
+            assert r.status_code == 200
+            assert 'immutable' not in r.headers['cache-control']
+            assert 'must-revalidate' in r.headers['cache-control']
+            r = cl.get(f"/media/{item_id}/main.png", headers={"If-None-Match": r.headers['etag']})
+            assert r.status_code == 304
+            r = cl.get(f"/media/{item_id}/main.png", headers={"Range": "bytes=0-9"})
+            assert r.status_code == 206 and 'immutable' not in r.headers['cache-control']
@@ -0,0 +1,114 @@
+"""Tests for Delta Sync - NightCafe Studio Data Bridge
+Testing:
+- GET /api/gallery-items/changes - without a token returns reset + next_token
+- GET /api/gallery-items/changes?since= - new, updated and deleted items since the token
+- GET /api/gallery-items/changes?since= - invalid token returns 400
+- ETag / If-None-Match on list and stats endpoints - unchanged poll returns 304 (ook gecomprimeerd: sterke tag met "-gzip")
+"""
+import pytest
+import requests
+import os
+import uuid
+
+def get_base_url():
+    url = os.environ.get('REACT_APP_BACKEND_URL', '')
+    if not url:
+        env_path = '/app/frontend/.env'
+        if os.path.exists(env_path):
+            with open(env_path) as f:
+                for line in f:
+                    if line.startswith('REACT_APP_BACKEND_URL='):
+                        url = line.strip().split('=', 1)[1]
+                        break
+    return url.rstrip('/')
+
+BASE_URL = get_base_url()
+
+
+def _all_changes(token):
+    """Volg has_more tot het einde; geeft (items, deleted, next_token)."""
+    items, deleted = [], []
+    while True:
+        r = requests.get(f"{BASE_URL}/api/gallery-items/changes", params={"since": token})
+        assert r.status_code == 200
+        data = r.json()
+        assert data['reset'] is False
+        items += data['items']
+        deleted += data['deleted']
+        token = data['next_token']
+        if not data['has_more']:
+            return items, deleted, token
+
+
+class TestChanges:
+    """GET /api/gallery-items/changes"""
+    token = None
+    item_id = None
+
+    def test_initial_token(self):
+        r = requests.get(f"{BASE_URL}/api/gallery-items/changes")
+        assert r.status_code == 200
+        data = r.json()
+        assert data['reset'] is True
+        assert data['next_token']
+        TestChanges.token = data['next_token']
+
+    def test_new_item_in_changes(self):
+        assert TestChanges.token, "Need token from previous test"
+        r = requests.post(f"{BASE_URL}/api/import", json={
+            "url": "https://creator.nightcafe.studio/creation/TEST_changes",
+            "creationId": f"TEST_changes_{uuid.uuid4().hex[:8]}",
+            "title": "TEST_Changes",
+        })
+        assert r.status_code == 201
+        TestChanges.item_id = r.json()['id']
+        items, _, token = _all_changes(TestChanges.token)
+        assert TestChanges.item_id in [i['id'] for i in items]
+        TestChanges.token = token
+
+    def test_deleted_item_tombstone(self):
+        assert TestChanges.item_id, "Need item_id from previous test"
+        r = requests.delete(f"{BASE_URL}/api/gallery-items/{TestChanges.item_id}")
+        assert r.status_code == 200
+        _, deleted, _ = _all_changes(TestChanges.token)
+        assert TestChanges.item_id in deleted
+
+    def test_invalid_token_returns_400(self):
+        r = requests.get(f"{BASE_URL}/api/gallery-items/changes", params={"since": "not-a-token"})
+        assert r.status_code == 400
+
+
+class TestETags:
+    """If-None-Match on list endpoints"""
+
+    @pytest.mark.parametrize("path", [
+        "/api/gallery-items/page?limit=10",
+        "/api/gallery-items",
+        "/api/prompts/page?limit=10",
+        "/api/gallery-items/stats/summary",
+        "/api/gallery-items/download/stats",
+    ])
+    def test_unchanged_returns_304(self, path):
+        r = requests.get(f"{BASE_URL}{path}")
+        assert r.status_code == 200
+        etag = r.headers.get('etag')
+        assert etag and etag.startswith('"')
+        r2 = requests.get(f"{BASE_URL}{path}", headers={"If-None-Match": etag})
+        assert r2.status_code == 304
+        assert r2.content == b''
+
+    def test_compressed_etag_stays_strong(self):
+        """Gecomprimeerd: sterke ETag met de encoding binnen de quotes"""
+        r = requests.get(f"{BASE_URL}/api/gallery-items", headers={"Accept-Encoding": "gzip"})
+        etag = r.headers['etag']
+        assert etag.startswith('"')
+        if r.headers.get('content-encoding') == 'gzip':
+            assert etag.endswith('-gzip"')
+        r2 = requests.get(f"{BASE_URL}/api/gallery-items", headers={"Accept-Encoding": "gzip", "If-None-Match": etag})
+        assert r2.status_code == 304
+        assert r2.headers['etag'] == etag
+
+    def test_etag_depends_on_query(self):
+        a = requests.get(f"{BASE_URL}/api/gallery-items/page", params={"limit": 5}).headers['etag']
+        b = requests.get(f"{BASE_URL}/api/gallery-items/page", params={"limit": 6}).headers['etag']
+        assert a != b
@@ -4,6 +4,10 @@ Testing:
 - POST /api/gallery-items/{id}/download - downloads images from URL to local storage
 - POST /api/gallery-items/{id}/download - duplicate download returns 'Al lokaal opgeslagen'
 - GET /api/downloads/{item_id}/{filename} - serves downloaded files
+- GET /api/downloads/... - Cache-Control met hervalidatie (immutable alleen voor _blobs/), 304 revalidation, byte ranges (206/416)
+- POST/GET /api/gallery-items/download/jobs - server-side bulk download jobs with progress
+- POST /api/gallery-items/thumbnails/backfill - WebP thumbnails for locally stored items
+- POST /api/gallery-items/dimensions/backfill - width/height from file headers
 """
 import pytest
 import requests
@@ -126,6 +130,48 @@ class TestServeDownloadedFiles:
         assert r.status_code == 404
 
 
+class TestMediaCaching:
+    """Cache headers and range requests on /api/downloads"""
+    url = f"{BASE_URL}/api/downloads/{DOWNLOADED_ITEM_ID}/main.jpg"
+
+    def test_revalidated_cache_headers(self):
+        """Per-item paden kunnen herschreven worden: geen immutable, wel hervalidatie"""
+        r = requests.get(self.url)
+        assert r.status_code == 200
+        assert 'immutable' not in r.headers.get('cache-control', '')
+        assert 'must-revalidate' in r.headers.get('cache-control', '')
+        assert r.headers.get('accept-ranges') == 'bytes'
+        assert r.headers.get('etag')
+        assert r.headers.get('last-modified')
+
+    def test_if_none_match_returns_304(self):
+        etag = requests.get(self.url).headers['etag']
+        r = requests.get(self.url, headers={"If-None-Match": etag})
+        assert r.status_code == 304
+
+    def test_range_request(self):
+        full = requests.get(self.url).content
+        r = requests.get(self.url, headers={"Range": "bytes=10-109"})
+        assert r.status_code == 206
+        assert r.headers['content-range'] == f"bytes 10-109/{len(full)}"
+        assert r.content == full[10:110]
+
+    def test_suffix_range(self):
+        full = requests.get(self.url).content
+        r = requests.get(self.url, headers={"Range": "bytes=-16"})
+        assert r.status_code == 206
+        assert r.content == full[-16:]
+
+    def test_unsatisfiable_range(self):
+        r = requests.get(self.url, headers={"Range": "bytes=999999999-"})
+        assert r.status_code == 416
+        assert r.headers['content-range'].startswith("bytes */")
+
+    def test_stale_if_range_returns_full_file(self):
+        r = requests.get(self.url, headers={"Range": "bytes=0-9", "If-Range": '"stale"'})
+        assert r.status_code == 200
+
+
 class TestGalleryItemWithDownload:
     """Verify gallery item endpoint returns download fields"""
     
@@ -154,3 +200,89 @@ class TestGalleryItemWithDownload:
         
         assert data.get('storage_mode') == 'url', f"Expected storage_mode='url', got: {data.get('storage_mode')}"
         assert data.get('local_path') is None, "local_path should be None for non-downloaded"
+
+
+class TestDownloadJobs:
+    """POST/GET /api/gallery-items/download/jobs"""
+    job_id = None
+
+    def test_create_job(self):
+        """Creating a job returns 202 with progress fields (or the already active job)"""
+        r = requests.post(f"{BASE_URL}/api/gallery-items/download/jobs")
+        assert r.status_code == 202
+        data = r.json()
+        for field in ('id', 'status', 'total', 'done', 'failed', 'bytes', 'errors', 'progress', 'eta_seconds'):
+            assert field in data, f"Missing '{field}' field"
+        assert 'item_ids' not in data
+        assert data['status'] in ('queued', 'running', 'completed')
+        TestDownloadJobs.job_id = data['id']
+
+    def test_get_job(self):
+        assert TestDownloadJobs.job_id, "Need job_id from previous test"
+        r = requests.get(f"{BASE_URL}/api/gallery-items/download/jobs/{TestDownloadJobs.job_id}")
+        assert r.status_code == 200
+        data = r.json()
+        assert data['id'] == TestDownloadJobs.job_id
+        assert data['done'] + data['failed'] <= data['total']
+        assert 0 <= data['progress'] <= 1
+
+    def test_list_jobs(self):
+        r = requests.get(f"{BASE_URL}/api/gallery-items/download/jobs")
+        assert r.status_code == 200
+        jobs = r.json()
+        assert isinstance(jobs, list)
+        assert any(j['id'] == TestDownloadJobs.job_id for j in jobs)
+
+    def test_get_nonexistent_job_returns_404(self):
+        r = requests.get(f"{BASE_URL}/api/gallery-items/download/jobs/nonexistent-job")
+        assert r.status_code == 404
+
+
+class TestThumbnails:
+    """POST /api/gallery-items/thumbnails/backfill"""
+
+    def test_backfill_returns_progress(self):
+        r = requests.post(f"{BASE_URL}/api/gallery-items/thumbnails/backfill")
+        assert r.status_code == 202
+        data = r.json()
+        for field in ('running', 'pending', 'processed', 'failed'):
+            assert field in data, f"Missing '{field}' field"
+
+    def test_local_items_thumbnail_served(self):
+        r = requests.get(f"{BASE_URL}/api/gallery-items")
+        local = [i for i in r.json() if i.get('thumbnail_url')]
+        if not local:
+            pytest.skip("No items with thumbnails")
+        item = local[0]
+        assert item['thumbnail_url'].endswith('/thumbs/grid.webp')
+        img = requests.get(f"{BASE_URL}{item['thumbnail_url']}")
+        assert img.status_code == 200
+        assert img.content[8:12] == b'WEBP'
+
+
+class TestDimensions:
+    """width/height from header probing"""
+
+    def test_dimensions_backfill(self):
+        r = requests.post(f"{BASE_URL}/api/gallery-items/dimensions/backfill", params={"limit": 100})
+        assert r.status_code == 200
+        data = r.json()
+        for field in ('processed', 'updated', 'failed', 'remaining'):
+            assert field in data, f"Missing '{field}' field"
+        assert data['updated'] + data['failed'] == data['processed']
+
+    def test_local_items_have_dimensions(self):
+        r = requests.get(f"{BASE_URL}/api/gallery-items")
+        local = [i for i in r.json() if i.get('storage_mode') == 'both' and i.get('media_type') != 'video']
+        if not local:
+            pytest.skip("No local items")
+        sized = [i for i in local if i.get('width')]
+        assert sized, "Expected local items with width/height"
+        assert all(i['width'] > 0 and i['height'] > 0 for i in sized)
+
+    def test_page_filter_by_resolution(self):
+        r = requests.get(f"{BASE_URL}/api/gallery-items/page", params={"min_width": 512, "min_height": 512})
+        assert r.status_code == 200
+        for item in r.json()['items']:
+            assert item['width'] >= 512
+            assert item['height'] >= 512
@@ -0,0 +1,136 @@
+"""Tests for Download Jobs - NightCafe Studio Data Bridge
+Testing:
+- POST /api/gallery-items/download/jobs - item-ids in chunks (download_job_items), niet in het job-document
+- POST /api/gallery-items/download/jobs - gelijktijdige POSTs leveren één actieve job op
+- Startup - een onderbroken job wordt hervat vanuit zijn chunks
+- Voortgang - "download" events tot en met completed; de gedeelde HTTP client hergebruikt zijn verbinding
+
+In-process (zie conftest.py).
+"""
+import asyncio
+import uuid
+
+import pytest
+from fastapi.testclient import TestClient
+from pymongo.errors import DuplicateKeyError
+
+from conftest import wait_for
+
+
+def _import_many(cl, image_server, n):
+    payload = [
+        {
+            "url": f"https://creator.nightcafe.studio/creation/TEST_job_{uuid.uuid4().hex[:8]}",
+            "creationId": f"TEST_job_{uuid.uuid4().hex[:8]}",
+            "imageUrl": f"{image_server.url}/{i}.png",
+        }
+        for i in range(n)
+    ]
+    r = cl.post("/api/import/batch", json=payload)
+    assert r.json()['created'] == n
+    return [res['id'] for res in r.json()['results']]
+
+
+def _job(cl, job_id):
+    return cl.get(f"/api/gallery-items/download/jobs/{job_id}").json()
+
+
+class TestDownloadJobs:
+    def test_items_stored_in_chunks(self, server, image_server, monkeypatch):
+        monkeypatch.setattr(server, "JOB_CHUNK_SIZE", 2)
+        with TestClient(server.app) as cl:
+            _import_many(cl, image_server, 5)
+            r = cl.post("/api/gallery-items/download/jobs")
+            assert r.status_code == 202
+            job = r.json()
+            assert job['total'] == 5
+            assert 'item_ids' not in job and 'active' not in job
+
+            stored = cl.portal.call(lambda: server.db.download_jobs.find_one({"id": job['id']}))
+            assert 'item_ids' not in stored
+            chunks = cl.portal.call(
+                lambda: server.db.download_job_items.find({"job_id": job['id']}).sort("seq", 1).to_list(None)
+            )
+            assert [len(c['item_ids']) for c in chunks] == [2, 2, 1]
+
+            assert wait_for(lambda: _job(cl, job['id'])['status'] == "completed")
+            assert _job(cl, job['id'])['done'] == 5
+            # Afgerond: een nieuwe POST maakt een nieuwe (lege) job
+            assert cl.post("/api/gallery-items/download/jobs").json()['id'] != job['id']
+
+    def test_concurrent_create_single_job(self, server, image_server, monkeypatch):
+        image_server.delay = 0.5
+        with TestClient(server.app) as cl:
+            ids = _import_many(cl, image_server, 2)
+            cl.portal.call(lambda: server.db.gallery_items.update_many(
+                {"id": {"$in": ids}}, {"$set": {"image_url": f"{image_server.url}/slow/1.png"}}
+            ))
+            first = cl.post("/api/gallery-items/download/jobs").json()
+
+            # De unique index weigert een tweede actieve job
+            with pytest.raises(DuplicateKeyError):
+                cl.portal.call(lambda: server.db.download_jobs.insert_one(
+                    {"id": str(uuid.uuid4()), "status": "queued", "active": server.JOB_ACTIVE_LOCK}
+                ))
+
+            # Race: de voorcontrole ziet de andere job (nog) niet; create() geeft hem alsnog terug
+            jobs = server.db.download_jobs
+            real_find_one = jobs.find_one
+            calls = []
+
+            async def find_one_missing_first(*args, **kwargs):
+                calls.append(args)
+                return None if len(calls) == 1 else await real_find_one(*args, **kwargs)
+
+            monkeypatch.setattr(jobs, "find_one", find_one_missing_first)
+            second = cl.post("/api/gallery-items/download/jobs").json()
+            assert second['id'] == first['id']
+            active = cl.portal.call(lambda: jobs.count_documents({"active": {"$exists": True}}))
+            assert active == 1
+
+    def test_resume_from_chunks(self, server, image_server):
+        job_id = str(uuid.uuid4())
+        with TestClient(server.app) as cl:
+            ids = _import_many(cl, image_server, 3)
+        # Job zoals een crash hem achterlaat: running, nog niets gedaan
+        asyncio.run(server.db.download_jobs.insert_one({
+            "id": job_id, "status": "running", "active": server.JOB_ACTIVE_LOCK,
+            "total": 3, "done": 0, "failed": 0, "bytes": 0, "errors": [], "progress_base": 0,
+            "created_at": server._now(), "updated_at": server._now(), "started_at": server._now(), "finished_at": None,
+        }))
+        asyncio.run(server.db.download_job_items.insert_many([
+            {"job_id": job_id, "seq": 0, "item_ids": ids[:2]},
+            {"job_id": job_id, "seq": 1, "item_ids": ids[2:]},
+        ]))
+        with TestClient(server.app) as cl:
+            assert wait_for(lambda: _job(cl, job_id)['status'] == "completed")
+            assert _job(cl, job_id)['done'] == 3
+            items = cl.get("/api/gallery-items", params={"ids": ",".join(ids)}).json()
+            assert {i['storage_mode'] for i in items} == {"both"}
+
+    def test_progress_events_and_connection_reuse(self, server, image_server, monkeypatch):
+        monkeypatch.setattr(server, "JOB_EVENT_INTERVAL", 0)
+        monkeypatch.setattr(server, "_download_slots", asyncio.Semaphore(1))
+        monkeypatch.setattr(server, "download_queue", server.DownloadJobQueue(1))
+        async def subscribe():
+            return server.event_bus.subscribe()
+
+        with TestClient(server.app) as cl:
+            _import_many(cl, image_server, 4)
+            events = cl.portal.call(subscribe)
+            job = cl.post("/api/gallery-items/download/jobs").json()
+            assert wait_for(lambda: _job(cl, job['id'])['status'] == "completed")
+
+            progress = []
+            while not events.empty():
+                event = events.get_nowait()
+                if event['type'] == "download" and event['data']['id'] == job['id']:
+                    progress.append(event['data'])
+
+        done = [p['done'] for p in progress]
+        assert done == sorted(done) and len(progress) >= 4
+        assert progress[-1]['status'] == "completed" and progress[-1]['done'] == 4
+        assert progress[-1]['bytes'] > 0
+        # Eén keep-alive verbinding voor alle vier de afbeeldingen
+        assert image_server.requests == 4
+        assert len(image_server.connections) == 1
@@ -0,0 +1,33 @@
+"""Tests for Downloader - NightCafe Studio Data Bridge
+Testing:
+- POST /api/gallery-items/{id}/download - alle afbeeldingen van een item parallel,
+  maar nooit meer dan DOWNLOAD_CONCURRENCY transfers tegelijk
+
+In-process (zie conftest.py).
+"""
+import asyncio
+import uuid
+
+from fastapi.testclient import TestClient
+
+
+class TestDownloadConcurrency:
+    def test_respects_concurrency_limit(self, server, image_server, monkeypatch):
+        monkeypatch.setattr(server, "_download_slots", asyncio.Semaphore(2))
+        creation_id = f"TEST_conc_{uuid.uuid4().hex[:8]}"
+        with TestClient(server.app) as cl:
+            r = cl.post("/api/import", json={
+                "url": f"https://creator.nightcafe.studio/creation/{creation_id}",
+                "creationId": creation_id,
+                "imageUrl": f"{image_server.url}/slow/0.png",
+                "allImages": [f"{image_server.url}/slow/{n}.png" for n in range(1, 6)],
+            })
+            item_id = r.json()['id']
+
+            r = cl.post(f"/api/gallery-items/{item_id}/download")
+            assert r.status_code == 200, r.text
+
+        assert image_server.requests == 6
+        assert image_server.max_in_flight == 2
+        files = sorted(p.name for p in (server.DOWNLOAD_DIR / item_id).iterdir() if p.is_file())
+        assert files == ["1.png", "2.png", "3.png", "4.png", "5.png", "main.png"]
@@ -0,0 +1,92 @@
+"""Tests for Server-Sent Events - NightCafe Studio Data Bridge
+Testing:
+- GET /api/events - text/event-stream with a retry hint
+- GET /api/events - an import pushes an 'import' event with the new item
+- GET /api/events - a delete pushes a 'delete' event with the item id
+"""
+import pytest
+import requests
+import os
+import json
+import threading
+import uuid
+
+def get_base_url():
+    url = os.environ.get('REACT_APP_BACKEND_URL', '')
+    if not url:
+        env_path = '/app/frontend/.env'
+        if os.path.exists(env_path):
+            with open(env_path) as f:
+                for line in f:
+                    if line.startswith('REACT_APP_BACKEND_URL='):
+                        url = line.strip().split('=', 1)[1]
+                        break
+    return url.rstrip('/')
+
+BASE_URL = get_base_url()
+
+
+def _read_events(lines, wanted, max_events=50):
+    """
+    Lees SSE-frames tot een event van type `wanted` voorbijkomt. `lines` is de
+    iterator van response.iter_lines(): één iterator per stream, want een
+    weggegooide iterator sluit de onderliggende verbinding.
+    """
+    event_type, data = None, []
+    seen = 0
+    for line in lines:
+        if line.startswith('event: '):
+            event_type = line[len('event: '):]
+        elif line.startswith('data: '):
+            data.append(line[len('data: '):])
+        elif line == '' and event_type:
+            payload = json.loads('\n'.join(data))
+            if event_type == wanted:
+                return payload
+            event_type, data = None, []
+            seen += 1
+            if seen >= max_events:
+                break
+    return None
+
+
+class TestEvents:
+    """GET /api/events"""
+    item_id = None
+
+    def test_stream_headers(self):
+        with requests.get(f"{BASE_URL}/api/events", stream=True, timeout=10) as r:
+            assert r.status_code == 200
+            assert r.headers['content-type'].startswith('text/event-stream')
+            lines = r.iter_lines(decode_unicode=True)
+            assert next(lines).startswith('retry:')
+
+    def test_import_event(self):
+        creation_id = f"TEST_events_{uuid.uuid4().hex[:8]}"
+        with requests.get(f"{BASE_URL}/api/events", stream=True, timeout=10) as r:
+            lines = r.iter_lines(decode_unicode=True)
+            next(lines)  # retry hint: stream is open
+
+            def post():
+                requests.post(f"{BASE_URL}/api/import", json={
+                    "url": f"https://creator.nightcafe.studio/creation/{creation_id}",
+                    "creationId": creation_id,
+                    "title": "TEST_Events",
+                })
+            threading.Thread(target=post).start()
+            payload = _read_events(lines, 'import')
+        assert payload is not None, "No import event received"
+        item = next(i for i in payload['items'] if i['metadata']['nightcafe_creation_id'] == creation_id)
+        TestEvents.item_id = item['id']
+
+    def test_delete_event(self):
+        assert TestEvents.item_id, "Need item_id from previous test"
+        with requests.get(f"{BASE_URL}/api/events", stream=True, timeout=10) as r:
+            lines = r.iter_lines(decode_unicode=True)
+            next(lines)
+            threading.Thread(
+                target=lambda: requests.delete(f"{BASE_URL}/api/gallery-items/{TestEvents.item_id}")
+            ).start()
+            payload = _read_events(lines, 'delete')
+        assert payload is not None, "No delete event received"
+        assert TestEvents.item_id in payload['ids']
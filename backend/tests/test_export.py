@@ -0,0 +1,81 @@
+"""Tests for Export - NightCafe Studio Data Bridge
+Testing:
+- GET /api/export?format=ndjson - one JSON document per line
+- GET /api/export?format=json - a single JSON array
+- GET /api/export?format=csv - header row with the default columns
+- GET /api/export?fields= - field selection, invalid fields return 400
+- GET /api/export?published= - filters are applied
+"""
+import pytest
+import requests
+import os
+import csv
+import io
+import json
+
+def get_base_url():
+    url = os.environ.get('REACT_APP_BACKEND_URL', '')
+    if not url:
+        env_path = '/app/frontend/.env'
+        if os.path.exists(env_path):
+            with open(env_path) as f:
+                for line in f:
+                    if line.startswith('REACT_APP_BACKEND_URL='):
+                        url = line.strip().split('=', 1)[1]
+                        break
+    return url.rstrip('/')
+
+BASE_URL = get_base_url()
+
+
+class TestExport:
+    """GET /api/export"""
+
+    def test_ndjson(self):
+        r = requests.get(f"{BASE_URL}/api/export", params={"format": "ndjson"}, stream=True)
+        assert r.status_code == 200
+        assert r.headers['content-type'].startswith('application/x-ndjson')
+        assert 'attachment' in r.headers.get('content-disposition', '')
+        docs = [json.loads(line) for line in r.iter_lines() if line]
+        total = requests.get(f"{BASE_URL}/api/gallery-items/stats/summary").json()['total']
+        assert len(docs) == total
+        for doc in docs[:10]:
+            assert '_id' not in doc
+            assert 'id' in doc
+
+    def test_json_is_array(self):
+        r = requests.get(f"{BASE_URL}/api/export", params={"format": "json"})
+        assert r.status_code == 200
+        data = r.json()
+        assert isinstance(data, list)
+        created = [d['created_at'] for d in data]
+        assert created == sorted(created, reverse=True)
+
+    def test_csv_default_columns(self):
+        r = requests.get(f"{BASE_URL}/api/export", params={"format": "csv"})
+        assert r.status_code == 200
+        rows = list(csv.reader(io.StringIO(r.text)))
+        assert rows[0][:3] == ['id', 'title', 'prompt_used']
+        assert 'is_published' in rows[0]
+        assert all(len(row) == len(rows[0]) for row in rows)
+
+    def test_field_selection(self):
+        r = requests.get(f"{BASE_URL}/api/export", params={"format": "json", "fields": "id,title,metadata.source_url"})
+        assert r.status_code == 200
+        for doc in r.json()[:10]:
+            assert set(doc) <= {'id', 'title', 'metadata'}
+            assert set(doc.get('metadata', {})) <= {'source_url'}
+
+    def test_invalid_fields_returns_400(self):
+        r = requests.get(f"{BASE_URL}/api/export", params={"fields": "$where"})
+        assert r.status_code == 400
+
+    def test_invalid_format_returns_422(self):
+        r = requests.get(f"{BASE_URL}/api/export", params={"format": "xml"})
+        assert r.status_code == 422
+
+    def test_published_filter(self):
+        r = requests.get(f"{BASE_URL}/api/export", params={"format": "json", "published": "true"})
+        assert r.status_code == 200
+        for doc in r.json():
+            assert doc['metadata']['is_published'] is True
@@ -3,6 +3,7 @@ import pytest
 import requests
 import os
 import json
+import uuid
 
 def get_base_url():
     url = os.environ.get('REACT_APP_BACKEND_URL', '')
@@ -112,6 +113,25 @@ class TestImports:
         assert 'published' in data
         assert data['total'] >= 1
 
+    def test_stats_reflect_import_immediately(self):
+        """Stats zijn gecachet, maar een import werkt de tellers direct bij"""
+        before = requests.get(f"{BASE_URL}/api/gallery-items/stats/summary").json()
+        creation_id = f"TEST_stats_{uuid.uuid4().hex[:8]}"
+        r = requests.post(f"{BASE_URL}/api/import", json={
+            "url": f"https://creator.nightcafe.studio/creation/{creation_id}",
+            "creationId": creation_id,
+            "imageUrl": "https://example.com/stats.jpg"
+        })
+        new_id = r.json()['id']
+        after = requests.get(f"{BASE_URL}/api/gallery-items/stats/summary").json()
+        assert after['total'] == before['total'] + 1
+        assert after['withImage'] == before['withImage'] + 1
+        assert after['totalPrompts'] == before['totalPrompts'] + 1
+
+        requests.delete(f"{BASE_URL}/api/gallery-items/{new_id}")
+        final = requests.get(f"{BASE_URL}/api/gallery-items/stats/summary").json()
+        assert final['total'] == before['total']
+
     def test_delete_import(self):
         assert TestImports.created_id is not None, "No created_id from previous test"
         r = requests.delete(f"{BASE_URL}/api/imports/{TestImports.created_id}")
@@ -123,6 +143,70 @@ class TestImports:
         r = requests.delete(f"{BASE_URL}/api/imports/nonexistent-id-xyz")
         assert r.status_code == 404
 
+    def test_concurrent_duplicate_imports(self):
+        """Gelijktijdige imports van dezelfde creatie leveren precies één item op"""
+        from concurrent.futures import ThreadPoolExecutor
+        creation_id = f"TEST_race_{uuid.uuid4().hex[:8]}"
+        payload = {
+            "url": f"https://creator.nightcafe.studio/creation/{creation_id}",
+            "creationId": creation_id,
+            "title": "TEST_Race"
+        }
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            responses = list(pool.map(
+                lambda _: requests.post(f"{BASE_URL}/api/import", json=payload), range(8)
+            ))
+        assert all(r.status_code == 201 for r in responses)
+        results = [r.json() for r in responses]
+        created = [d for d in results if d['duplicate'] is False]
+        assert len(created) == 1
+        assert {d['id'] for d in results} == {created[0]['id']}
+
+        requests.delete(f"{BASE_URL}/api/gallery-items/{created[0]['id']}")
+
+# Gebufferde ingest (INGEST_MODE=buffered)
+class TestIngestBuffer:
+    def test_buffer_status(self):
+        r = requests.get(f"{BASE_URL}/api/import/buffer")
+        assert r.status_code == 200
+        data = r.json()
+        assert data['mode'] in ('direct', 'buffered')
+        assert data['pending'] >= 0
+        assert data['database'] in ('closed', 'open', 'half-open')
+
+    def test_status_online(self):
+        """Met bereikbare database komt de status uit Mongo, niet alleen uit de spool"""
+        r = requests.get(f"{BASE_URL}/api/import/status", params={"creationId": "TEST_never_imported"})
+        assert r.status_code == 200
+        assert r.json() == {"exists": False}
+
+    def test_buffered_import_flushed(self):
+        import time
+        if requests.get(f"{BASE_URL}/api/import/buffer").json()['mode'] != 'buffered':
+            pytest.skip("backend draait niet met INGEST_MODE=buffered")
+        creation_id = f"TEST_buffered_{uuid.uuid4().hex[:8]}"
+        payload = {
+            "url": f"https://creator.nightcafe.studio/creation/{creation_id}",
+            "creationId": creation_id,
+            "title": "TEST_Buffered"
+        }
+        r = requests.post(f"{BASE_URL}/api/import", json=payload)
+        assert r.status_code == 202
+        item_id = r.json()['id']
+        # Nog in de buffer of al weggeschreven: status en duplicate-check kennen hem
+        assert requests.get(f"{BASE_URL}/api/import/status", params={"creationId": creation_id}).json()['id'] == item_id
+        r = requests.post(f"{BASE_URL}/api/import", json=payload)
+        assert r.status_code == 201
+        assert r.json()['duplicate'] is True and r.json()['id'] == item_id
+
+        for _ in range(50):
+            if requests.get(f"{BASE_URL}/api/gallery-items/{item_id}").status_code == 200:
+                break
+            time.sleep(0.1)
+        else:
+            pytest.fail("item niet naar Mongo geflusht")
+        requests.delete(f"{BASE_URL}/api/gallery-items/{item_id}")
+
 # Extension files
 class TestExtensionFiles:
     def test_manifest_valid_json(self):
@@ -0,0 +1,61 @@
+"""Tests for Metrics - NightCafe Studio Data Bridge
+Testing:
+- GET /api/metrics - Prometheus text format with per-route latency histograms
+- GET /api/metrics - Mongo latency per collection/command, download and import counters
+- Server-Timing header - parse, db, serialize and total on every response
+"""
+import pytest
+import requests
+import os
+
+def get_base_url():
+    url = os.environ.get('REACT_APP_BACKEND_URL', '')
+    if not url:
+        env_path = '/app/frontend/.env'
+        if os.path.exists(env_path):
+            with open(env_path) as f:
+                for line in f:
+                    if line.startswith('REACT_APP_BACKEND_URL='):
+                        url = line.strip().split('=', 1)[1]
+                        break
+    return url.rstrip('/')
+
+BASE_URL = get_base_url()
+
+
+class TestMetrics:
+    """GET /api/metrics"""
+
+    def test_prometheus_format(self):
+        requests.get(f"{BASE_URL}/api/gallery-items/page", params={"limit": 1})
+        r = requests.get(f"{BASE_URL}/api/metrics")
+        assert r.status_code == 200
+        assert r.headers['content-type'].startswith('text/plain')
+        text = r.text
+        assert '# TYPE nc_http_request_duration_seconds histogram' in text
+        assert 'route="/api/gallery-items/page"' in text
+        assert 'le="+Inf"' in text
+        for name in ('nc_http_requests_in_flight', 'nc_download_bytes_total',
+                     'nc_download_failures_total', 'nc_duplicate_imports_total'):
+            assert f'# TYPE {name}' in text
+
+    def test_route_templates_not_raw_paths(self):
+        requests.get(f"{BASE_URL}/api/gallery-items/does-not-exist")
+        text = requests.get(f"{BASE_URL}/api/metrics").text
+        assert 'route="/api/gallery-items/{item_id}"' in text
+        assert 'does-not-exist' not in text
+
+    def test_mongo_command_metrics(self):
+        requests.get(f"{BASE_URL}/api/gallery-items/page", params={"limit": 1})
+        text = requests.get(f"{BASE_URL}/api/metrics").text
+        assert 'nc_mongo_command_duration_seconds_count{collection="gallery_items",command="find"}' in text
+
+
+class TestServerTiming:
+    """Server-Timing header"""
+
+    def test_header_present(self):
+        r = requests.get(f"{BASE_URL}/api/gallery-items/page", params={"limit": 1})
+        timing = r.headers.get('server-timing', '')
+        for phase in ('parse;dur=', 'db;dur=', 'serialize;dur=', 'total;dur='):
+            assert phase in timing
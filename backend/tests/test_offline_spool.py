@@ -0,0 +1,168 @@
+"""Tests for Offline Spool - NightCafe Studio Data Bridge
+Testing:
+- MongoBreaker - closed → open na N fouten → half-open na de reset → closed na succes
+- Startup met onbereikbare Mongo - app start, journal wordt afgespeeld, DB-stappen later opnieuw
+- POST /api/import - spoolt naar het journal (202, offline) zolang de database weg is
+- GET /api/import/status(/batch) - beantwoord uit de spool
+- Herstel - startup wordt afgerond, spool wordt in bulk geleegd, breaker sluit
+- INGEST_MODE=buffered - re-import na de flush is een duplicate (201), geen nieuw item
+- GET /api/gallery-items/changes - gespoolde items verschijnen na de flush voor een token van vóór de flush
+
+In-process (zie conftest.py): een echte Motor client op een poort waar niets
+luistert speelt de onbereikbare database, mongomock de herstelde.
+"""
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from fastapi.testclient import TestClient
+from motor.motor_asyncio import AsyncIOMotorClient
+
+from conftest import wait_for
+
+
+def _creation(creation_id):
+    return {
+        "url": f"https://creator.nightcafe.studio/creation/{creation_id}",
+        "creationId": creation_id,
+        "title": f"TEST_Offline {creation_id}",
+        "prompt": "offline test prompt",
+    }
+
+
+@pytest.fixture
+def offline_app(server, tmp_path, monkeypatch):
+    """App met een onbereikbare database; `recover()` schakelt terug naar mongomock."""
+    healthy = server.db
+    unreachable = AsyncIOMotorClient("mongodb://127.0.0.1:1", serverSelectionTimeoutMS=200)
+    monkeypatch.setattr(server, "db", unreachable["nc_offline_test"])
+    monkeypatch.setattr(server, "DB_STARTUP_RETRY_S", 0.1)
+    monkeypatch.setattr(server, "mongo_breaker", server.MongoBreaker(2, 0.2))
+
+    def recover():
+        monkeypatch.setattr(server, "db", healthy)
+
+    return server, tmp_path / "ingest.journal", recover
+
+
+class TestMongoBreaker:
+    def test_states(self, server):
+        breaker = server.MongoBreaker(2, 0.1)
+        assert breaker.state == "closed" and breaker.allow()
+
+        breaker.failure(RuntimeError("down"))
+        assert breaker.state == "closed" and breaker.allow()
+        breaker.failure(RuntimeError("down"))
+        assert breaker.state == "open"
+        assert breaker.allow() is False
+
+        time.sleep(0.15)
+        assert breaker.state == "half-open"
+        assert breaker.allow() is True       # één proefaanroep
+        assert breaker.allow() is False
+
+        breaker.failure(RuntimeError("nog steeds down"))
+        assert breaker.state == "open"
+        time.sleep(0.15)
+        assert breaker.allow() is True
+        breaker.success()
+        assert breaker.state == "closed" and breaker.failures == 0
+
+
+class TestOfflineStartup:
+    def test_spool_while_unreachable_and_drain(self, offline_app):
+        server, journal, recover = offline_app
+        prefix = f"TEST_offline_{uuid.uuid4().hex[:8]}"
+        with TestClient(server.app) as cl:
+            # Startup is gelukt ondanks de onbereikbare database
+            assert server.ingest_buffer.flush_enabled is False
+
+            ids = []
+            for i in range(3):
+                r = cl.post("/api/import", json=_creation(f"{prefix}_{i}"))
+                assert r.status_code == 202, r.text
+                data = r.json()
+                assert data['queued'] is True and data['offline'] is True
+                ids.append(data['id'])
+            assert server.mongo_breaker.state != "closed"
+            assert server.ingest_buffer.pending == 3
+            assert journal.read_bytes().count(b"\n") == 3
+
+            # Status uit de spool
+            r = cl.get("/api/import/status", params={"creationId": f"{prefix}_1"})
+            assert r.json()['exists'] is True and r.json()['id'] == ids[1]
+            r = cl.get("/api/import/status", params={"creationId": f"{prefix}_unknown"})
+            assert r.json() == {"exists": False, "offline": True}
+            r = cl.post("/api/import/status/batch", json={"creationIds": [f"{prefix}_0", f"{prefix}_unknown"]})
+            data = r.json()
+            assert data['offline'] is True and data['existing'] == 1
+            assert data['results'][f"{prefix}_0"]['id'] == ids[0]
+
+            # Dubbele import van een gespoold item
+            r = cl.post("/api/import", json=_creation(f"{prefix}_0"))
+            assert r.status_code == 201
+            assert r.json()['duplicate'] is True and r.json()['id'] == ids[0]
+
+            # Andere routes: 503 i.p.v. 500
+            assert cl.get("/api/gallery-items").status_code == 503
+
+            recover()
+            assert wait_for(lambda: server.ingest_buffer.pending == 0)
+            assert server.ingest_buffer.flush_enabled is True
+            assert server.mongo_breaker.state == "closed"
+            assert journal.read_bytes() == b""
+            for item_id in ids:
+                assert cl.get(f"/api/gallery-items/{item_id}").status_code == 200
+            assert len(cl.get("/api/prompts").json()) == 3
+
+    def test_journal_replayed_while_unreachable(self, offline_app):
+        server, journal, recover = offline_app
+        creation_id = f"TEST_replay_{uuid.uuid4().hex[:8]}"
+        prompt_doc, gallery_doc = server.map_to_db(server.CreationImport(**_creation(creation_id)), str(uuid.uuid4()))
+        journal.write_bytes(server.orjson.dumps({"prompt": prompt_doc, "gallery": gallery_doc}) + b"\n")
+
+        with TestClient(server.app) as cl:
+            assert server.ingest_buffer.pending == 1
+            r = cl.get("/api/import/status", params={"creationId": creation_id})
+            assert r.json()['id'] == gallery_doc['id']
+
+            recover()
+            assert wait_for(lambda: server.ingest_buffer.pending == 0)
+            assert cl.get(f"/api/gallery-items/{gallery_doc['id']}").status_code == 200
+
+    def test_flushed_spool_visible_in_changes(self, offline_app, monkeypatch):
+        server, journal, recover = offline_app
+        monkeypatch.setattr(server, "CHANGES_SAFETY_WINDOW", timedelta(seconds=0.5))
+        creation_id = f"TEST_changes_{uuid.uuid4().hex[:8]}"
+        with TestClient(server.app) as cl:
+            r = cl.post("/api/import", json=_creation(creation_id))
+            assert r.status_code == 202
+            item_id = r.json()['id']
+
+            # Token van een client die na het spoolen (ruim buiten het venster) nog pollde
+            time.sleep(1)
+            token = server._encode_token(datetime.now(timezone.utc))
+
+            recover()
+            assert wait_for(lambda: server.ingest_buffer.pending == 0)
+            r = cl.get("/api/gallery-items/changes", params={"since": token})
+            assert r.status_code == 200
+            assert item_id in [i['id'] for i in r.json()['items']]
+
+
+class TestBufferedIngest:
+    def test_reimport_after_flush_is_duplicate(self, server, monkeypatch):
+        monkeypatch.setattr(server, "INGEST_BUFFERED", True)
+        creation_id = f"TEST_buffered_{uuid.uuid4().hex[:8]}"
+        with TestClient(server.app) as cl:
+            r = cl.post("/api/import", json=_creation(creation_id))
+            assert r.status_code == 202
+            item_id = r.json()['id']
+            assert wait_for(lambda: server.ingest_buffer.pending == 0)
+
+            r = cl.post("/api/import", json=_creation(creation_id))
+            assert r.status_code == 201
+            assert r.json()['duplicate'] is True and r.json()['id'] == item_id
+            assert server.ingest_buffer.pending == 0
+            assert len(cl.get("/api/gallery-items").json()) == 1
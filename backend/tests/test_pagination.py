@@ -0,0 +1,140 @@
+"""Tests for Keyset Pagination - NightCafe Studio Data Bridge
+Testing:
+- GET /api/gallery-items/page - returns items + next_cursor, newest first
+- GET /api/gallery-items/page?after= - walks all pages without gaps or duplicates
+- GET /api/prompts/page - same contract for prompts
+- GET /api/gallery-items - compat route still returns a plain list
+- ?fields= - sparse fieldsets (id/created_at always included, invalid → 400)
+- Accept-Encoding: gzip - large responses are compressed
+"""
+import pytest
+import requests
+import os
+import uuid
+
+def get_base_url():
+    url = os.environ.get('REACT_APP_BACKEND_URL', '')
+    if not url:
+        env_path = '/app/frontend/.env'
+        if os.path.exists(env_path):
+            with open(env_path) as f:
+                for line in f:
+                    if line.startswith('REACT_APP_BACKEND_URL='):
+                        url = line.strip().split('=', 1)[1]
+                        break
+    return url.rstrip('/')
+
+BASE_URL = get_base_url()
+
+
+def _walk(path, limit):
+    seen = []
+    after = None
+    while True:
+        params = {"limit": limit}
+        if after:
+            params["after"] = after
+        r = requests.get(f"{BASE_URL}{path}", params=params)
+        assert r.status_code == 200, f"Expected 200, got {r.status_code}: {r.text}"
+        data = r.json()
+        assert len(data['items']) <= limit
+        seen.extend(data['items'])
+        after = data['next_cursor']
+        if not after:
+            return seen
+
+
+class TestKeysetPagination:
+    prefix = f"TEST_page_{uuid.uuid4().hex[:8]}"
+    created_ids = []
+
+    def test_seed_items(self):
+        payload = [
+            {"url": f"https://creator.nightcafe.studio/creation/{self.prefix}_{i}",
+             "creationId": f"{self.prefix}_{i}", "title": f"TEST_Page {i}"}
+            for i in range(7)
+        ]
+        r = requests.post(f"{BASE_URL}/api/import/batch", json=payload)
+        assert r.status_code == 200
+        TestKeysetPagination.created_ids = [res['id'] for res in r.json()['results']]
+
+    def test_page_structure(self):
+        r = requests.get(f"{BASE_URL}/api/gallery-items/page", params={"limit": 3})
+        assert r.status_code == 200
+        data = r.json()
+        assert 'items' in data
+        assert 'next_cursor' in data
+        assert len(data['items']) <= 3
+
+    def test_walk_gallery_items(self):
+        items = _walk("/api/gallery-items/page", 3)
+        ids = [i['id'] for i in items]
+        assert len(ids) == len(set(ids)), "Duplicates across pages"
+        for item_id in TestKeysetPagination.created_ids:
+            assert item_id in ids
+        keys = [(i['created_at'], i['id']) for i in items]
+        assert keys == sorted(keys, reverse=True), "Not sorted newest first"
+
+    def test_walk_prompts(self):
+        prompts = _walk("/api/prompts/page", 5)
+        ids = [p['id'] for p in prompts]
+        assert len(ids) == len(set(ids))
+
+    def test_invalid_cursor(self):
+        r = requests.get(f"{BASE_URL}/api/gallery-items/page", params={"after": "not-a-cursor"})
+        assert r.status_code == 400
+
+    def test_limit_bounds(self):
+        r = requests.get(f"{BASE_URL}/api/gallery-items/page", params={"limit": 501})
+        assert r.status_code == 422
+
+    def test_compat_list(self):
+        r = requests.get(f"{BASE_URL}/api/gallery-items")
+        assert r.status_code == 200
+        assert isinstance(r.json(), list)
+
+    def test_cleanup(self):
+        for item_id in TestKeysetPagination.created_ids:
+            requests.delete(f"{BASE_URL}/api/gallery-items/{item_id}")
+
+
+class TestSparseFieldsAndCompression:
+    """?fields= projection, orjson responses and gzip"""
+
+    def test_fields_projection(self):
+        r = requests.get(f"{BASE_URL}/api/gallery-items/page", params={"limit": 5, "fields": "title,thumbnail_url"})
+        assert r.status_code == 200
+        for item in r.json()['items']:
+            assert set(item) <= {'id', 'created_at', 'title', 'thumbnail_url'}
+            assert 'id' in item and 'created_at' in item
+
+    def test_fields_cursor_still_works(self):
+        first = requests.get(f"{BASE_URL}/api/gallery-items/page", params={"limit": 2, "fields": "title"}).json()
+        if not first['next_cursor']:
+            pytest.skip("Not enough items for a second page")
+        second = requests.get(
+            f"{BASE_URL}/api/gallery-items/page",
+            params={"limit": 2, "fields": "title", "after": first['next_cursor']}
+        ).json()
+        assert not {i['id'] for i in first['items']} & {i['id'] for i in second['items']}
+
+    def test_nested_field(self):
+        r = requests.get(f"{BASE_URL}/api/gallery-items/page", params={"limit": 5, "fields": "metadata.source_url"})
+        assert r.status_code == 200
+        for item in r.json()['items']:
+            assert set(item.get('metadata', {})) <= {'source_url'}
+
+    def test_invalid_fields_returns_400(self):
+        r = requests.get(f"{BASE_URL}/api/gallery-items/page", params={"fields": "$where"})
+        assert r.status_code == 400
+
+    def test_gzip_large_response(self):
+        r = requests.get(
+            f"{BASE_URL}/api/gallery-items/page",
+            params={"limit": 100}, headers={"Accept-Encoding": "gzip"}, stream=True
+        )
+        assert r.status_code == 200
+        if len(r.content) < 1024:
+            pytest.skip("Response too small to be compressed")
+        assert r.headers.get('content-encoding') == 'gzip'
+        assert 'Accept-Encoding' in r.headers.get('vary', '')
@@ -0,0 +1,78 @@
+"""Tests for Server-side Search - NightCafe Studio Data Bridge
+Testing:
+- GET /api/gallery-items/search?q= - matches title, prompt, revised prompt, video prompt, creation id
+- GET /api/gallery-items/search - results are ranked (title match before prompt match)
+- GET /api/gallery-items/search - limit/offset pagination via next_offset
+"""
+import pytest
+import requests
+import os
+import uuid
+
+def get_base_url():
+    url = os.environ.get('REACT_APP_BACKEND_URL', '')
+    if not url:
+        env_path = '/app/frontend/.env'
+        if os.path.exists(env_path):
+            with open(env_path) as f:
+                for line in f:
+                    if line.startswith('REACT_APP_BACKEND_URL='):
+                        url = line.strip().split('=', 1)[1]
+                        break
+    return url.rstrip('/')
+
+BASE_URL = get_base_url()
+
+
+class TestSearch:
+    token = f"zq{uuid.uuid4().hex[:10]}"
+    created_ids = []
+
+    def test_seed_items(self):
+        t = self.token
+        payload = [
+            {"url": "https://creator.nightcafe.studio/creation/a", "creationId": f"TEST_search_{t}_a",
+             "title": f"TEST_{t} in title", "prompt": "plain prompt"},
+            {"url": "https://creator.nightcafe.studio/creation/b", "creationId": f"TEST_search_{t}_b",
+             "title": "TEST_Other", "prompt": f"prompt mentioning {t}"},
+            {"url": "https://creator.nightcafe.studio/creation/c", "creationId": f"TEST_search_{t}_c",
+             "title": "TEST_Revised", "prompt": "plain", "revisedPrompt": f"revised {t}"},
+            {"url": "https://creator.nightcafe.studio/creation/d", "creationId": f"TEST_search_{t}_d",
+             "title": "TEST_Video", "creationType": "video", "videoPrompt": f"video {t}"},
+        ]
+        r = requests.post(f"{BASE_URL}/api/import/batch", json=payload)
+        assert r.status_code == 200
+        TestSearch.created_ids = [res['id'] for res in r.json()['results']]
+
+    def test_search_matches_all_fields(self):
+        r = requests.get(f"{BASE_URL}/api/gallery-items/search", params={"q": self.token})
+        assert r.status_code == 200
+        data = r.json()
+        ids = [i['id'] for i in data['items']]
+        assert set(ids) == set(TestSearch.created_ids)
+
+    def test_search_ranking(self):
+        r = requests.get(f"{BASE_URL}/api/gallery-items/search", params={"q": self.token})
+        items = r.json()['items']
+        assert items[0]['id'] == TestSearch.created_ids[0], "Title match should rank first"
+        scores = [i['score'] for i in items]
+        assert scores == sorted(scores, reverse=True)
+
+    def test_search_pagination(self):
+        r = requests.get(f"{BASE_URL}/api/gallery-items/search", params={"q": self.token, "limit": 3})
+        data = r.json()
+        assert len(data['items']) == 3
+        assert data['next_offset'] == 3
+        r2 = requests.get(f"{BASE_URL}/api/gallery-items/search",
+                          params={"q": self.token, "limit": 3, "offset": data['next_offset']})
+        data2 = r2.json()
+        assert len(data2['items']) == 1
+        assert data2['next_offset'] is None
+
+    def test_search_requires_query(self):
+        r = requests.get(f"{BASE_URL}/api/gallery-items/search")
+        assert r.status_code == 422
+
+    def test_cleanup(self):
+        for item_id in TestSearch.created_ids:
+            requests.delete(f"{BASE_URL}/api/gallery-items/{item_id}")
@@ -0,0 +1,77 @@
+"""Tests for Similar Images - NightCafe Studio Data Bridge
+Testing:
+- GET /api/gallery-items/{id}/similar - near-duplicates by perceptual hash (dHash)
+- GET /api/gallery-items/{id}/similar - 404 for unknown items, 409 for items without a hash
+- GET /api/gallery-items/duplicates/report - groups of near-identical images (max_distance <= 10)
+"""
+import pytest
+import requests
+import os
+
+def get_base_url():
+    url = os.environ.get('REACT_APP_BACKEND_URL', '')
+    if not url:
+        env_path = '/app/frontend/.env'
+        if os.path.exists(env_path):
+            with open(env_path) as f:
+                for line in f:
+                    if line.startswith('REACT_APP_BACKEND_URL='):
+                        url = line.strip().split('=', 1)[1]
+                        break
+    return url.rstrip('/')
+
+BASE_URL = get_base_url()
+
+
+def _hashed_item():
+    r = requests.get(f"{BASE_URL}/api/gallery-items")
+    for item in r.json():
+        if item.get('metadata', {}).get('dhash'):
+            return item
+    pytest.skip("No items with a perceptual hash")
+
+
+class TestSimilar:
+    """GET /api/gallery-items/{id}/similar"""
+
+    def test_similar_structure(self):
+        item = _hashed_item()
+        r = requests.get(f"{BASE_URL}/api/gallery-items/{item['id']}/similar", params={"max_distance": 12})
+        assert r.status_code == 200
+        data = r.json()
+        assert data['id'] == item['id']
+        assert len(data['dhash']) == 16
+        distances = [hit['distance'] for hit in data['items']]
+        assert distances == sorted(distances)
+        assert all(0 <= d <= 12 for d in distances)
+        assert item['id'] not in [hit['id'] for hit in data['items']]
+
+    def test_similar_nonexistent_returns_404(self):
+        r = requests.get(f"{BASE_URL}/api/gallery-items/nonexistent-id-12345/similar")
+        assert r.status_code == 404
+
+    def test_similar_invalid_distance(self):
+        item = _hashed_item()
+        r = requests.get(f"{BASE_URL}/api/gallery-items/{item['id']}/similar", params={"max_distance": 65})
+        assert r.status_code == 422
+
+
+class TestDuplicateReport:
+    """GET /api/gallery-items/duplicates/report"""
+
+    def test_report_structure(self):
+        r = requests.get(f"{BASE_URL}/api/gallery-items/duplicates/report", params={"max_distance": 4})
+        assert r.status_code == 200
+        data = r.json()
+        for field in ('max_distance', 'total_groups', 'items_in_groups', 'groups'):
+            assert field in data, f"Missing '{field}' field"
+        sizes = [g['size'] for g in data['groups']]
+        assert sizes == sorted(sizes, reverse=True)
+        for group in data['groups']:
+            assert group['size'] >= 2
+            assert group['max_distance'] <= 4
+
+    def test_report_distance_capped(self):
+        """Boven 10 bits degenereert multi-index hashing; zulke afstanden worden geweigerd"""
+        r = requests.get(f"{BASE_URL}/api/gallery-items/duplicates/report", params={"max_distance": 11})
+        assert r.status_code == 422
@@ -45,44 +45,56 @@ chrome.runtime.onMessage.addListener((msg, sender, sendResponse) => {
 // BULK IMPORT HANDLER
 // ═══════════════════════════════════════════════════════════════════════════════
 
+const STATUS_BATCH_SIZE = 500;
+
+// Import-status voor een hele lijst creaties via /api/import/status/batch
+// (één request per STATUS_BATCH_SIZE creationIds). Geeft een Map creationId → status.
+async function fetchImportStatuses(endpoint, creationIds) {
+  const statuses = new Map();
+  const ids = [...new Set(creationIds.filter(Boolean))];
+  for (let i = 0; i < ids.length; i += STATUS_BATCH_SIZE) {
+    const res = await fetch(`${endpoint}/api/import/status/batch`, {
+      method: 'POST',
+      headers: { 'Content-Type': 'application/json' },
+      body: JSON.stringify({ creationIds: ids.slice(i, i + STATUS_BATCH_SIZE) }),
+      signal: AbortSignal.timeout(10000)
+    });
+    if (!res.ok) throw new Error(`HTTP ${res.status}`);
+    const data = await res.json();
+    for (const [id, status] of Object.entries(data.results || {})) {
+      statuses.set(id, status);
+    }
+  }
+  return statuses;
+}
+
 async function processBulkImport(creations, originTabId) {
   const { endpointUrl } = await chrome.storage.sync.get(['endpointUrl']);
   const endpoint = (endpointUrl || 'http://localhost:3000').replace(/\/$/, '');
 
+  // 1. Check in één keer welke creaties al geïmporteerd zijn
+  let statuses = new Map();
+  try {
+    statuses = await fetchImportStatuses(endpoint, creations.map(c => c.creationId));
+  } catch (e) {
+    // Backend dedupliceert bij import alsnog
+    console.log('[Bulk] Status check failed:', e.message);
+  }
+
   for (let i = 0; i < creations.length; i++) {
     const creation = creations[i];
     const label = creation.title || creation.creationId;
 
-    // Stuur "controleren" status
-    sendProgress(originTabId, {
-      current: i + 1,
-      total: creations.length,
-      status: 'checking',
-      title: label,
-      creationId: creation.creationId
-    });
-
-    // 1. Check of al geïmporteerd
-    try {
-      const statusRes = await fetch(
-        `${endpoint}/api/import/status?creationId=${encodeURIComponent(creation.creationId)}`,
-        { signal: AbortSignal.timeout(5000) }
-      );
-      if (statusRes.ok) {
-        const statusData = await statusRes.json();
-        if (statusData.exists) {
-          sendProgress(originTabId, {
-            current: i + 1,
-            total: creations.length,
-            status: 'skipped',
-            title: statusData.title || label,
-            creationId: creation.creationId
-          });
-          continue;
-        }
-      }
-    } catch (e) {
-      console.log('[Bulk] Status check failed:', e.message);
+    const status = statuses.get(creation.creationId);
+    if (status?.exists) {
+      sendProgress(originTabId, {
+        current: i + 1,
+        total: creations.length,
+        status: 'skipped',
+        title: status.title || label,
+        creationId: creation.creationId
+      });
+      continue;
     }
 
     // 2. Open tab, extract data, import
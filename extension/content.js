@@ -842,13 +842,78 @@ if (window.__ncImporterLoaded) {
       setTimeout(() => {
         if (bulkBtn || bulkRunning) return;
         const retry = extractCreationLinks();
-        if (retry.length > 0) createBulkButton(retry.length);
+        if (retry.length > 0) {
+          createBulkButton(retry.length);
+          badgeImportedThumbnails();
+        }
       }, 2000);
       return;
     }
     createBulkButton(links.length);
+    badgeImportedThumbnails();
+  }
+
+  // ─── "Al geïmporteerd" badges op lijst-pagina's ───────────────────────────────
+
+  const STATUS_BATCH_SIZE = 500;
+  const importStatusCache = new Map(); // creationId → status van de backend
+  let badgeScrollTimer = null;
+
+  function findCreationCards() {
+    const cards = new Map(); // creationId → [card elementen]
+    for (const link of document.querySelectorAll('a[href*="/creation/"]')) {
+      const match = link.getAttribute('href').match(/\/creation\/([a-zA-Z0-9_-]+)/);
+      if (!match) continue;
+      const card = link.closest('[class*="card"], [class*="Card"], [class*="creation"], [class*="item"]') || link;
+      if (!cards.has(match[1])) cards.set(match[1], []);
+      cards.get(match[1]).push(card);
+    }
+    return cards;
   }
 
+  async function badgeImportedThumbnails() {
+    const cards = findCreationCards();
+    const unknown = [...cards.keys()].filter(id => !importStatusCache.has(id));
+    if (unknown.length > 0) {
+      try {
+        const { endpointUrl } = await chrome.storage.sync.get(['endpointUrl']);
+        const endpoint = (endpointUrl || 'http://localhost:3000').replace(/\/$/, '');
+        for (let i = 0; i < unknown.length; i += STATUS_BATCH_SIZE) {
+          const res = await fetch(`${endpoint}/api/import/status/batch`, {
+            method: 'POST',
+            headers: { 'Content-Type': 'application/json' },
+            body: JSON.stringify({ creationIds: unknown.slice(i, i + STATUS_BATCH_SIZE) })
+          });
+          if (!res.ok) return;
+          const data = await res.json();
+          for (const [id, status] of Object.entries(data.results || {})) {
+            importStatusCache.set(id, status);
+          }
+        }
+      } catch { return; /* endpoint niet beschikbaar – stil falen */ }
+    }
+
+    for (const [id, cardEls] of cards) {
+      if (!importStatusCache.get(id)?.exists) continue;
+      for (const card of cardEls) {
+        if (card.querySelector('.nc-imported-badge')) continue;
+        if (getComputedStyle(card).position === 'static') card.style.position = 'relative';
+        const badge = document.createElement('span');
+        badge.className = 'nc-imported-badge';
+        badge.setAttribute('data-testid', 'nc-imported-badge');
+        badge.textContent = '✓ Geïmporteerd';
+        card.appendChild(badge);
+      }
+    }
+  }
+
+  // Infinite scroll laadt nieuwe kaarten – badge die zodra het scrollen stopt
+  window.addEventListener('scroll', () => {
+    if (!bulkBtn) return;
+    clearTimeout(badgeScrollTimer);
+    badgeScrollTimer = setTimeout(badgeImportedThumbnails, 1200);
+  }, { passive: true });
+
   function createBulkButton(count) {
     if (bulkBtn) return;
     bulkBtn = document.createElement('button');
@@ -895,6 +960,7 @@ if (window.__ncImporterLoaded) {
     await scrollToLoadAll();
 
     const creations = extractCreationLinks();
+    badgeImportedThumbnails();
     if (creations.length === 0) {
       showToast('Geen creaties gevonden op deze pagina', 'error');
       bulkRunning = false;
@@ -1039,6 +1105,8 @@ if (window.__ncImporterLoaded) {
 
   function completeBulkImport(msg) {
     bulkRunning = false;
+    importStatusCache.clear();
+    badgeImportedThumbnails();
 
     if (progressOverlay) {
       const status = progressOverlay.querySelector('.nc-progress-status');
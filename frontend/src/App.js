@@ -2,65 +2,27 @@ import React, { useEffect, useState, useCallback, useRef } from 'react';
 import './App.css';
 
 const API = process.env.REACT_APP_BACKEND_URL;
+const PAGE_SIZE = 100;
+// Alleen de velden die de grid toont; het detailpaneel haalt het volledige item op
+const GRID_FIELDS = [
+  'id', 'title', 'image_url', 'thumbnail_url', 'media_type', 'created_at', 'updated_at',
+  'aspect_ratio', 'prompt_used', 'storage_mode', 'local_path', 'width', 'height',
+  'metadata.all_images', 'metadata.is_published', 'metadata.nightcafe_creation_id'
+].join(',');
+const DETAIL_CACHE_SIZE = 200;
+
+// Volgorde van de backend: created_at, dan id – beide aflopend
+const isOlder = (a, b) =>
+  a.created_at < b.created_at || (a.created_at === b.created_at && a.id < b.id);
 
 // ─── Export helpers ───────────────────────────────────────────────────────────
-function downloadFile(content, filename, mimeType) {
-  const blob = new Blob([content], { type: mimeType });
-  const url = URL.createObjectURL(blob);
+// De backend streamt de export (GET /api/export); de browser schrijft direct naar schijf
+function downloadExport(format, query) {
+  const params = new URLSearchParams({ format });
+  if (query) params.set('q', query);
   const a = document.createElement('a');
-  a.href = url;
-  a.download = filename;
+  a.href = `${API}/api/export?${params}`;
   a.click();
-  URL.revokeObjectURL(url);
-}
-
-function exportAsJSON(data) {
-  const content = JSON.stringify(data, null, 2);
-  const ts = new Date().toISOString().slice(0, 10);
-  downloadFile(content, `nightcafe-imports-${ts}.json`, 'application/json');
-}
-
-function exportAsCSV(data) {
-  const CSV_COLS = [
-    'id', 'title', 'prompt_used', 'model', 'aspect_ratio',
-    'media_type', 'start_image', 'image_url', 'allImagesCount',
-    'nightcafe_creation_id', 'source_url', 'created_at',
-    'is_published', 'rating', 'is_favorite'
-  ];
-
-  const escape = (v) => {
-    if (v === null || v === undefined) return '';
-    const s = String(v);
-    if (s.includes(',') || s.includes('"') || s.includes('\n')) {
-      return '"' + s.replace(/"/g, '""') + '"';
-    }
-    return s;
-  };
-
-  const rows = [CSV_COLS.join(',')];
-  for (const item of data) {
-    const row = [
-      item.id,
-      item.title,
-      item.prompt_used,
-      item.model,
-      item.aspect_ratio,
-      item.media_type,
-      item.start_image,
-      item.image_url,
-      (item.metadata?.all_images || []).length,
-      item.metadata?.nightcafe_creation_id,
-      item.metadata?.source_url,
-      item.created_at,
-      item.metadata?.is_published ? 'ja' : 'nee',
-      item.rating,
-      item.is_favorite ? 'ja' : 'nee'
-    ].map(escape);
-    rows.push(row.join(','));
-  }
-
-  const ts = new Date().toISOString().slice(0, 10);
-  downloadFile(rows.join('\n'), `nightcafe-imports-${ts}.csv`, 'text/csv;charset=utf-8;');
 }
 
 function App() {
@@ -69,63 +31,158 @@ function App() {
   const [loading, setLoading] = useState(true);
   const [selected, setSelected] = useState(null);
   const [search, setSearch] = useState('');
+  const [searchResults, setSearchResults] = useState(null);
+  const [searching, setSearching] = useState(false);
   const [deleteConfirm, setDeleteConfirm] = useState(null);
   const [toast, setToast] = useState(null);
   const [activeImage, setActiveImage] = useState(null);
   const [exportOpen, setExportOpen] = useState(false);
   const [downloading, setDownloading] = useState(null); // item_id of 'all'
+  const [downloadJob, setDownloadJob] = useState(null);
   const [dlStats, setDlStats] = useState({ total: 0, local: 0, pending: 0 });
+  const [nextCursor, setNextCursor] = useState(null);
+  const [loadingMore, setLoadingMore] = useState(false);
   const exportRef = useRef(null);
+  const pagesLoaded = useRef(1);
+  const syncToken = useRef(null);
+  const activeJob = useRef(null);
+  const detailCache = useRef(new Map()); // id → volledig item incl. _prompt
+
+  const cacheDetail = (item) => {
+    const cache = detailCache.current;
+    cache.delete(item.id);
+    cache.set(item.id, item);
+    if (cache.size > DETAIL_CACHE_SIZE) cache.delete(cache.keys().next().value);
+  };
 
   const showToast = (msg, type = 'success') => {
     setToast({ msg, type });
     setTimeout(() => setToast(null), 3000);
   };
 
+  // Stats endpoints sturen een ETag: de browser hervalideert en krijgt een 304 als er niets veranderd is
+  const fetchStats = useCallback(async () => {
+    const [statsRes, dlStatsRes] = await Promise.all([
+      fetch(`${API}/api/gallery-items/stats/summary`),
+      fetch(`${API}/api/gallery-items/download/stats`)
+    ]);
+    setStats(await statsRes.json());
+    setDlStats(await dlStatsRes.json());
+  }, []);
+
+  // Volledig (her)laden; het sync-token wordt vóór de pagina opgehaald zodat niets gemist wordt
   const fetchData = useCallback(async () => {
     try {
-      const [importsRes, statsRes, dlStatsRes] = await Promise.all([
-        fetch(`${API}/api/gallery-items`),
-        fetch(`${API}/api/gallery-items/stats/summary`),
-        fetch(`${API}/api/gallery-items/download/stats`)
+      const tokenRes = await fetch(`${API}/api/gallery-items/changes`);
+      syncToken.current = (await tokenRes.json()).next_token;
+      const [importsRes] = await Promise.all([
+        fetch(`${API}/api/gallery-items/page?limit=${PAGE_SIZE}&fields=${GRID_FIELDS}`),
+        fetchStats()
       ]);
-      const importsData = await importsRes.json();
-      const statsData = await statsRes.json();
-      const dlStatsData = await dlStatsRes.json();
-      setImports(Array.isArray(importsData) ? importsData : []);
-      setStats(statsData);
-      setDlStats(dlStatsData);
+      const page = await importsRes.json();
+      const items = Array.isArray(page.items) ? page.items : [];
+      // Ververs de eerste pagina; al bijgeladen oudere pagina's blijven staan
+      setImports(prev => {
+        if (pagesLoaded.current <= 1 || items.length === 0) return items;
+        const last = items[items.length - 1];
+        const firstIds = new Set(items.map(i => i.id));
+        return [...items, ...prev.filter(i => !firstIds.has(i.id) && isOlder(i, last))];
+      });
+      if (pagesLoaded.current <= 1) setNextCursor(page.next_cursor || null);
     } catch (err) {
       console.error('Fetch error:', err);
     } finally {
       setLoading(false);
     }
+  }, [fetchStats]);
+
+  // Verwerk een delta van /changes: gewijzigde items vervangen, nieuwe invoegen, verwijderde weghalen
+  const applyChanges = useCallback(({ items, deleted }) => {
+    const gone = new Set(deleted);
+    const changed = new Map(items.map(i => [i.id, i]));
+    for (const id of [...gone, ...changed.keys()]) detailCache.current.delete(id);
+    setImports(prev => {
+      const last = prev[prev.length - 1];
+      const byId = new Map(prev.filter(i => !gone.has(i.id)).map(i => [i.id, i]));
+      for (const item of items) {
+        // Oudere items buiten de geladen pagina's komen later via "Meer laden"
+        if (byId.has(item.id) || !last || !isOlder(item, last)) byId.set(item.id, item);
+      }
+      return [...byId.values()].sort((a, b) => (isOlder(a, b) ? 1 : isOlder(b, a) ? -1 : 0));
+    });
+    setSelected(prev => {
+      if (!prev) return prev;
+      if (gone.has(prev.id)) return null;
+      return changed.has(prev.id) ? { ...prev, ...changed.get(prev.id) } : prev;
+    });
   }, []);
 
-  useEffect(() => {
-    fetchData();
-    const interval = setInterval(fetchData, 15000);
-    return () => clearInterval(interval);
-  }, [fetchData]);
+  const syncChanges = useCallback(async () => {
+    if (!syncToken.current) return fetchData();
+    try {
+      let token = syncToken.current;
+      let more = true;
+      while (more) {
+        const res = await fetch(`${API}/api/gallery-items/changes?since=${encodeURIComponent(token)}&fields=${GRID_FIELDS}`);
+        if (!res.ok) throw new Error(`HTTP ${res.status}`);
+        const changes = await res.json();
+        if (changes.reset) return fetchData();
+        if (changes.items.length || changes.deleted.length) applyChanges(changes);
+        token = changes.next_token;
+        more = changes.has_more;
+      }
+      syncToken.current = token;
+      await fetchStats();
+    } catch (err) {
+      console.error('Sync error:', err);
+    }
+  }, [fetchData, fetchStats, applyChanges]);
 
   // When a creation is selected, fetch full detail (incl. _prompt) and reset active image
   useEffect(() => {
     if (!selected) return;
+    const cached = detailCache.current.get(selected.id);
+    if (cached) {
+      setSelected(prev => prev?.id === cached.id ? cached : prev);
+      setActiveImage(cached.image_url || null);
+      return;
+    }
     setActiveImage(selected.image_url || null);
     // Fetch full detail with linked prompt data
     fetch(`${API}/api/gallery-items/${selected.id}`)
       .then(r => r.json())
       .then(full => {
+        if (full.id) cacheDetail(full);
         setSelected(prev => prev?.id === full.id ? full : prev);
         setActiveImage(full.image_url || null);
       })
       .catch(() => {});
   }, [selected?.id]); // eslint-disable-line
 
+  const loadMore = async () => {
+    if (!nextCursor || loadingMore) return;
+    setLoadingMore(true);
+    try {
+      const res = await fetch(`${API}/api/gallery-items/page?limit=${PAGE_SIZE}&after=${encodeURIComponent(nextCursor)}&fields=${GRID_FIELDS}`);
+      const page = await res.json();
+      setImports(prev => {
+        const ids = new Set(prev.map(i => i.id));
+        return [...prev, ...(page.items || []).filter(i => !ids.has(i.id))];
+      });
+      setNextCursor(page.next_cursor || null);
+      pagesLoaded.current += 1;
+    } catch {
+      showToast('Laden mislukt', 'error');
+    } finally {
+      setLoadingMore(false);
+    }
+  };
+
   const handleDelete = async (id) => {
     try {
       await fetch(`${API}/api/gallery-items/${id}`, { method: 'DELETE' });
       setImports(prev => prev.filter(i => i.id !== id));
+      setSearchResults(prev => prev && prev.filter(i => i.id !== id));
       setDeleteConfirm(null);
       if (selected?.id === id) setSelected(null);
       showToast('Import verwijderd');
@@ -134,18 +191,56 @@ function App() {
     }
   };
 
-  const filtered = imports.filter(item => {
-    if (!search.trim()) return true;
-    const q = search.toLowerCase();
-    return (
-      (item.title || '').toLowerCase().includes(q) ||
-      (item.prompt_used || '').toLowerCase().includes(q) ||
-      (item._prompt?.revised_prompt || '').toLowerCase().includes(q) ||
-      (item.metadata?.video_prompt || '').toLowerCase().includes(q) ||
-      (item.metadata?.nightcafe_creation_id || '').toLowerCase().includes(q) ||
-      (item.aspect_ratio || '').toLowerCase().includes(q)
-    );
-  });
+  // Zoeken gebeurt server-side (full-text index), gedebounced per toetsaanslag
+  useEffect(() => {
+    const q = search.trim();
+    if (!q) { setSearchResults(null); setSearching(false); return; }
+    setSearching(true);
+    const controller = new AbortController();
+    const timer = setTimeout(async () => {
+      try {
+        const res = await fetch(
+          `${API}/api/gallery-items/search?q=${encodeURIComponent(q)}&limit=200&fields=${GRID_FIELDS}`,
+          { signal: controller.signal }
+        );
+        const data = await res.json();
+        setSearchResults(Array.isArray(data.items) ? data.items : []);
+      } catch (err) {
+        if (err.name !== 'AbortError') setSearchResults([]);
+      } finally {
+        if (!controller.signal.aborted) setSearching(false);
+      }
+    }, 250);
+    return () => { clearTimeout(timer); controller.abort(); };
+  }, [search]);
+
+  const filtered = search.trim() ? (searchResults || []) : imports;
+  const selectedIndex = selected ? filtered.findIndex(i => i.id === selected.id) : -1;
+
+  // Prefetch the neighbours of the selected card in one batch request, so browsing is instant
+  useEffect(() => {
+    if (selectedIndex < 0) return;
+    const ids = [filtered[selectedIndex - 1], filtered[selectedIndex + 1]]
+      .filter(i => i && !detailCache.current.has(i.id))
+      .map(i => i.id);
+    if (!ids.length) return;
+    fetch(`${API}/api/gallery-items?ids=${ids.map(encodeURIComponent).join(',')}`)
+      .then(r => r.json())
+      .then(items => items.forEach(cacheDetail))
+      .catch(() => {});
+  }, [selectedIndex, filtered]); // eslint-disable-line
+
+  // Browse the detail view with the arrow keys
+  useEffect(() => {
+    if (selectedIndex < 0) return;
+    const onKey = (e) => {
+      const next = e.key === 'ArrowRight' ? filtered[selectedIndex + 1]
+        : e.key === 'ArrowLeft' ? filtered[selectedIndex - 1] : null;
+      if (next) setSelected(next);
+    };
+    window.addEventListener('keydown', onKey);
+    return () => window.removeEventListener('keydown', onKey);
+  }, [selectedIndex, filtered]);
 
   const formatDate = (iso) => {
     if (!iso) return '';
@@ -176,15 +271,12 @@ function App() {
   }, []);
 
   const handleExport = (format) => {
-    const data = filtered.length > 0 ? filtered : imports;
-    if (data.length === 0) { showToast('Geen data om te exporteren', 'error'); return; }
-    if (format === 'json') {
-      exportAsJSON(data);
-      showToast(`${data.length} imports geëxporteerd als JSON`);
-    } else {
-      exportAsCSV(data);
-      showToast(`${data.length} imports geëxporteerd als CSV`);
-    }
+    if (stats.total === 0) { showToast('Geen data om te exporteren', 'error'); return; }
+    const query = search.trim();
+    downloadExport(format, query);
+    showToast(query
+      ? `Export van zoekresultaten als ${format.toUpperCase()} gestart`
+      : `Export van ${stats.total} imports als ${format.toUpperCase()} gestart`);
     setExportOpen(false);
   };
 
@@ -202,7 +294,7 @@ function App() {
           setSelected(prev => ({ ...prev, storage_mode: 'both', local_path: data.local_path }));
         }
         setImports(prev => prev.map(i => i.id === itemId ? { ...i, storage_mode: 'both', local_path: data.local_path } : i));
-        fetchData();
+        syncChanges();
       } else {
         showToast(data.detail || 'Download mislukt', 'error');
       }
@@ -213,22 +305,72 @@ function App() {
     }
   };
 
-  const handleDownloadAll = async () => {
-    const pending = imports.filter(i => i.storage_mode !== 'both' && i.image_url);
-    if (pending.length === 0) { showToast('Alle afbeeldingen al lokaal opgeslagen'); return; }
-    setDownloading('all');
-    let done = 0;
-    let errors = 0;
-    for (const item of pending) {
-      try {
-        const res = await fetch(`${API}/api/gallery-items/${item.id}/download`, { method: 'POST' });
-        if (res.ok) done++;
-        else errors++;
-      } catch { errors++; }
+  // Bulk download draait server-side als job; voortgang komt binnen als 'download' events
+  const onDownloadJob = useCallback((job) => {
+    if (activeJob.current !== job.id) return;
+    if (job.status === 'completed') {
+      activeJob.current = null;
+      setDownloading(null);
+      setDownloadJob(null);
+      showToast(`${job.done} gedownload, ${job.failed} fouten`);
+      syncChanges();
+    } else {
+      setDownloadJob(job);
     }
-    showToast(`${done} gedownload, ${errors} fouten`);
-    setDownloading(null);
+  }, [syncChanges]); // eslint-disable-line
+
+  const followDownloadJob = (job) => {
+    activeJob.current = job.id;
+    setDownloading('all');
+    setDownloadJob(job);
+  };
+
+  // Live updates via server-sent events (geen polling). Bij (her)verbinden
+  // eerst inhalen wat gemist is: /changes en de status van een lopende job.
+  useEffect(() => {
     fetchData();
+    const source = new EventSource(`${API}/api/events`);
+    const on = (type, handler) => source.addEventListener(type, e => handler(JSON.parse(e.data)));
+    source.onopen = () => {
+      if (syncToken.current) syncChanges();
+      if (activeJob.current) {
+        fetch(`${API}/api/gallery-items/download/jobs/${activeJob.current}`)
+          .then(r => r.ok ? r.json() : null)
+          .then(job => job && onDownloadJob(job))
+          .catch(() => {});
+      }
+    };
+    on('import', ({ items }) => applyChanges({ items, deleted: [] }));
+    on('update', ({ items }) => applyChanges({ items, deleted: [] }));
+    on('delete', ({ ids }) => applyChanges({ items: [], deleted: ids }));
+    on('stats', ({ gallery, downloads }) => { setStats(gallery); setDlStats(downloads); });
+    on('download', onDownloadJob);
+    on('resync', () => syncChanges());
+    return () => source.close();
+  }, [fetchData, syncChanges, applyChanges, onDownloadJob]);
+
+  // Loopt er nog een job (bijv. na herladen van de pagina)? Volg die dan
+  useEffect(() => {
+    fetch(`${API}/api/gallery-items/download/jobs?limit=1`)
+      .then(r => r.json())
+      .then(jobs => {
+        const active = Array.isArray(jobs) && jobs.find(j => j.status === 'queued' || j.status === 'running');
+        if (active) followDownloadJob(active);
+      })
+      .catch(() => {});
+  }, []); // eslint-disable-line
+
+  const handleDownloadAll = async () => {
+    if (dlStats.pending === 0) { showToast('Alle afbeeldingen al lokaal opgeslagen'); return; }
+    try {
+      const res = await fetch(`${API}/api/gallery-items/download/jobs`, { method: 'POST' });
+      const job = await res.json();
+      if (!res.ok) throw new Error(job.detail);
+      if (job.total === 0) { showToast('Alle afbeeldingen al lokaal opgeslagen'); return; }
+      followDownloadJob(job);
+    } catch {
+      showToast('Download starten mislukt', 'error');
+    }
   };
 
   return (
@@ -313,7 +455,9 @@ function App() {
               <polyline points="7 10 12 15 17 10"/>
               <line x1="12" y1="15" x2="12" y2="3"/>
             </svg>
-            {downloading === 'all' ? 'Downloaden...' : `Opslaan`}
+            {downloading === 'all'
+              ? (downloadJob ? `Downloaden... ${downloadJob.done + downloadJob.failed}/${downloadJob.total}` : 'Downloaden...')
+              : `Opslaan`}
             {dlStats.pending > 0 && <span className="dl-count">{dlStats.pending}</span>}
           </button>
 
@@ -351,7 +495,7 @@ function App() {
         <input
           className="search-input"
           type="text"
-          placeholder="Zoek op titel, prompt, model, aspect ratio..."
+          placeholder="Zoek op titel, prompt, revised prompt, creation ID..."
           value={search}
           onChange={e => setSearch(e.target.value)}
           data-testid="search-input"
@@ -363,7 +507,7 @@ function App() {
 
       {/* Main content */}
       <main className="main-content">
-        {loading ? (
+        {loading || (searching && searchResults === null) ? (
           <div className="empty-state" data-testid="loading-state">
             <div className="spinner-large"></div>
             <p>Imports laden...</p>
@@ -391,7 +535,7 @@ function App() {
                 <div className="card-image-wrap">
                   {item.image_url ? (
                     <img
-                      src={item.image_url}
+                      src={item.thumbnail_url ? `${API}${item.thumbnail_url}` : item.image_url}
                       alt={item.title || 'NightCafe'}
                       className="card-image"
                       loading="lazy"
@@ -430,6 +574,18 @@ function App() {
             ))}
           </div>
         )}
+        {!loading && !search && nextCursor && (
+          <div className="load-more-row">
+            <button
+              className="btn-load-more"
+              onClick={loadMore}
+              disabled={loadingMore}
+              data-testid="load-more-btn"
+            >
+              {loadingMore ? 'Laden...' : 'Meer laden'}
+            </button>
+          </div>
+        )}
       </main>
 
       {/* Detail panel */}
@@ -454,6 +610,9 @@ function App() {
                   src={activeImage}
                   alt={selected.title}
                   className="detail-image"
+                  style={activeImage === selected.image_url && selected.width && selected.height
+                    ? { aspectRatio: `${selected.width} / ${selected.height}` }
+                    : undefined}
                   data-testid="detail-image"
                   onError={e => { e.target.style.display = 'none'; }}
                 />